@@ -0,0 +1,222 @@
+# ==================================================================================
+#                           BATCH CONVERSION
+#
+# DESCRIPTION: This file contains the logic for converting many scenes of any of
+#              the supported sensors on a process pool. Every worker process
+#              imports rasterio/GDAL and the converters once and then converts
+#              scene after scene, writing one result record per scene.
+#
+# ==================================================================================
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "common"))
+from converters import (
+    RAW_FILE_EXTS,
+    SENSORS_WITH_METADATA,
+    convert_scene,
+    find_metadata_file,
+    input_files,
+    inspect_scene,
+    load_converter_class,
+    output_files,
+    path_size,
+)
+from stage_profiler import StageProfiler
+
+LOG_TAIL_LINES = 20
+
+
+def read_manifest(manifest_path: str):
+    """
+    Reads a JSON lines manifest, one scene per line, e.g.
+    {"sensor": "enmap", "geotiff_path": "...", "metadata_path": "...", "output_path": "...", "options": {}}
+    Only sensor and geotiff_path are required.
+    """
+    scenes = []
+    with open(manifest_path) as manifest:
+        for line in manifest:
+            if line.strip():
+                scenes.append(json.loads(line))
+    return scenes
+
+
+def glob_scenes(sensor: str, pattern: str, options: dict = None):
+    return [
+        {"sensor": sensor, "geotiff_path": path, "options": options or {}}
+        for path in sorted(glob.glob(pattern, recursive=True))
+    ]
+
+
+def resolve_scene(scene: dict, output_dir: str = None):
+    scene = dict(scene)
+    scene.setdefault("options", {})
+    if scene["sensor"] in SENSORS_WITH_METADATA and not scene.get("metadata_path"):
+        scene["metadata_path"] = find_metadata_file(scene["geotiff_path"])
+    scene["output_path"] = scene_output_path(scene, output_dir)
+    return scene
+
+
+def scene_output_path(scene: dict, output_dir: str = None):
+    if scene.get("output_path"):
+        return scene["output_path"]
+    name = os.path.splitext(os.path.basename(os.path.normpath(scene["geotiff_path"])))[0] + ".hdr"
+    directory = output_dir or os.path.dirname(os.path.abspath(os.path.normpath(scene["geotiff_path"])))
+    return os.path.join(directory, name)
+
+
+def check_output_paths(scenes: list, output_dir: str = None):
+    """
+    Raises a ValueError if scenes would be written to the same output, e.g. two GeoTIFFs of
+    the same name in different directories with output_dir, which would overwrite each other.
+    """
+    scenes_by_output = {}
+    for scene in scenes:
+        if not scene.get("output_path") and not scene.get("geotiff_path"):
+            # Reported as failed by its worker
+            continue
+        output_path = os.path.abspath(scene_output_path(scene, output_dir))
+        scenes_by_output.setdefault(output_path, []).append(scene["geotiff_path"])
+    duplicates = [f"{output_path} ({', '.join(paths)})" for output_path, paths in scenes_by_output.items() if len(paths) > 1]
+    if duplicates:
+        raise ValueError(f"Scenes with the same output, give them an output_path: {'; '.join(duplicates)}")
+
+
+def scene_cache_key(cache, scene: dict):
+    converter_class = load_converter_class(scene["sensor"])
+    inputs = input_files(scene["geotiff_path"], scene.get("metadata_path"))
+    return cache.key(converter_class, inputs, cache_options(scene["options"]))
+
+
+def cache_options(options: dict):
+    # The upload does not change the outputs, which upload_fetched sends on a cache hit
+    if not options.get("writer_options"):
+        return options
+    from writer_options import as_writer_options
+    return dict(options, writer_options=as_writer_options(options["writer_options"]).model_dump(exclude={"upload"}))
+
+
+def upload_fetched(scene: dict):
+    # Outputs placed from the conversion cache are uploaded as the conversion would have
+    from checksums import MANIFEST_EXT
+    from upload import upload_written
+    from writer_options import as_writer_options
+    upload_options = as_writer_options(scene["options"].get("writer_options")).upload
+    if upload_options is None:
+        return
+    outputs = output_files(scene["output_path"])
+    raw_paths = [p for p in outputs if p.endswith(RAW_FILE_EXTS)]
+    upload_written(scene["output_path"], raw_paths[0], upload_options, [p for p in outputs if p.endswith(MANIFEST_EXT)])
+
+
+def run_scene(scene: dict, output_dir: str = None, cache=None, profile_path: str = None):
+    # Runs inside a worker process, the converter output is kept out of the shared console
+    start = time.perf_counter()
+    record = {
+        "sensor": scene.get("sensor"),
+        "geotiff_path": scene.get("geotiff_path"),
+        "output_path": scene.get("output_path"),
+        "status": "ok",
+        "error": None,
+    }
+    log = io.StringIO()
+    try:
+        scene = resolve_scene(scene, output_dir)
+        record["output_path"] = scene["output_path"]
+        with contextlib.redirect_stdout(log):
+            key = scene_cache_key(cache, scene) if cache is not None else None
+            if key is not None and cache.fetch(key, scene["output_path"]):
+                record["cache"] = "hit"
+                upload_fetched(scene)
+            else:
+                profile = []
+                profiler = StageProfiler(callback=profile.append, path=profile_path) if profile_path else None
+                converter = convert_scene(
+                    scene["sensor"],
+                    scene["geotiff_path"],
+                    scene["output_path"],
+                    metadata_path=scene.get("metadata_path"),
+                    profiler=profiler,
+                    **scene["options"],
+                )
+                if profile:
+                    record["stages"] = {r["stage"]: round(r["seconds"], 3) for r in profile if r["event"] == "stage"}
+                # Whether the pixels were reordered or copied in the layout they were stored in
+                record["write_path"] = getattr(converter, "write_path", None)
+            if not output_files(scene["output_path"]):
+                raise RuntimeError("The converter did not create any ENVI files")
+            if key is not None and record.get("cache") != "hit":
+                record["cache"] = "miss"
+                cache.store(key, output_files(scene["output_path"]))
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = f"{type(e).__name__}: {e}"
+        record["log"] = log.getvalue().splitlines()[-LOG_TAIL_LINES:]
+
+    record["duration"] = round(time.perf_counter() - start, 3)
+    geotiff_path = scene.get("geotiff_path")
+    inputs = input_files(geotiff_path, scene.get("metadata_path")) if geotiff_path and os.path.exists(geotiff_path) else []
+    outputs = output_files(record["output_path"]) if record["output_path"] else []
+    record["bytes_in"] = total_size(inputs)
+    record["bytes_out"] = total_size(outputs)
+    # With the checksums option, the SHA-256 of the .raw taken while it was written. Imported
+    # here, as checksums pulls in numpy and pydantic, which the CLI only needs in the workers
+    from checksums import MANIFEST_EXT, read_manifest as read_checksum_manifest
+    manifests = [p for p in outputs if p.endswith(MANIFEST_EXT)]
+    if manifests:
+        record["sha256"] = read_checksum_manifest(manifests[0]).raw.checksum
+    return record
+
+
+def total_size(paths: list):
+    return sum(path_size(p) for p in paths if os.path.exists(p))
+
+
+def run_batch(scenes: list, results_path: str, workers: int = 1, output_dir: str = None, cache=None,
+              profile_path: str = None):
+    check_output_paths(scenes, output_dir)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    failed = 0
+    with open(results_path, "a") as results, ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_scene, scene, output_dir, cache, profile_path) for scene in scenes]
+        for done, future in enumerate(as_completed(futures), start=1):
+            record = future.result()
+            failed += record["status"] != "ok"
+            results.write(json.dumps(record) + "\n")
+            results.flush()
+            print(f"[{done}/{len(scenes)}] {record['status'].upper()} {record['geotiff_path']} ({record['duration']:.1f}s)")
+    return failed
+
+
+def inspect_one(scene: dict):
+    record = {"sensor": scene.get("sensor"), "geotiff_path": scene.get("geotiff_path"), "status": "ok"}
+    try:
+        scene = resolve_scene(scene)
+        record["header"] = inspect_scene(
+            scene["sensor"],
+            scene["geotiff_path"],
+            metadata_path=scene.get("metadata_path"),
+            **scene["options"],
+        )
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = f"{type(e).__name__}: {e}"
+    return record
+
+
+def inspect_batch(scenes: list, results, workers: int = 1):
+    # Only headers and XML are read, so threads are enough: GDAL releases the GIL while
+    # opening files. The converters' progress output is silenced for the whole run.
+    failed = 0
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=workers) as executor:
+        for record in executor.map(inspect_one, scenes):
+            failed += record["status"] != "ok"
+            results.write(json.dumps(record) + "\n")
+    return failed
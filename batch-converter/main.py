@@ -0,0 +1,195 @@
+# ==================================================================================
+#                           MAIN FILE
+#
+# DESCRIPTION: This file contains the CLI interface for converting (or only
+#              inspecting) many scenes of any supported sensor (enmap, pixxel,
+#              worldview3, hyperion) in one run, or every delivery put into drop
+#              folders as a long-running service.
+#
+# ==================================================================================
+import json
+import os
+import sys
+import time
+from typing import List
+
+import typer
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "common"))
+from batch_convert import check_output_paths, glob_scenes, inspect_batch, read_manifest, run_batch
+from conversion_cache import DEFAULT_MAX_SIZE_GB, ConversionCache
+from converters import SENSORS
+from watch_folders import DEFAULT_POLL_SECONDS, DEFAULT_SETTLE_SECONDS, WatchService
+
+# The converters are only imported once a scene is converted or inspected, so --help
+# comes back right away. Rich help is turned off, it is slower to import than the rest.
+app = typer.Typer(add_completion=False, rich_markup_mode=None)
+
+
+def gather_scenes(manifest: str, sensor: str, pattern: str, options: str):
+    scenes = []
+    if manifest:
+        scenes += read_manifest(manifest)
+    if pattern:
+        if sensor not in SENSORS:
+            typer.echo(f"--glob requires --sensor to be one of {', '.join(SENSORS)}")
+            raise typer.Exit(1)
+        scenes += glob_scenes(sensor, pattern, json.loads(options))
+    if not scenes:
+        typer.echo("No scenes found, use --manifest and/or --sensor with --glob")
+        raise typer.Exit(1)
+    return scenes
+
+
+MANIFEST_OPTION = typer.Option(None, "--manifest", "-m", help="JSON lines file with one scene per line")
+SENSOR_OPTION = typer.Option(None, "--sensor", "-s", help=f"Sensor of the globbed scenes ({', '.join(SENSORS)})")
+GLOB_OPTION = typer.Option(None, "--glob", "-g", help="Glob matching the GeoTIFFs (or Hyperion band directories)")
+OPTIONS_OPTION = typer.Option(
+    "{}", "--options",
+    help='JSON object of converter options for the globbed scenes. Outputs are a BIL .raw unless e.g. {"interleave": "BIP"}'
+)
+
+
+@app.command()
+def convert(
+    manifest: str = MANIFEST_OPTION,
+    sensor: str = SENSOR_OPTION,
+    pattern: str = GLOB_OPTION,
+    options: str = OPTIONS_OPTION,
+    output_dir: str = typer.Option(
+        None, "--output-dir", "-o", help="Directory for the ENVI files (defaults to next to each input)"
+    ),
+    results: str = typer.Option(
+        "batch_results.jsonl", "--results", "-r", help="JSON lines file the per-scene results are appended to"
+    ),
+    workers: int = typer.Option(
+        os.cpu_count() or 1, "--workers", "-w", help="Number of worker processes"
+    ),
+    cache_dir: str = typer.Option(
+        None, "--cache-dir", help="Directory of the conversion cache (no cache by default)"
+    ),
+    cache_size_gb: float = typer.Option(
+        DEFAULT_MAX_SIZE_GB, "--cache-size-gb", help="Size the cache is evicted down to, least recently used first"
+    ),
+    cache_hash: bool = typer.Option(
+        False, "--cache-hash", help="Identify inputs by a sampled hash of their content and their mtime instead of their path"
+    ),
+    profile: str = typer.Option(
+        None, "--profile", help="JSON lines file the time and memory of every conversion stage are appended to"
+    ),
+):
+    """Convert every scene to ENVI on a pool of worker processes."""
+    scenes = gather_scenes(manifest, sensor, pattern, options)
+    try:
+        check_output_paths(scenes, output_dir)
+    except ValueError as e:
+        typer.echo(str(e))
+        raise typer.Exit(1)
+    cache = ConversionCache(cache_dir, cache_size_gb, hash_inputs=cache_hash) if cache_dir else None
+
+    print("==============================================")
+    print("              BATCH CONVERSION")
+    print("==============================================")
+    print(f"Converting {len(scenes)} scenes with {workers} workers...")
+
+    start_time = time.time()
+    failed = run_batch(scenes, results, workers=workers, output_dir=output_dir, cache=cache,
+                       profile_path=profile)
+    total_time = time.time() - start_time
+
+    print("")
+    print(f"Done! {len(scenes) - failed} converted, {failed} failed")
+    print(f"Results written to {results}")
+    print(f"Batch completed in {total_time:.3f} seconds")
+    print("==============================================")
+    if failed:
+        raise typer.Exit(1)
+
+
+@app.command()
+def inspect(
+    manifest: str = MANIFEST_OPTION,
+    sensor: str = SENSOR_OPTION,
+    pattern: str = GLOB_OPTION,
+    options: str = OPTIONS_OPTION,
+    output: str = typer.Option(
+        None, "--output", "-o", help="JSON lines file for the headers (defaults to the console)"
+    ),
+    workers: int = typer.Option(
+        16, "--workers", "-w", help="Number of threads opening scenes"
+    ),
+):
+    """Print the would-be ENVI header of every scene without reading any pixel data."""
+    scenes = gather_scenes(manifest, sensor, pattern, options)
+    start_time = time.time()
+    if output:
+        with open(output, "w") as results:
+            failed = inspect_batch(scenes, results, workers=workers)
+    else:
+        failed = inspect_batch(scenes, sys.stdout, workers=workers)
+    total_time = time.time() - start_time
+    typer.echo(f"Inspected {len(scenes)} scenes ({failed} failed) in {total_time:.3f} seconds", err=True)
+    if failed:
+        raise typer.Exit(1)
+
+
+@app.command()
+def watch(
+    folders: List[str] = typer.Argument(..., help="Drop folders to watch for deliveries"),
+    output_dir: str = typer.Option(
+        ..., "--output-dir", "-o", help="Directory the ENVI files of every delivery are written to"
+    ),
+    options: str = typer.Option(
+        "{}", "--options", help='JSON object of converter options by sensor, e.g. {"enmap": {"streaming": true}}'
+    ),
+    results: str = typer.Option(
+        "watch_results.jsonl", "--results", "-r", help="JSON lines file the per-delivery results are appended to"
+    ),
+    workers: int = typer.Option(
+        os.cpu_count() or 1, "--workers", "-w", help="Number of worker processes"
+    ),
+    max_pending: int = typer.Option(
+        None, "--max-pending", help="Deliveries handed to the workers at most at a time (twice --workers by default)"
+    ),
+    poll_seconds: float = typer.Option(
+        DEFAULT_POLL_SECONDS, "--poll-seconds", help="Time between two looks at the drop folders"
+    ),
+    settle_seconds: float = typer.Option(
+        DEFAULT_SETTLE_SECONDS, "--settle-seconds", help="Time the files of a delivery must stay unchanged"
+    ),
+    once: bool = typer.Option(
+        False, "--once", help="Exit once the deliveries already in the drop folders are converted"
+    ),
+    profile: str = typer.Option(
+        None, "--profile", help="JSON lines file the time and memory of every conversion stage are appended to"
+    ),
+):
+    """Convert every delivery put into the drop folders until stopped (Ctrl+C or SIGTERM)."""
+    for folder in folders:
+        if not os.path.isdir(folder):
+            typer.echo(f"Drop folder {folder} does not exist")
+            raise typer.Exit(1)
+    options = json.loads(options)
+    unknown = [sensor for sensor in options if sensor not in SENSORS]
+    if unknown:
+        typer.echo(f"--options is keyed by sensor ({', '.join(SENSORS)}), got {', '.join(unknown)}")
+        raise typer.Exit(1)
+
+    print("==============================================")
+    print("              WATCH FOLDERS")
+    print("==============================================")
+
+    service = WatchService(folders, output_dir, results, workers=workers, max_pending=max_pending, options=options,
+                           poll_seconds=poll_seconds, settle_seconds=settle_seconds, profile_path=profile)
+    service.run(once=once)
+
+    print("")
+    print(f"Done! {service.converted} converted, {service.failed} failed")
+    print(f"Results written to {results}")
+    print("==============================================")
+    if once and service.failed:
+        raise typer.Exit(1)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,199 @@
+# ==================================================================================
+#                           WATCH FOLDERS
+#
+# DESCRIPTION: This file contains the service that watches drop folders and
+#              converts every delivery put into them. A delivery is an entry of a
+#              drop folder, either a GeoTIFF or a directory holding a scene; its
+#              sensor is told from its file names (see detect_scene in
+#              converters.py) and it is converted to <output dir>/<delivery>.hdr.
+#
+#              A delivery is only picked up once its files stopped changing for the
+#              settle time, so a copy in progress is never converted. Conversions
+#              run on a pool of worker processes started when the service starts,
+#              each of which imports rasterio/GDAL and the four converters once, so
+#              no delivery pays for them. At most max_pending deliveries are handed
+#              to the pool at a time; the others wait in their drop folder until a
+#              worker is free, so a burst of deliveries never piles up in memory.
+#
+#              Deliveries whose .hdr is already in the output directory are left
+#              alone, so the service can be restarted at any time. A delivery that
+#              failed is tried again once its files change. A delivery of the same
+#              name as one of another drop folder fails, instead of overwriting
+#              its output.
+#
+# ==================================================================================
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "common"))
+from batch_convert import run_scene
+from converters import SENSORS, detect_scene, is_geotiff, load_converter_class
+
+DEFAULT_POLL_SECONDS = 5.0
+DEFAULT_SETTLE_SECONDS = 30.0
+
+
+def warm_worker():
+    # Runs once in every worker process, before its first delivery
+    import rasterio
+
+    # Stopping is left to the service, which lets the running conversions finish
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for sensor in SENSORS:
+        load_converter_class(sensor)
+    # GDAL registers its drivers the first time an environment is entered
+    with rasterio.Env():
+        pass
+
+
+def delivery_signature(path: str):
+    # (files, bytes, last modification) of a delivery, which changes while it is copied
+    if not os.path.isdir(path):
+        stat = os.stat(path)
+        return 1, stat.st_size, stat.st_mtime_ns
+    files = size = modified = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            stat = os.stat(os.path.join(root, name))
+            files, size, modified = files + 1, size + stat.st_size, max(modified, stat.st_mtime_ns)
+    return files, size, modified
+
+
+class WatchService:
+    """
+    Converts the deliveries of the drop folders on a pool of worker processes. options
+    holds the converter options by sensor, e.g. {"enmap": {"streaming": True}}.
+    """
+    def __init__(self, folders: list, output_dir: str, results_path: str, workers: int = 1,
+                 max_pending: int = None, options: dict = None, poll_seconds: float = DEFAULT_POLL_SECONDS,
+                 settle_seconds: float = DEFAULT_SETTLE_SECONDS, profile_path: str = None):
+        self.folders = folders
+        self.output_dir = output_dir
+        self.results_path = results_path
+        self.workers = workers
+        self.max_pending = max_pending or 2 * workers
+        self.options = options or {}
+        self.poll_seconds = poll_seconds
+        self.settle_seconds = settle_seconds
+        self.profile_path = profile_path
+        # delivery: (signature, when it was first seen with that signature)
+        self._seen = {}
+        # delivery: signature it was converted (or failed) with
+        self._done = {}
+        # future: delivery being converted
+        self._pending = {}
+        # output path: delivery converted (or being converted) to it
+        self._outputs = {}
+        self._waiting = 0
+        self._stopping = False
+        self.converted = 0
+        self.failed = 0
+
+    def stop(self, *_):
+        if not self._stopping:
+            print("Stopping once the running conversions are done...")
+        self._stopping = True
+
+    def run(self, once: bool = False):
+        """Watches the drop folders until stopped, or with once until every delivery found is done."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        handlers = {signum: signal.signal(signum, self.stop) for signum in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            with open(self.results_path, "a") as results, \
+                    ProcessPoolExecutor(max_workers=self.workers, initializer=warm_worker) as executor:
+                # Every worker is started and warmed up before the first delivery is picked up
+                wait([executor.submit(os.getpid) for _ in range(self.workers)])
+                print(f"Watching {', '.join(self.folders)} with {self.workers} workers...")
+                while True:
+                    if not self._stopping:
+                        self.dispatch(executor, results)
+                    if not self._pending and (self._stopping or once and not self._waiting):
+                        break
+                    self.collect(results)
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+    def dispatch(self, executor, results):
+        self._waiting = 0
+        for delivery in self.new_deliveries():
+            self._waiting += 1
+            if len(self._pending) >= self.max_pending or not self.is_settled(delivery):
+                continue
+            signature = self._seen[delivery][0]
+            try:
+                scene = detect_scene(delivery)
+            except (OSError, ValueError) as e:
+                self.finish(delivery, {"status": "failed", "error": f"{type(e).__name__}: {e}"}, results)
+                continue
+            scene["options"] = self.options.get(scene["sensor"], {})
+            name = os.path.splitext(os.path.basename(os.path.normpath(delivery)))[0]
+            scene["output_path"] = os.path.join(self.output_dir, name + ".hdr")
+            other = self._outputs.setdefault(scene["output_path"], delivery)
+            if other != delivery:
+                # e.g. two drop folders delivering the same name, which would overwrite each other
+                error = f"ValueError: {scene['output_path']} is already the output of {other}"
+                self.finish(delivery, {"status": "failed", "error": error}, results)
+                continue
+            if os.path.isfile(scene["output_path"]):
+                # Converted before the service was restarted
+                self._done[delivery] = signature
+                self._waiting -= 1
+                continue
+            print(f"Converting {delivery} ({scene['sensor']})")
+            self._pending[executor.submit(run_scene, scene, profile_path=self.profile_path)] = delivery
+
+    def new_deliveries(self):
+        # Deliveries not converted yet with their current files, nor being converted
+        pending = set(self._pending.values())
+        for folder in self.folders:
+            for name in sorted(os.listdir(folder)):
+                path = os.path.join(folder, name)
+                # Hidden entries are copies still being made by tools that rename once done
+                if name.startswith(".") or path in pending or not (os.path.isdir(path) or is_geotiff(path)):
+                    continue
+                if os.path.abspath(path) == os.path.abspath(self.output_dir):
+                    continue
+                try:
+                    signature = delivery_signature(path)
+                except OSError:
+                    # Moved or removed while being looked at
+                    continue
+                if self._done.get(path) == signature:
+                    continue
+                if self._seen.get(path, (None,))[0] != signature:
+                    self._seen[path] = (signature, time.monotonic())
+                yield path
+
+    def is_settled(self, delivery: str):
+        return time.monotonic() - self._seen[delivery][1] >= self.settle_seconds
+
+    def collect(self, results):
+        if not self._pending:
+            time.sleep(self.poll_seconds)
+            return
+        done, _ = wait(self._pending, timeout=self.poll_seconds, return_when=FIRST_COMPLETED)
+        for future in done:
+            delivery = self._pending.pop(future)
+            try:
+                record = future.result()
+            except Exception as e:
+                # The worker process died, e.g. killed for running out of memory
+                record = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+            self.finish(delivery, record, results)
+
+    def finish(self, delivery: str, record: dict, results):
+        self._done[delivery] = self._seen[delivery][0]
+        record = dict(record, delivery=delivery)
+        if record["status"] == "ok":
+            self.converted += 1
+        else:
+            self.failed += 1
+        results.write(json.dumps(record) + "\n")
+        results.flush()
+        duration = f" ({record['duration']:.1f}s)" if "duration" in record else ""
+        print(f"{record['status'].upper()} {delivery}{duration}" + (f": {record['error']}" if record["error"] else ""))
@@ -0,0 +1,103 @@
+"""
+DESCRIPTION: Micro-benchmark comparing the previous EnMap and Hyperion scaling code
+             with the shared BandScaler stage. Reports throughput and peak memory
+             and checks that both produce byte-identical output.
+
+USAGE:       python bench_band_scaling.py [--lines 1000] [--samples 1000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "common"))
+from band_scaling import BandScaler
+
+ENMAP_BANDS = 224
+HYPERION_VNIR_BANDS = 50
+HYPERION_SWIR_BANDS = 146
+
+
+def legacy_enmap(data):
+    hsi_data = np.transpose(data, [1, 2, 0])
+    hsi_data = hsi_data + 32768.0
+    hsi_data = hsi_data.astype(np.float32)
+    hsi_data = hsi_data / 65535.0
+    return hsi_data
+
+
+def fused_enmap(data):
+    hsi_data = np.transpose(data, [1, 2, 0])
+    scaler = BandScaler.uniform(data.shape[0], offset=32768.0, divisor=65535.0)
+    return scaler.apply_chunked(hsi_data, band_axis=2)
+
+
+def legacy_hyperion(data, divisors):
+    for b, divisor in enumerate(divisors):
+        data[:, :, b] /= divisor
+    return data
+
+
+def fused_hyperion(data, divisors):
+    scaler = BandScaler(np.zeros(len(divisors)), divisors)
+    return scaler.apply_chunked(data, band_axis=2, out=data)
+
+
+def measure(func, make_input, repeat):
+    best = float("inf")
+    peak = 0
+    result = None
+    for _ in range(repeat):
+        args = make_input()
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return result, best, peak
+
+
+def report(name, nbytes, legacy, fused):
+    (legacy_out, legacy_time, legacy_peak), (fused_out, fused_time, fused_peak) = legacy, fused
+    identical = legacy_out.shape == fused_out.shape and legacy_out.tobytes() == fused_out.tobytes()
+    mb = nbytes / 1024 ** 2
+    print(f"{name}")
+    print(f"    before: {mb / legacy_time:9.1f} MB/s | peak {legacy_peak / 1024 ** 2:9.1f} MB")
+    print(f"    after:  {mb / fused_time:9.1f} MB/s | peak {fused_peak / 1024 ** 2:9.1f} MB")
+    print(f"    byte-identical: {identical}")
+    return identical
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=1000)
+    parser.add_argument("--samples", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    enmap = rng.integers(-32768, 32767, size=(ENMAP_BANDS, args.lines, args.samples), dtype=np.int16)
+    identical = report(
+        f"EnMap process_hsi_data ({ENMAP_BANDS} bands, int16)",
+        enmap.nbytes,
+        measure(legacy_enmap, lambda: (enmap,), args.repeat),
+        measure(fused_enmap, lambda: (enmap,), args.repeat),
+    )
+
+    divisors = [40.0] * HYPERION_VNIR_BANDS + [80.0] * HYPERION_SWIR_BANDS
+    hyperion = rng.integers(0, 16000, size=(args.lines, args.samples, len(divisors))).astype(np.float32)
+    identical &= report(
+        f"Hyperion _scale_data ({len(divisors)} bands, float32, BIP)",
+        hyperion.nbytes,
+        measure(legacy_hyperion, lambda: (hyperion.copy(), divisors), args.repeat),
+        measure(fused_hyperion, lambda: (hyperion.copy(), divisors), args.repeat),
+    )
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+DESCRIPTION: Benchmark of the checksums computed while the .raw is written, against
+             converting first and reading the .raw back to checksum it, as was done
+             before uploads. A synthetic EnMap scene is converted (streaming, BIL)
+             both ways, and the SHA-256 of the .raw and the CRC-32 of every band in
+             the manifest are checked against the ones read back. The .raw read back
+             is usually still in the page cache here, so the time of the re-read is
+             a lower bound of what it costs on a multi-GB cube.
+
+USAGE:       python bench_checksums.py [--lines 1000] [--samples 1000] [--repeat 3]
+"""
+import argparse
+import contextlib
+import os
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "common"))
+from checksums import file_checksum, manifest_path, read_manifest
+from converters import create_converter
+from envi_header import header_dtype, read_envi_header
+from envi_writer import interleave_shape
+from ENVI import InterleaveEnum
+from synthetic_scenes import write_enmap_scene
+
+OPTIONS = {"streaming": True, "interleave": "BIL"}
+
+
+def convert(geotiff_path, metadata_path, output_path, checksums):
+    converter = create_converter("enmap", geotiff_path, output_path, metadata_path=metadata_path,
+                                 writer_options={"checksums": checksums}, **OPTIONS)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        converter.convert_geotiff()
+
+
+def read_back(hdr_path):
+    # The checksums taken from the .raw once it was written
+    header = read_envi_header(hdr_path)
+    raw_path = os.path.splitext(hdr_path)[0] + ".raw"
+    bands, lines, samples = int(header["bands"]), int(header["lines"]), int(header["samples"])
+    interleave = InterleaveEnum(header["interleave"].lower())
+    raw = np.memmap(raw_path, dtype=header_dtype(header), mode="r",
+                    shape=interleave_shape(interleave, bands, lines, samples))
+    bsq = np.transpose(raw, (1, 0, 2)) if interleave == InterleaveEnum.BIL else raw
+    crcs = [f"{zlib.crc32(np.ascontiguousarray(bsq[band])):08x}" for band in range(bands)]
+    return file_checksum(raw_path), crcs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=1000)
+    parser.add_argument("--samples", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        geotiff_path, metadata_path = write_enmap_scene(directory, args.lines, args.samples)
+        before_path = os.path.join(directory, "before.hdr")
+        after_path = os.path.join(directory, "after.hdr")
+        before_best = after_best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            convert(geotiff_path, metadata_path, before_path, checksums=False)
+            raw_checksum, band_checksums = read_back(before_path)
+            before_best = min(before_best, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            convert(geotiff_path, metadata_path, after_path, checksums=True)
+            after_best = min(after_best, time.perf_counter() - start)
+
+        manifest = read_manifest(manifest_path(after_path))
+        identical = manifest.raw == raw_checksum and manifest.bands.checksums == band_checksums
+        mb = manifest.raw.size / 1024 ** 2
+
+    print(f"EnMap {args.lines}x{args.samples} ({mb:.1f} MB .raw, {OPTIONS})")
+    print(f"    convert, then read back: {before_best:8.3f} s")
+    print(f"    checksums while written: {after_best:8.3f} s")
+    print(f"    same checksums: {identical}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
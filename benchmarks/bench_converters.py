@@ -0,0 +1,190 @@
+"""
+DESCRIPTION: End to end benchmark of the four converters on synthetic scenes shaped like
+             real products (see synthetic_scenes.py). Every conversion runs in a fresh
+             process and reports its throughput and peak resident memory, along with
+             the time, throughput and peak memory of each stage of the converter (see
+             common/stage_profiler.py). Results can be appended to a JSON lines file
+             and compared with the results of a previous release to catch regressions.
+
+USAGE:       python bench_converters.py [--scenes enmap hyperion pixxel-v1 pixxel-v2 worldview3]
+                                        [--lines 500] [--samples 500] [--repeat 1]
+                                        [--options '{"enmap": {"streaming": true}}']
+                                        [--results results.jsonl] [--baseline previous.jsonl]
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import rasterio
+
+from synthetic_scenes import SCENES, write_scene
+
+COMMON_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "common")
+sys.path.append(COMMON_DIR)
+from converters import create_converter, input_files
+from stage_profiler import StageProfiler
+
+DEFAULT_TOLERANCE = 0.2
+
+
+def peak_rss():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_conversion(name: str, sensor: str, geotiff_path: str, metadata_path: str, output_path: str, options: dict):
+    # Runs in a fresh process, so the peak RSS belongs to this conversion only
+    baseline_rss = peak_rss()
+    profile = []
+    converter = create_converter(sensor, geotiff_path, output_path, metadata_path=metadata_path,
+                                 profiler=StageProfiler(callback=profile.append), **options)
+
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if sensor == "hyperion":
+            converter.write_envi(output_path)
+        else:
+            converter.convert_geotiff()
+    seconds = time.perf_counter() - start
+    stages = {
+        record["stage"]: {key: record[key] for key in ("seconds", "bytes", "calls", "peak_rss", "mb_per_s")}
+        for record in profile if record["event"] == "stage"
+    }
+    return {
+        "seconds": seconds,
+        "stages": stages,
+        "peak_rss": peak_rss(),
+        "baseline_rss": baseline_rss,
+        "write_path": getattr(converter, "write_path", None),
+    }
+
+
+def describe_scene(sensor: str, geotiff_path: str):
+    paths = input_files(geotiff_path)
+    with rasterio.open(paths[0]) as src:
+        bands = len(paths) if sensor == "hyperion" else src.count
+        return {"bands": bands, "lines": src.height, "samples": src.width, "dtype": src.dtypes[0]}
+
+
+def benchmark_scene(name: str, directory: str, lines: int, samples: int, options: dict, repeat: int):
+    scene_dir = os.path.join(directory, name)
+    os.makedirs(scene_dir, exist_ok=True)
+    sensor, geotiff_path, metadata_path = write_scene(name, scene_dir, lines, samples)
+    output_path = os.path.join(scene_dir, "output", f"{name}.hdr")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    best = None
+    context = multiprocessing.get_context("spawn")
+    for _ in range(repeat):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            run = executor.submit(run_conversion, name, sensor, geotiff_path, metadata_path, output_path,
+                                  options.get(sensor, {})).result()
+        if best is None or run["seconds"] < best["seconds"]:
+            best = run
+
+    bytes_in = sum(os.path.getsize(path) for path in input_files(geotiff_path))
+    bytes_out = sum(os.path.getsize(path) for path in os.scandir(os.path.dirname(output_path)))
+    return {
+        "scene": name,
+        "sensor": sensor,
+        **describe_scene(sensor, geotiff_path),
+        "options": options.get(sensor, {}),
+        "bytes_in": bytes_in,
+        "bytes_out": bytes_out,
+        "mb_per_s": bytes_in / 1024 ** 2 / best["seconds"],
+        **best,
+    }
+
+
+def environment():
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "rasterio": rasterio.__version__,
+        "gdal": rasterio.__gdal_version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def baseline_key(record: dict):
+    # Runs are only compared with runs of the same scene, size and converter options
+    return record["scene"], record["lines"], record["samples"], json.dumps(record["options"], sort_keys=True)
+
+
+def read_baseline(path: str):
+    # The most recent result of every scene in a previous results file
+    baseline = {}
+    with open(path) as results_file:
+        for line in results_file:
+            if line.strip():
+                record = json.loads(line)
+                baseline[baseline_key(record)] = record
+    return baseline
+
+
+def report(record: dict, baseline: dict, tolerance: float) -> bool:
+    mb = 1024 ** 2
+    print(f"{record['scene']} ({record['bands']} bands, {record['lines']}x{record['samples']}, {record['dtype']})")
+    print(f"    total:  {record['seconds']:9.3f} s | {record['mb_per_s']:9.1f} MB/s | "
+          f"peak RSS {record['peak_rss'] / mb:9.1f} MB ({(record['peak_rss'] - record['baseline_rss']) / mb:.1f} MB "
+          f"above startup)")
+    for stage, totals in record["stages"].items():
+        throughput = f"{totals['mb_per_s']:9.1f} MB/s" if totals["bytes"] and totals["mb_per_s"] else " " * 14
+        peak = f"peak RSS {totals['peak_rss'] / mb:9.1f} MB" if totals["peak_rss"] else ""
+        print(f"    {stage + ':':10} {totals['seconds']:7.3f} s | {throughput} | {peak}")
+    if record["write_path"]:
+        print(f"    write path: {record['write_path']}")
+
+    previous = baseline.get(baseline_key(record))
+    if previous is None:
+        return True
+    change = record["mb_per_s"] / previous["mb_per_s"] - 1
+    regressed = change < -tolerance
+    print(f"    vs baseline: {change:+.1%} throughput, "
+          f"{(record['peak_rss'] - previous['peak_rss']) / mb:+.1f} MB peak RSS{' REGRESSION' if regressed else ''}")
+    return not regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenes", nargs="+", choices=list(SCENES), default=list(SCENES))
+    parser.add_argument("--lines", type=int, default=500)
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=1, help="Conversions per scene, the fastest is reported")
+    parser.add_argument("--options", type=json.loads, default={}, help="JSON object of converter options by sensor")
+    parser.add_argument("--data-dir", help="Directory to write the scenes in (a temporary directory by default)")
+    parser.add_argument("--results", help="JSON lines file the results are appended to")
+    parser.add_argument("--baseline", help="Results file of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Largest fraction of throughput a scene may lose against the baseline")
+    args = parser.parse_args()
+
+    baseline = read_baseline(args.baseline) if args.baseline else {}
+    run_environment = environment()
+    passed = True
+    with contextlib.ExitStack() as stack:
+        directory = args.data_dir or stack.enter_context(tempfile.TemporaryDirectory())
+        for name in args.scenes:
+            record = benchmark_scene(name, directory, args.lines, args.samples, args.options, args.repeat)
+            record["environment"] = run_environment
+            passed = report(record, baseline, args.tolerance) and passed
+            if args.results:
+                with open(args.results, "a") as results_file:
+                    results_file.write(json.dumps(record) + "\n")
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+DESCRIPTION: Micro-benchmark comparing the previous ElementTree parsers of the Pixxel
+             (v1 and v2) and EnMap XML metadata with the single-pass spectral metadata
+             reader. The metadata files are padded with geolocation tie points, as
+             delivered metadata holds much more than the band lists, with the band
+             lists in the middle of the file. Reports the time and peak memory of
+             both and checks that they read the same bands.
+
+USAGE:       python bench_metadata.py [--size-mb 20] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "common"))
+from spectral_metadata import ENMAP, read_spectral_metadata
+
+ENMAP_BANDS = 224
+PIXXEL_BANDS = 150
+PIXXEL_DISABLED_BANDS = 4
+# Bytes written per geolocation tie point
+TIE_POINT_BYTES = 110
+
+
+def legacy_pixxel_v1(path):
+    root = ET.parse(path).getroot()
+    wavelengths = [float(n) for n in root.find("Wavelength_list").text.strip("{}").split(",") if n.strip()]
+    fwhm = [float(n) for n in root.find("FWHM_list").text.strip("{}").split(",") if n != ""]
+    return wavelengths, fwhm, root.find("Wavelength_list").get("unit")
+
+
+def legacy_pixxel_v2(path):
+    tree = ET.parse(path)
+    wavelengths = []
+    bandwidths = []
+    for band in tree.findall(".//Bands"):
+        status = band.find("Status")
+        if status is not None and status.text == "1":
+            central_wavelength = band.find("Central_Wavelength")
+            if central_wavelength is not None:
+                wavelengths.append(float(central_wavelength.text))
+            bandwidth = band.find("Bandwidth")
+            if bandwidth is not None:
+                bandwidths.append(float(bandwidth.text))
+    return wavelengths, bandwidths, tree.find(".//Central_Wavelength").get("unit")
+
+
+def legacy_enmap(path):
+    root = ET.parse(path).getroot()
+    wavelengths, fwhm = [], []
+    band_statistics = root.find("specific/bandCharacterisation")
+    if band_statistics is not None:
+        for element in band_statistics.iter("bandID"):
+            wavelengths.append(float(element.find("wavelengthCenterOfBand").text))
+            fwhm.append(float(element.find("FWHMOfBand").text))
+    return wavelengths, fwhm, None
+
+
+def streaming(path, schema_name=None):
+    metadata = read_spectral_metadata(path, schema_name)
+    return metadata.wavelengths, metadata.fwhm, metadata.wavelength_units
+
+
+def write_tie_points(metadata_file, size_mb, indent="  "):
+    metadata_file.write(f"{indent}<geolocation>\n")
+    for i in range(int(size_mb * 1024 ** 2 / TIE_POINT_BYTES)):
+        metadata_file.write(
+            f'{indent}  <tiePoint row="{i // 1000}" col="{i % 1000}">'
+            f"<lat>{45.0 + i * 1e-6:.8f}</lat><lon>{10.0 + i * 1e-6:.8f}</lon></tiePoint>\n"
+        )
+    metadata_file.write(f"{indent}</geolocation>\n")
+
+
+def write_enmap_metadata(path, size_mb):
+    with open(path, "w") as metadata_file:
+        metadata_file.write('<?xml version="1.0" encoding="UTF-8"?>\n<level_X>\n')
+        write_tie_points(metadata_file, size_mb / 2)
+        metadata_file.write("  <specific>\n    <bandCharacterisation>\n")
+        for number in range(1, ENMAP_BANDS + 1):
+            metadata_file.write(
+                f'      <bandID number="{number}"><wavelengthCenterOfBand>{418.4 + number * 9.1:.4f}'
+                f"</wavelengthCenterOfBand><FWHMOfBand>{6.5 if number <= 91 else 10.0:.4f}</FWHMOfBand>"
+                f"<GainOfBand>0.0000128</GainOfBand><OffsetOfBand>0</OffsetOfBand></bandID>\n"
+            )
+        metadata_file.write("    </bandCharacterisation>\n  </specific>\n")
+        write_tie_points(metadata_file, size_mb / 2)
+        metadata_file.write("</level_X>\n")
+
+
+def write_pixxel_metadata(path, size_mb, layout):
+    wavelengths = [470.0 + i * 2.8 for i in range(PIXXEL_BANDS + PIXXEL_DISABLED_BANDS)]
+    with open(path, "w") as metadata_file:
+        metadata_file.write('<?xml version="1.0" encoding="UTF-8"?>\n<Metadata>\n')
+        write_tie_points(metadata_file, size_mb / 2)
+        if layout == "v1":
+            metadata_file.write(
+                '  <Wavelength_list unit="nm">{' + ",".join(f"{w:.3f}" for w in wavelengths[:PIXXEL_BANDS]) + ",}</Wavelength_list>\n"
+                "  <FWHM_list>{" + ",".join("9.500" for _ in range(PIXXEL_BANDS)) + "}</FWHM_list>\n"
+            )
+        else:
+            for number, wavelength in enumerate(wavelengths):
+                metadata_file.write(
+                    f"  <Bands><Band_Number>{number + 1}</Band_Number><Status>{1 if number < PIXXEL_BANDS else 0}</Status>"
+                    f'<Central_Wavelength unit="nm">{wavelength:.3f}</Central_Wavelength>'
+                    f'<Bandwidth unit="nm">9.500</Bandwidth></Bands>\n'
+                )
+        write_tie_points(metadata_file, size_mb / 2)
+        metadata_file.write("</Metadata>\n")
+
+
+def measure(func, args, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    # tracemalloc slows every allocation of the parsers down, so the peak memory is
+    # taken from a separate run
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def report(name, path, legacy, new):
+    (legacy_out, legacy_time, legacy_peak), (new_out, new_time, new_peak) = legacy, new
+    # The EnMap parser never read the units, the converter sets them itself
+    identical = legacy_out[:2] == new_out[:2] and (legacy_out[2] is None or legacy_out[2] == new_out[2])
+    mb = os.path.getsize(path) / 1024 ** 2
+    print(f"{name} ({mb:.1f} MB, {len(new_out[0])} bands)")
+    print(f"    before: {legacy_time:8.3f} s | {mb / legacy_time:7.1f} MB/s | peak {legacy_peak / 1024 ** 2:8.1f} MB")
+    print(f"    after:  {new_time:8.3f} s | {mb / new_time:7.1f} MB/s | peak {new_peak / 1024 ** 2:8.1f} MB")
+    print(f"    same bands: {identical}")
+    return identical
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=20, help="Approximate size of every metadata file")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    identical = True
+    with tempfile.TemporaryDirectory() as directory:
+        enmap_path = os.path.join(directory, "METADATA.XML")
+        write_enmap_metadata(enmap_path, args.size_mb)
+        identical &= report(
+            "EnMap parse_metadata_file",
+            enmap_path,
+            measure(legacy_enmap, (enmap_path,), args.repeat),
+            measure(streaming, (enmap_path, ENMAP), args.repeat),
+        )
+        for layout, legacy in (("v1", legacy_pixxel_v1), ("v2", legacy_pixxel_v2)):
+            pixxel_path = os.path.join(directory, f"pixxel_{layout}.xml")
+            write_pixxel_metadata(pixxel_path, args.size_mb, layout)
+            identical &= report(
+                f"Pixxel parse_metadata_file_{layout} (layout detected)",
+                pixxel_path,
+                measure(legacy, (pixxel_path,), args.repeat),
+                measure(streaming, (pixxel_path,), args.repeat),
+            )
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+DESCRIPTION: Benchmark comparing the previous PixxelConverter.normalise_hsi_data with
+             the two-pass windowed normalisation. Writes a synthetic Pixxel GeoTIFF,
+             reports throughput and peak memory of both, and checks that they produce
+             numerically equivalent output.
+
+USAGE:       python bench_pixxel_normalise.py [--lines 300] [--samples 300] [--bands 150]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from spectral import envi
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "pixxel-to-envi-converter"))
+from convert_pixxel_geotiff_to_envi import PixxelConverter
+
+
+def legacy_normalise_hsi_data(data):
+    hsi_data = np.transpose(data, [1, 2, 0])
+    std_deviation = np.std(hsi_data)
+    mean_value = np.mean(hsi_data)
+    normalized_numbers = [(x - mean_value) / std_deviation for x in hsi_data]
+
+    min_value_out = 0
+    max_value_out = 1
+    min_normalized = np.min(normalized_numbers)
+    max_normalized = np.max(normalized_numbers)
+
+    normalized_numbers = np.array(
+        [
+            (x - min_normalized)
+            / (max_normalized - min_normalized)
+            * (max_value_out - min_value_out)
+            + min_value_out
+            for x in normalized_numbers
+        ]
+    )
+    return normalized_numbers
+
+
+def write_scene(directory, bands, lines, samples):
+    rng = np.random.default_rng(0)
+    data = rng.integers(0, 4096, size=(bands, lines, samples), dtype=np.uint16)
+    geotiff_path = os.path.join(directory, "pixxel.tif")
+    with rasterio.open(geotiff_path, "w", driver="GTiff", height=lines, width=samples, count=bands,
+                       dtype="uint16", crs="EPSG:32643", transform=from_origin(500000, 2000000, 5, 5)) as dst:
+        dst.write(data)
+    return geotiff_path, data
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=300)
+    parser.add_argument("--samples", type=int, default=300)
+    parser.add_argument("--bands", type=int, default=150)
+    parser.add_argument("--chunk-size-mb", type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        geotiff_path, data = write_scene(directory, args.bands, args.lines, args.samples)
+        hdr_path = os.path.join(directory, "pixxel.hdr")
+
+        converter = PixxelConverter(geotiff_path, "", hdr_path, normalise=True, chunk_size_mb=args.chunk_size_mb)
+        converter.parse_geotiff_header()
+        converter.wavelengths = [400.0 + 5 * b for b in range(args.bands)]
+        converter.fwhm = [5.0] * args.bands
+        converter.wavelength_units = "nm"
+
+        legacy, legacy_time, legacy_peak = measure(lambda: legacy_normalise_hsi_data(data))
+        _, new_time, new_peak = measure(converter.create_normalised_envi_files)
+        # The new mode writes BIL, the legacy output is (line, sample, band)
+        new = np.asarray(envi.open(hdr_path).open_memmap(interleave="bip"))
+
+        max_difference = float(np.max(np.abs(new - legacy)))
+        equivalent = new.shape == legacy.shape and np.allclose(new, legacy, rtol=0, atol=1e-12)
+
+    mb = data.nbytes / 1024 ** 2
+    print(f"Pixxel normalisation ({args.bands} bands, {args.lines}x{args.samples}, uint16)")
+    print(f"    before: {mb / legacy_time:9.1f} MB/s | peak {legacy_peak / 1024 ** 2:9.1f} MB (in memory only)")
+    print(f"    after:  {mb / new_time:9.1f} MB/s | peak {new_peak / 1024 ** 2:9.1f} MB (including the write)")
+    print(f"    max abs difference: {max_difference:.3e} | equivalent: {equivalent}")
+    return 0 if equivalent else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
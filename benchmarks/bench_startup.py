@@ -0,0 +1,56 @@
+"""
+DESCRIPTION: Startup time of the command line entry points. Every command is run in a
+             fresh process, and the median wall time of the runs is compared with a
+             target, since for --help and short jobs the imports are most of the time.
+
+USAGE:       python bench_startup.py [--repeat 7] [--target-ms 300]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+HYPERION_DIR = os.path.join(REPO_DIR, "hyperion-to-envi-converter")
+BATCH_DIR = os.path.join(REPO_DIR, "batch-converter")
+
+# name: (working directory, arguments of the python interpreter)
+COMMANDS = {
+    "python (no imports)": (REPO_DIR, ["-c", "pass"]),
+    "hyperion import main": (HYPERION_DIR, ["-c", "import main"]),
+    "hyperion main.py --help": (HYPERION_DIR, ["main.py", "--help"]),
+    "batch main.py --help": (BATCH_DIR, ["main.py", "--help"]),
+}
+# Only the interpreter itself is not held to the target
+BASELINE = "python (no imports)"
+
+
+def time_command(directory, args, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=directory, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--target-ms", type=float, default=300, help="Upper bound of the median startup time")
+    args = parser.parse_args()
+
+    within_target = True
+    for name, (directory, command) in COMMANDS.items():
+        milliseconds = time_command(directory, command, args.repeat) * 1000
+        ok = name == BASELINE or milliseconds <= args.target_ms
+        within_target &= ok
+        print(f"{name:<28} {milliseconds:8.1f} ms{'' if ok else f'  over the {args.target_ms:.0f} ms target'}")
+    return 0 if within_target else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+DESCRIPTION: Benchmark of the upload of the .raw while it is written, against
+             converting first and uploading the outputs afterwards. A synthetic
+             EnMap scene is converted (streaming, BIL) both ways to a local
+             directory standing in for the store, with the parts sent over a link
+             of the given bandwidth, and the uploaded files are checked against the
+             local ones. The time saved is at most the shorter of the conversion
+             and the upload. The resume is checked too: an upload failing half way
+             is rerun, and only the parts the store is missing may be sent again.
+
+USAGE:       python bench_upload.py [--lines 400] [--samples 400] [--mb-per-second 100]
+"""
+import argparse
+import contextlib
+import filecmp
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "common"))
+from converters import create_converter
+from synthetic_scenes import write_enmap_scene
+from upload import UPLOADERS, LocalUploader, UploadOptions, upload_written
+
+OPTIONS = {"streaming": True, "interleave": "BIL"}
+
+
+class ThrottledUploader(LocalUploader):
+    # Sends the parts over a single link of the given bandwidth, and counts them
+    mb_per_second = 100.0
+    parts_sent = 0
+    link_free_at = 0.0
+    lock = threading.Lock()
+
+    def upload_part(self, upload_id, part_number, data):
+        with self.lock:
+            ThrottledUploader.parts_sent += 1
+            start = max(time.perf_counter(), ThrottledUploader.link_free_at)
+            ThrottledUploader.link_free_at = start + len(data) / 1024 ** 2 / self.mb_per_second
+        time.sleep(max(0.0, ThrottledUploader.link_free_at - time.perf_counter()))
+        return super().upload_part(upload_id, part_number, data)
+
+
+class FailingUploader(ThrottledUploader):
+    # Loses the connection once half of the parts were sent
+    fail_after = 0
+
+    def upload_part(self, upload_id, part_number, data):
+        if ThrottledUploader.parts_sent >= self.fail_after:
+            raise ConnectionError("connection lost")
+        return super().upload_part(upload_id, part_number, data)
+
+
+UPLOADERS["throttled"] = ThrottledUploader
+UPLOADERS["failing"] = FailingUploader
+
+
+def convert(geotiff_path, metadata_path, output_path, upload_options=None, **options):
+    converter = create_converter("enmap", geotiff_path, output_path, metadata_path=metadata_path,
+                                 writer_options={"upload": upload_options}, **OPTIONS, **options)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        converter.convert_geotiff()
+
+
+def upload_after(hdr_path, options):
+    upload_written(hdr_path, os.path.splitext(hdr_path)[0] + ".raw", options)
+
+
+def same_outputs(hdr_path, destination):
+    name = os.path.splitext(os.path.basename(hdr_path))[0]
+    return all(filecmp.cmp(os.path.splitext(hdr_path)[0] + ext, os.path.join(destination, name + ext), shallow=False)
+               for ext in (".hdr", ".raw"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=400)
+    parser.add_argument("--samples", type=int, default=400)
+    parser.add_argument("--mb-per-second", type=float, default=100.0)
+    parser.add_argument("--part-size-mb", type=int, default=4)
+    args = parser.parse_args()
+    ThrottledUploader.mb_per_second = args.mb_per_second
+
+    with tempfile.TemporaryDirectory() as directory:
+        geotiff_path, metadata_path = write_enmap_scene(directory, args.lines, args.samples)
+
+        before_path = os.path.join(directory, "before", "scene.hdr")
+        before_options = UploadOptions(destination=os.path.join(directory, "store-before"), uploader="throttled",
+                                       part_size_mb=args.part_size_mb)
+        os.makedirs(os.path.dirname(before_path))
+        start = time.perf_counter()
+        convert(geotiff_path, metadata_path, before_path)
+        upload_after(before_path, before_options)
+        before_time = time.perf_counter() - start
+
+        after_path = os.path.join(directory, "after", "scene.hdr")
+        after_options = before_options.model_copy(update={"destination": os.path.join(directory, "store-after")})
+        os.makedirs(os.path.dirname(after_path))
+        start = time.perf_counter()
+        convert(geotiff_path, metadata_path, after_path, upload_options=after_options)
+        after_time = time.perf_counter() - start
+
+        identical = same_outputs(before_path, before_options.destination) and \
+            same_outputs(after_path, after_options.destination)
+        mb = os.path.getsize(os.path.splitext(after_path)[0] + ".raw") / 1024 ** 2
+
+        resume_path = os.path.join(directory, "resume", "scene.hdr")
+        resume_options = after_options.model_copy(update={"destination": os.path.join(directory, "store-resume"),
+                                                          "uploader": "failing"})
+        os.makedirs(os.path.dirname(resume_path))
+        parts = -(-int(mb * 1024 ** 2) // (args.part_size_mb * 1024 ** 2))
+        ThrottledUploader.parts_sent = 0
+        FailingUploader.fail_after = parts // 2
+        try:
+            convert(geotiff_path, metadata_path, resume_path, upload_options=resume_options, resumable=True)
+            failed = False
+        except RuntimeError:
+            failed = True
+        ThrottledUploader.parts_sent = 0
+        convert(geotiff_path, metadata_path, resume_path, resumable=True,
+                upload_options=resume_options.model_copy(update={"uploader": "throttled"}))
+        resent = ThrottledUploader.parts_sent
+        resumed = failed and resent < parts and same_outputs(resume_path, resume_options.destination)
+
+    print(f"EnMap {args.lines}x{args.samples} ({mb:.1f} MB .raw, {OPTIONS}), "
+          f"uploaded at {args.mb_per_second:g} MB/s in {args.part_size_mb} MB parts")
+    print(f"    convert, then upload:     {before_time:8.3f} s")
+    print(f"    upload while converting:  {after_time:8.3f} s")
+    print(f"    same uploaded files: {identical}")
+    print(f"    resumed after a failure: {resumed} ({resent} of {parts} parts sent again)")
+    return 0 if identical and resumed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+DESCRIPTION: Benchmark of the envi-tools verify command over many converter outputs.
+             Headers are written with ENVIModel.to_header_string for EnMap-sized
+             cubes (224 bands with wavelength, fwhm, gain and offset lists) next to
+             sparse .raw files of the right size, and one pair in every hundred is
+             broken. Compares the time of verify_envi_file with opening every pair
+             with spectral (which parses the header and checks the file size too),
+             and checks that exactly the broken pairs are reported.
+
+USAGE:       python bench_verify.py [--files 2000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..")
+sys.path.append(os.path.join(REPO_DIR, "common"))
+sys.path.append(os.path.join(REPO_DIR, "envi-tools"))
+from ENVI import DataTypeEnum, ENVIModel, InterleaveEnum
+from verify import verify_envi_file
+
+BANDS = 224
+LINES = 1000
+SAMPLES = 1000
+# One pair in BROKEN_EVERY has a truncated data file
+BROKEN_EVERY = 100
+
+
+def write_outputs(directory, files):
+    envi = ENVIModel(
+        data_type=DataTypeEnum.INT16,
+        interleave=InterleaveEnum.BIL,
+        bands=BANDS,
+        lines=LINES,
+        samples=SAMPLES,
+        map_info="UTM, 1.000, 1.000, 500000.0, 6000000.0, 30.0, 30.0, 33, North, WGS-84",
+        wavelength=[418.4 + band * 9.1 for band in range(BANDS)],
+        fwhm=[6.5 if band < 91 else 10.0 for band in range(BANDS)],
+        data_gain_values=[0.0000128] * BANDS,
+        data_offset_values=[0.0] * BANDS,
+        wavelength_units="Nanometers",
+    )
+    header = envi.to_header_string()
+    size = BANDS * LINES * SAMPLES * 2
+    paths, broken = [], set()
+    for i in range(files):
+        hdr_path = os.path.join(directory, f"scene_{i:05d}.hdr")
+        with open(hdr_path, "w") as hdr_file:
+            hdr_file.write(header)
+        # Sparse files take no space on disk but report their full size
+        with open(os.path.splitext(hdr_path)[0] + ".raw", "wb") as raw_file:
+            raw_file.truncate(size - 2 if i % BROKEN_EVERY == 0 else size)
+        if i % BROKEN_EVERY == 0:
+            broken.add(hdr_path)
+        paths.append(hdr_path)
+    return paths, broken
+
+
+def spectral_open(hdr_path):
+    from spectral import envi
+    try:
+        envi.open(hdr_path)
+    except Exception:
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=2000, help="Number of header/raw pairs")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths, broken = write_outputs(directory, args.files)
+
+        start = time.perf_counter()
+        spectral_failed = {path for path in paths if not spectral_open(path)}
+        spectral_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        failed = {path for path in paths if verify_envi_file(path)}
+        verify_time = time.perf_counter() - start
+
+    print(f"{args.files} ENVI outputs, {len(broken)} broken")
+    print(f"    spectral envi.open: {spectral_time:8.3f} s | {args.files / spectral_time:8.0f} files/s | {len(spectral_failed)} failed")
+    print(f"    verify_envi_file:   {verify_time:8.3f} s | {args.files / verify_time:8.0f} files/s | {len(failed)} failed")
+    print(f"    broken pairs found: {failed == broken}")
+    return 0 if failed == broken else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
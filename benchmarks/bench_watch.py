@@ -0,0 +1,108 @@
+"""
+DESCRIPTION: Benchmark of the watch service of the batch converter against running a
+             converter by hand for every delivery. Synthetic deliveries of every
+             sensor are dropped into a folder and converted twice: each in a fresh
+             process, which imports rasterio/GDAL and the converter first, and by the
+             watch service, whose worker pool was warmed up once. The service must
+             tell the sensor of every delivery and write the same .raw as the fresh
+             processes.
+
+USAGE:       python bench_watch.py [--lines 100] [--samples 100] [--copies 2]
+"""
+import argparse
+import contextlib
+import filecmp
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from synthetic_scenes import SCENES, write_scene
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+sys.path.append(os.path.join(REPO_DIR, "common"))
+sys.path.append(os.path.join(REPO_DIR, "batch-converter"))
+from watch_folders import WatchService
+
+# What a person running a converter by hand pays for every delivery
+FRESH_PROCESS = """
+import sys
+sys.path.append({common!r})
+from converters import convert_scene
+convert_scene({sensor!r}, {geotiff_path!r}, {output_path!r}, metadata_path={metadata_path!r})
+"""
+
+
+def write_deliveries(drop_dir, names, copies, lines, samples):
+    # delivery path: (sensor, GeoTIFF or band file directory, metadata path)
+    deliveries = {}
+    for name in names:
+        for copy in range(copies):
+            delivery = os.path.join(drop_dir, f"{name}-{copy}")
+            os.makedirs(delivery)
+            deliveries[delivery] = write_scene(name, delivery, lines, samples)
+    return deliveries
+
+
+def convert_fresh(deliveries, output_dir):
+    seconds = []
+    for delivery, (sensor, geotiff_path, metadata_path) in deliveries.items():
+        output_path = os.path.join(output_dir, os.path.basename(delivery) + ".hdr")
+        script = FRESH_PROCESS.format(common=os.path.join(REPO_DIR, "common"), sensor=sensor,
+                                      geotiff_path=geotiff_path, output_path=output_path, metadata_path=metadata_path)
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", script], check=True, stdout=subprocess.DEVNULL)
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=100)
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--copies", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    names = list(SCENES)
+    with tempfile.TemporaryDirectory() as directory:
+        drop_dir = os.path.join(directory, "drop")
+        deliveries = write_deliveries(drop_dir, names, args.copies, args.lines, args.samples)
+
+        fresh_dir = os.path.join(directory, "fresh")
+        os.makedirs(fresh_dir)
+        fresh = convert_fresh(deliveries, fresh_dir)
+
+        watch_dir = os.path.join(directory, "watch")
+        results_path = os.path.join(directory, "watch_results.jsonl")
+        service = WatchService([drop_dir], watch_dir, results_path, workers=args.workers,
+                               poll_seconds=0.05, settle_seconds=0)
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            service.run(once=True)
+        watch_seconds = time.perf_counter() - start
+        with open(results_path) as results:
+            records = [json.loads(line) for line in results]
+
+        detected = all(record["sensor"] == deliveries[record["delivery"]][0] for record in records)
+        identical = len(records) == len(deliveries) and all(
+            record["status"] == "ok" and filecmp.cmp(
+                os.path.join(fresh_dir, os.path.basename(record["delivery"]) + ".raw"),
+                os.path.splitext(record["output_path"])[0] + ".raw", shallow=False)
+            for record in records
+        )
+
+    conversions = sum(record.get("duration", 0) for record in records)
+    print(f"{len(deliveries)} deliveries of {', '.join(names)} ({args.lines}x{args.samples})")
+    print(f"    fresh process per delivery:  {sum(fresh) / len(fresh):8.3f} s per delivery, {sum(fresh):8.3f} s in all")
+    print(f"    warm watch service:          {conversions / len(records):8.3f} s per delivery, "
+          f"{watch_seconds:8.3f} s in all with the pool start")
+    print(f"    sensors detected: {detected}")
+    print(f"    same .raw files: {identical}")
+    return 0 if detected and identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+DESCRIPTION: Writers of synthetic scenes shaped like the products of every supported
+             sensor, with random pixels and metadata laid out the way the converters
+             expect it. Used by the benchmarks, which must run offline.
+
+             - EnMap: one 224 band int16 GeoTIFF and a METADATA.XML holding the
+               bandCharacterisation of every band
+             - Hyperion: a directory of 242 single band int16 GeoTIFFs named _B###_
+             - Pixxel: one uint16 GeoTIFF and its XML metadata, in the v1 (wavelength
+               and FWHM lists) or v2 (one Bands element per band) layout
+             - WorldView-3: one uint16 GeoTIFF with its band list in the
+               TIFFTAG_IMAGEDESCRIPTION
+"""
+import os
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+ENMAP_VNIR_BANDS = 91
+ENMAP_SWIR_BANDS = 133
+HYPERION_BANDS = 242
+PIXXEL_BANDS = 150
+# Pixxel v2 metadata also lists bands that are not in the image, with a status of 0
+PIXXEL_DISABLED_BANDS = 4
+# Band numbers of the WorldView-3 VNIR multispectral bands (see WORLDVIEW_WAVELENGTH_LIST)
+WORLDVIEW3_BAND_LIST = [2, 3, 4, 5, 6, 7, 8, 9]
+
+
+def write_geotiff(path, data, crs, resolution, interleave="band", **profile):
+    bands, lines, samples = data.shape
+    with rasterio.open(path, "w", driver="GTiff", height=lines, width=samples, count=bands, dtype=data.dtype,
+                       crs=crs, transform=from_origin(500000, 5000000, resolution, resolution),
+                       interleave=interleave, **profile) as dst:
+        dst.write(data)
+    return path
+
+
+def random_cube(bands, lines, samples, dtype, low, high, seed):
+    # Written band by band, so a scene never needs more than one band of extra memory
+    rng = np.random.default_rng(seed)
+    cube = np.empty((bands, lines, samples), dtype=dtype)
+    for band in range(bands):
+        cube[band] = rng.integers(low, high, size=(lines, samples), dtype=dtype)
+    return cube
+
+
+def write_enmap_scene(directory, lines, samples, interleave="band"):
+    bands = ENMAP_VNIR_BANDS + ENMAP_SWIR_BANDS
+    geotiff_path = write_geotiff(
+        os.path.join(directory, "ENMAP01-____L2A-DT0000000000_SPECTRAL_IMAGE.TIF"),
+        random_cube(bands, lines, samples, np.int16, -32768, 32767, seed=0),
+        "EPSG:32633", 30, interleave,
+    )
+    wavelengths = np.concatenate([np.linspace(418.4, 993.0, ENMAP_VNIR_BANDS), np.linspace(902.5, 2445.5, ENMAP_SWIR_BANDS)])
+    metadata_path = os.path.join(directory, "ENMAP01-____L2A-DT0000000000_METADATA.XML")
+    with open(metadata_path, "w") as metadata_file:
+        metadata_file.write('<?xml version="1.0" encoding="UTF-8"?>\n<level_X>\n  <specific>\n')
+        metadata_file.write(f'    <numberOfBands>{bands}</numberOfBands>\n    <bandCharacterisation>\n')
+        for number, wavelength in enumerate(wavelengths, start=1):
+            metadata_file.write(
+                f'      <bandID number="{number}">\n'
+                f'        <wavelengthCenterOfBand>{wavelength:.4f}</wavelengthCenterOfBand>\n'
+                f'        <FWHMOfBand>{6.5 if number <= ENMAP_VNIR_BANDS else 10.0:.4f}</FWHMOfBand>\n'
+                f'        <GainOfBand>0.0000128</GainOfBand>\n'
+                f'        <OffsetOfBand>0</OffsetOfBand>\n'
+                f'      </bandID>\n'
+            )
+        metadata_file.write('    </bandCharacterisation>\n  </specific>\n</level_X>\n')
+    return geotiff_path, metadata_path
+
+
+def write_hyperion_scene(directory, lines, samples):
+    scene_dir = os.path.join(directory, "EO1H0440342002212110PY")
+    os.makedirs(scene_dir, exist_ok=True)
+    rng = np.random.default_rng(1)
+    for band in range(1, HYPERION_BANDS + 1):
+        data = rng.integers(0, 16000, size=(1, lines, samples), dtype=np.int16)
+        write_geotiff(os.path.join(scene_dir, f"EO1H0440342002212110PY_B{band:03d}_L1T.TIF"), data, "EPSG:32611", 30)
+    return scene_dir, None
+
+
+def write_pixxel_scene(directory, lines, samples, layout="v2", interleave="pixel"):
+    geotiff_path = write_geotiff(
+        os.path.join(directory, f"pixxel_{layout}.tif"),
+        random_cube(PIXXEL_BANDS, lines, samples, np.uint16, 0, 4096, seed=2),
+        "EPSG:32643", 5, interleave,
+    )
+    wavelengths = np.linspace(470.0, 900.0, PIXXEL_BANDS + PIXXEL_DISABLED_BANDS)
+    metadata_path = os.path.join(directory, f"pixxel_{layout}.xml")
+    with open(metadata_path, "w") as metadata_file:
+        metadata_file.write('<?xml version="1.0" encoding="UTF-8"?>\n<Metadata>\n')
+        if layout == "v1":
+            metadata_file.write(
+                '  <Wavelength_list unit="nm">{' + ",".join(f"{w:.3f}" for w in wavelengths[:PIXXEL_BANDS]) + ",}</Wavelength_list>\n"
+                "  <FWHM_list>{" + ",".join("9.500" for _ in range(PIXXEL_BANDS)) + "}</FWHM_list>\n"
+            )
+        else:
+            for number, wavelength in enumerate(wavelengths):
+                metadata_file.write(
+                    f'  <Bands>\n    <Band_Number>{number + 1}</Band_Number>\n'
+                    f'    <Status>{1 if number < PIXXEL_BANDS else 0}</Status>\n'
+                    f'    <Central_Wavelength unit="nm">{wavelength:.3f}</Central_Wavelength>\n'
+                    f'    <Bandwidth unit="nm">9.500</Bandwidth>\n  </Bands>\n'
+                )
+        metadata_file.write("</Metadata>\n")
+    return geotiff_path, metadata_path
+
+
+def write_worldview3_scene(directory, lines, samples, interleave="pixel"):
+    geotiff_path = os.path.join(directory, "worldview3.tif")
+    write_geotiff(
+        geotiff_path,
+        random_cube(len(WORLDVIEW3_BAND_LIST), lines, samples, np.uint16, 0, 2048, seed=3),
+        "EPSG:32610", 1.24, interleave,
+    )
+    band_list = "".join(f"  {band};\n" for band in WORLDVIEW3_BAND_LIST)
+    with rasterio.open(geotiff_path, "r+") as dst:
+        dst.update_tags(TIFFTAG_IMAGEDESCRIPTION="{\n  bandList = \n  [\n" + band_list + "]\n}")
+    return geotiff_path, None
+
+
+# scene name: (sensor, writer, writer keyword arguments)
+SCENES = {
+    "enmap": ("enmap", write_enmap_scene, {}),
+    "hyperion": ("hyperion", write_hyperion_scene, {}),
+    "pixxel-v1": ("pixxel", write_pixxel_scene, {"layout": "v1"}),
+    "pixxel-v2": ("pixxel", write_pixxel_scene, {"layout": "v2"}),
+    "worldview3": ("worldview3", write_worldview3_scene, {}),
+}
+
+
+def write_scene(name, directory, lines, samples):
+    # Returns the sensor, the GeoTIFF (or band file directory) and the metadata path of a scene
+    sensor, writer, kwargs = SCENES[name]
+    geotiff_path, metadata_path = writer(directory, lines, samples, **kwargs)
+    return sensor, geotiff_path, metadata_path
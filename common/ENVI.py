@@ -1,10 +1,10 @@
 # ==================================================================================
 #                           ENVI Constants and Specification
 #
-# DESCRIPTION: This file contains an ENVI file model used in converting Hyperion
-#              EO-1 GeoTIFF files to ENVI.
+# DESCRIPTION: This file contains an ENVI file model used by the converters when
+#              writing ENVI files.
 #
-# SOURCE:      https://developers.google.com/earth-engine/datasets/catalog/EO1_HYPERION
+# SOURCE:      https://www.nv5geospatialsoftware.com/docs/ENVIHeaderFiles.html
 #
 # ==================================================================================
 
@@ -41,12 +41,15 @@ class DataTypeEnum(Enum):
 
 DATA_TYPES = {
     "byte": DataTypeEnum.BYTE,
+    "uint8": DataTypeEnum.BYTE,
     "int16": DataTypeEnum.INT16,
     "int32": DataTypeEnum.INT32,
     "float32": DataTypeEnum.FLOAT32,
     "float64": DataTypeEnum.FLOAT64,
     "complex": DataTypeEnum.COMPLEX,
-    "complex64": DataTypeEnum.COMPLEX64,
+    # numpy/rasterio name complex types by their total width, ENVI by their parts
+    "complex64": DataTypeEnum.COMPLEX,
+    "complex128": DataTypeEnum.COMPLEX64,
     "uint16": DataTypeEnum.UINT16,
     "uint32": DataTypeEnum.UINT32,
     "int64": DataTypeEnum.INT64,
@@ -54,6 +57,25 @@ DATA_TYPES = {
 }
 
 
+TRANSPOSE_MAP = {
+    # BIP (Band Interleaved by Pixel): Format is (line, sample, band).
+    (InterleaveEnum.BIP, InterleaveEnum.BIP): (0, 1, 2),
+    (InterleaveEnum.BIP, InterleaveEnum.BIL): (0, 2, 1),
+    (InterleaveEnum.BIP, InterleaveEnum.BSQ): (2, 0, 1),
+    # BIL (Band Interleaved by Line): Format is (line, band, sample).
+    (InterleaveEnum.BIL, InterleaveEnum.BIL): (0, 1, 2),
+    (InterleaveEnum.BIL, InterleaveEnum.BIP): (0, 2, 1),
+    (InterleaveEnum.BIL, InterleaveEnum.BSQ): (1, 0, 2),
+    # BSQ (Band Sequential): Format is (band, line, sample).
+    (InterleaveEnum.BSQ, InterleaveEnum.BSQ): (0, 1, 2),
+    (InterleaveEnum.BSQ, InterleaveEnum.BIP): (1, 2, 0),
+    (InterleaveEnum.BSQ, InterleaveEnum.BIL): (1, 0, 2),
+}
+
+# Header values that ENVI expects to be wrapped in curly brackets
+BRACED_KEYS = ("map info", "coordinate system string", "description")
+
+
 # https://www.nv5geospatialsoftware.com/docs/ENVIHeaderFiles.html
 class ENVIModel(BaseModel):
     #############################
@@ -115,8 +137,16 @@ class ENVIModel(BaseModel):
 
     coordinate_system_string: str = ""
 
+    # Gain and offset of each band, which turn the stored values into physical values
+    # with gain * value + offset. Lets integer data be stored at its native width.
+    data_gain_values: list = []
+
     # Pixel values that should be ignored in image processing.
-    data_ignore_value: int = 0
+    # None leaves the field out of the header.
+    data_ignore_value: int | None = 0
+
+    # See data_gain_values.
+    data_offset_values: list = []
 
     # Lists full-width-half-maximum (FWHM) values of each band in an image.
     # Units should be the same as those used for wavelength and set in the wavelength units parameter.
@@ -169,8 +199,6 @@ class ENVIModel(BaseModel):
     # cloud_cover: float = ""
     # color_table: list[int] = ""
     # complex_function: str = ""
-    # data_gain_values: list[float] = ""
-    # data_offset_values: list[float] = ""
     # data_reflectance_gain_values: list[float] = ""
     # data_reflectance_offset_values: list[float] = ""
     # default_bands: str = ""
@@ -208,15 +236,22 @@ class ENVIModel(BaseModel):
 
         return {
             " ".join(key.split("_")): map_val(value)
-            for key, value in super().dict().items()
+            for key, value in super().model_dump().items()
         }
 
     def to_header_string(self):
-        def map_val(val):
+        def map_val(key, val):
             if isinstance(val, list):
                 return "{ " + ", ".join(map(str, val)) + " }"
+            if key in BRACED_KEYS:
+                return "{" + str(val) + "}"
             return val
 
+        # Optional fields that were never set are left out of the header
         return "ENVI\n" + "\n".join(
-            [f"{key} = {map_val(value)}" for key, value in self.dict().items()]
+            [
+                f"{key} = {map_val(key, value)}"
+                for key, value in self.dict().items()
+                if value is not None and value != "" and value != []
+            ]
         )
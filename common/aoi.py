@@ -0,0 +1,105 @@
+# ==================================================================================
+#                           AREA OF INTEREST
+#
+# DESCRIPTION: This file contains the spatial cropping shared by the converters.
+#              An area of interest is a bounding box or a polygon, in the CRS of
+#              the scene or in any other CRS (e.g. EPSG:4326 for lon/lat). It is
+#              turned into the pixel window of the scene it covers before any pixel
+#              is read, so only that window is decoded, and the map info of the
+#              output is moved to the origin of the cropped grid. A polygon is
+#              cropped to its bounding box; the pixels of the box outside of it are
+#              kept.
+#
+# ==================================================================================
+import math
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel
+from rasterio.errors import WindowError
+from rasterio.warp import transform_bounds, transform_geom
+from rasterio.windows import Window, from_bounds, transform as window_transform
+
+# Points added along every edge of a bounding box reprojected to the scene CRS, so
+# the curved edges of the reprojected box are still covered
+DENSIFY_POINTS = 21
+
+
+class AOI(BaseModel):
+    # (min x, min y, max x, max y), e.g. (min lon, min lat, max lon, max lat)
+    bbox: Optional[Tuple[float, float, float, float]] = None
+    # (x, y) vertices of a polygon, e.g. (lon, lat)
+    polygon: Optional[List[Tuple[float, float]]] = None
+    # CRS of the coordinates, the CRS of the scene when empty
+    crs: Optional[str] = None
+
+    def bounds(self, dst_crs):
+        """The (min x, min y, max x, max y) of the area of interest in dst_crs."""
+        if (self.bbox is None) == (self.polygon is None):
+            raise ValueError("An area of interest takes either a bbox or a polygon")
+        if self.polygon is not None:
+            points = self.polygon
+            if self.crs:
+                geometry = {"type": "Polygon", "coordinates": [list(points) + [points[0]]]}
+                points = transform_geom(self.crs, dst_crs, geometry)["coordinates"][0]
+            xs, ys = [point[0] for point in points], [point[1] for point in points]
+            return min(xs), min(ys), max(xs), max(ys)
+        if self.crs:
+            return transform_bounds(self.crs, dst_crs, *self.bbox, densify_pts=DENSIFY_POINTS)
+        return self.bbox
+
+
+def as_aoi(aoi) -> Optional[AOI]:
+    # Converter options may hold the area of interest as a dict, e.g. in a batch manifest
+    if aoi is None or isinstance(aoi, AOI):
+        return aoi
+    return AOI(**aoi)
+
+
+def aoi_from(bbox=None, polygon=None, crs=None) -> Optional[AOI]:
+    # An AOI from the settings of a converter, None (the whole scene) when both are empty.
+    # polygon may be a list of (x, y) vertices or a flat list of coordinates.
+    if not (bbox or polygon):
+        return None
+    if polygon and not isinstance(polygon[0], (list, tuple)):
+        polygon = list(zip(polygon[0::2], polygon[1::2]))
+    return AOI(bbox=bbox or None, polygon=polygon or None, crs=crs or None)
+
+
+def parse_coordinates(text: str) -> list:
+    # "10.1,45.2,10.3,45.4" -> [10.1, 45.2, 10.3, 45.4]
+    return [float(value) for value in (text or "").split(",") if value.strip()]
+
+
+def full_window(src) -> Window:
+    return Window(0, 0, src.width, src.height)
+
+
+def is_full_window(src, window: Window) -> bool:
+    return window is None or (
+        window.col_off == 0 and window.row_off == 0 and window.width == src.width and window.height == src.height
+    )
+
+
+def aoi_window(src, aoi: AOI = None) -> Window:
+    """
+    The window of whole pixels of src covering the area of interest, the whole scene
+    without one. Raises ValueError when the area of interest is outside of the scene.
+    """
+    if aoi is None:
+        return full_window(src)
+    window = from_bounds(*aoi.bounds(src.crs), transform=src.transform)
+    # Every pixel the area of interest touches is kept
+    col_off, row_off = math.floor(window.col_off + 1e-9), math.floor(window.row_off + 1e-9)
+    col_end = math.ceil(window.col_off + window.width - 1e-9)
+    row_end = math.ceil(window.row_off + window.height - 1e-9)
+    try:
+        return Window(col_off, row_off, col_end - col_off, row_end - row_off).intersection(full_window(src))
+    except WindowError:
+        raise ValueError(f"The area of interest {aoi.model_dump(exclude_none=True)} does not overlap the scene")
+
+
+def cropped_transform(src, window: Window = None):
+    # The geotransform of the cropped grid, whose origin is the corner of the window
+    if window is None:
+        return src.transform
+    return window_transform(window, src.transform)
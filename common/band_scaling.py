@@ -0,0 +1,85 @@
+# ==================================================================================
+#                           BAND SCALING
+#
+# DESCRIPTION: This file contains the radiometric scaling stage shared by the
+#              converters. Every band is mapped with (value + offset) / divisor,
+#              computed in float32 one chunk at a time into preallocated buffers
+#              so the full cube is never promoted to float64 or copied wholesale.
+#
+# ==================================================================================
+import numpy as np
+
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024
+
+
+class BandScaler:
+    def __init__(self, offsets, divisors):
+        self.offsets = np.asarray(offsets, dtype=np.float32)
+        self.divisors = np.asarray(divisors, dtype=np.float32)
+        if self.offsets.shape != self.divisors.shape:
+            raise ValueError("offsets and divisors must have one value per band")
+        self.bands = len(self.offsets)
+        self._has_offset = bool(np.any(self.offsets != 0))
+        self._has_divisor = bool(np.any(self.divisors != 1))
+        self._scratch = np.empty(0, dtype=np.float32)
+
+    @classmethod
+    def uniform(cls, bands: int, offset: float = 0.0, divisor: float = 1.0):
+        return cls(np.full(bands, offset), np.full(bands, divisor))
+
+    @staticmethod
+    def _broadcast(values: np.ndarray, ndim: int, band_axis: int):
+        shape = [1] * ndim
+        shape[band_axis] = len(values)
+        return values.reshape(shape)
+
+    def header_values(self):
+        """
+        The ENVI data gain values and data offset values (value * gain + offset) of the
+        scaling, for data written unscaled at its native width.
+        """
+        divisors = self.divisors.astype(np.float64)
+        return (1.0 / divisors).tolist(), (self.offsets.astype(np.float64) / divisors).tolist()
+
+    def apply(self, chunk: np.ndarray, band_axis: int, out: np.ndarray = None, bands=None):
+        """
+        Scales a single chunk into out. Without out, the result is written to a scratch
+        buffer owned by the scaler, which is only valid until the next call to apply.
+        bands selects which of the scaler's bands the chunk holds, all of them by default.
+        """
+        offsets, divisors = self.offsets, self.divisors
+        if bands is not None:
+            offsets, divisors = offsets[bands], divisors[bands]
+        if chunk.shape[band_axis] != len(offsets):
+            raise ValueError(f"Expected {len(offsets)} bands on axis {band_axis}, got {chunk.shape[band_axis]}")
+        if out is None:
+            if self._scratch.size < chunk.size:
+                self._scratch = np.empty(chunk.size, dtype=np.float32)
+            out = self._scratch[:chunk.size].reshape(chunk.shape)
+
+        # The cast is exact for integer sources up to 24 bits, so the arithmetic below
+        # matches the element-wise float32 results the converters produced before.
+        # chunk may already be out, when the data was read straight into it.
+        if chunk is not out:
+            np.copyto(out, chunk, casting="unsafe")
+        if self._has_offset:
+            np.add(out, self._broadcast(offsets, out.ndim, band_axis), out=out)
+        if self._has_divisor:
+            np.divide(out, self._broadcast(divisors, out.ndim, band_axis), out=out)
+        return out
+
+    def apply_chunked(self, data: np.ndarray, band_axis: int, out: np.ndarray = None,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Scales a whole array slab by slab along its first non-band axis. out may be data
+        itself when data is already float32, in which case it is scaled in place.
+        """
+        if out is None:
+            out = np.empty(data.shape, dtype=np.float32)
+        axis = 1 if band_axis == 0 else 0
+        slab_bytes = max(1, out.nbytes // max(1, out.shape[axis]))
+        step = max(1, chunk_size // slab_bytes)
+        for start in range(0, data.shape[axis], step):
+            index = (slice(None),) * axis + (slice(start, start + step),)
+            self.apply(data[index], band_axis, out=out[index])
+        return out
@@ -0,0 +1,99 @@
+# ==================================================================================
+#                           BAND SELECTION
+#
+# DESCRIPTION: This file contains the spectral subsetting shared by the converters.
+#              A selection keeps a wavelength range, a list of band numbers, or
+#              every band but an exclusion list (band numbers and/or wavelength
+#              ranges, e.g. the water absorption bands). The converters resolve it
+#              against the wavelengths of the metadata before any pixel is read,
+#              pass only the selected band indexes to rasterio and trim the
+#              wavelength and fwhm lists of the header to match, so the bands that
+#              are not wanted are never read.
+#
+# ==================================================================================
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel
+
+
+class BandSelection(BaseModel):
+    # Inclusive (min, max) wavelengths to keep, in the units of the metadata (nm)
+    wavelength_range: Optional[Tuple[float, float]] = None
+    # Band numbers to keep, counted from 1 as in the source
+    bands: Optional[List[int]] = None
+    # Band numbers to drop
+    exclude_bands: List[int] = []
+    # Inclusive (min, max) wavelengths to drop
+    exclude_wavelength_ranges: List[Tuple[float, float]] = []
+
+    def select(self, wavelengths: list, numbers: list = None) -> list:
+        """
+        The positions (counted from 0, in source order) of the bands with the given
+        wavelengths and band numbers (1 to the number of bands by default) that the
+        selection keeps. Raises ValueError when it keeps none of them.
+        """
+        numbers = list(numbers) if numbers is not None else list(range(1, len(wavelengths) + 1))
+        if self.bands is not None:
+            unknown = sorted(set(self.bands) - set(numbers))
+            if unknown:
+                raise ValueError(f"Selected bands {unknown} are not among the bands of the scene")
+        positions = []
+        for position, (number, wavelength) in enumerate(zip(numbers, wavelengths)):
+            if self.bands is not None and number not in self.bands:
+                continue
+            if self.wavelength_range is not None and not in_range(wavelength, self.wavelength_range):
+                continue
+            if number in self.exclude_bands:
+                continue
+            if any(in_range(wavelength, excluded) for excluded in self.exclude_wavelength_ranges):
+                continue
+            positions.append(position)
+        if not positions:
+            raise ValueError(f"The band selection {self.model_dump(exclude_defaults=True)} keeps none of the bands")
+        return positions
+
+
+def in_range(value: float, bounds: tuple) -> bool:
+    return min(bounds) <= value <= max(bounds)
+
+
+def band_selection_from(wavelength_range=None, bands=None, exclude_bands=None, exclude_wavelength_ranges=None):
+    # A BandSelection from the settings of a converter, None (every band) when all are empty
+    if not (wavelength_range or bands or exclude_bands or exclude_wavelength_ranges):
+        return None
+    return BandSelection(
+        wavelength_range=wavelength_range or None,
+        bands=bands or None,
+        exclude_bands=exclude_bands or [],
+        exclude_wavelength_ranges=exclude_wavelength_ranges or [],
+    )
+
+
+def as_band_selection(selection) -> Optional[BandSelection]:
+    # Converter options may hold the selection as a dict, e.g. in a batch manifest
+    if selection is None or isinstance(selection, BandSelection):
+        return selection
+    return BandSelection(**selection)
+
+
+def parse_ranges(text: str) -> list:
+    # "400-1000,1500" -> [(400.0, 1000.0), (1500.0, 1500.0)]
+    ranges = []
+    for part in filter(None, (part.strip() for part in (text or "").split(","))):
+        low, _, high = part.partition("-")
+        ranges.append((float(low), float(high or low)))
+    return ranges
+
+
+def parse_band_numbers(text: str) -> list:
+    # "8-57,77" -> [8, 9, ..., 57, 77]
+    return [number for low, high in parse_ranges(text) for number in range(int(low), int(high) + 1)]
+
+
+def source_band_count(src, indexes: list = None) -> int:
+    """The bands of the output, raising when indexes refers to bands the GeoTIFF does not have."""
+    if indexes is None:
+        return src.count
+    if max(indexes) > src.count:
+        raise ValueError(f"The band selection refers to band {max(indexes)}, the GeoTIFF has {src.count} bands")
+    return len(indexes)
@@ -0,0 +1,127 @@
+# ==================================================================================
+#                           CHECKSUMS
+#
+# DESCRIPTION: This file contains the checksums computed while the .raw is being
+#              written, and the manifest they are saved to beside the .hdr. Every
+#              block of the .raw is hashed as soon as written_blocks.py hands it out
+#              in file order, while it is still in the page cache, so the .raw is
+#              not read from disk again. Blocks never reported as written (e.g.
+#              chunks kept from a resumed run) are hashed when the file is closed.
+#
+#              The manifest holds:
+#
+#              - raw: the size and SHA-256 of the whole .raw, which is what an
+#                upload or a dedup compares
+#              - header: the SHA-256 of the .hdr written with it
+#              - bands: the CRC-32 of every band, taken over its values in (line,
+#                sample) order, so the same band has the same checksum whatever the
+#                interleave of the file
+#
+#              File names are left out of the manifest, so it stays valid when the
+#              outputs are renamed (e.g. placed from the conversion cache).
+#
+# ==================================================================================
+import hashlib
+import json
+import os
+import zlib
+from typing import List
+
+import numpy as np
+from pydantic import BaseModel
+
+from ENVI import InterleaveEnum
+
+MANIFEST_EXT = ".checksums"
+FILE_ALGORITHM = "sha256"
+BAND_ALGORITHM = "crc32"
+# Bytes read at a time when a whole file is hashed
+FILE_BLOCK_BYTES = 16 * 1024 * 1024
+
+
+def manifest_path(hdr_path: str):
+    return os.path.splitext(hdr_path)[0] + MANIFEST_EXT
+
+
+class FileChecksum(BaseModel):
+    algorithm: str = FILE_ALGORITHM
+    checksum: str
+    size: int
+
+
+class BandChecksums(BaseModel):
+    algorithm: str = BAND_ALGORITHM
+    # numpy dtype string of the values, with their byte order, e.g. "<f4"
+    dtype: str
+    checksums: List[str]
+
+
+class ChecksumManifest(BaseModel):
+    raw: FileChecksum
+    header: FileChecksum
+    bands: BandChecksums
+
+    def write(self, path: str):
+        # Written beside and renamed, so a manifest is never found half written
+        with open(path + ".tmp", "w") as manifest_file:
+            manifest_file.write(self.model_dump_json(indent=2) + "\n")
+        os.replace(path + ".tmp", path)
+
+
+def read_manifest(path: str) -> ChecksumManifest:
+    with open(path) as manifest_file:
+        return ChecksumManifest(**json.load(manifest_file))
+
+
+def file_checksum(path: str, block_bytes: int = FILE_BLOCK_BYTES) -> FileChecksum:
+    file_hash = hashlib.new(FILE_ALGORITHM)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_bytes), b""):
+            file_hash.update(block)
+    return FileChecksum(checksum=file_hash.hexdigest(), size=os.path.getsize(path))
+
+
+class StreamingChecksums:
+    """
+    Checksums of a .raw of the given layout, fed with its blocks in file order (see
+    written_blocks.py) from its memmap.
+    """
+    def __init__(self, interleave: InterleaveEnum, bands: int, lines: int, samples: int, dtype):
+        self.interleave = InterleaveEnum(interleave)
+        self.bands, self.lines, self.samples = bands, lines, samples
+        self.dtype = np.dtype(dtype)
+        self._file_hash = hashlib.new(FILE_ALGORITHM)
+        self._band_crcs = [0] * bands
+        self._scratch = np.empty(0, dtype=self.dtype)
+
+    def manifest(self, hdr_path: str) -> ChecksumManifest:
+        return ChecksumManifest(
+            raw=FileChecksum(
+                checksum=self._file_hash.hexdigest(),
+                size=self.bands * self.lines * self.samples * self.dtype.itemsize,
+            ),
+            header=file_checksum(hdr_path),
+            bands=BandChecksums(dtype=self.dtype.str, checksums=[f"{crc:08x}" for crc in self._band_crcs]),
+        )
+
+    def update(self, raw: np.ndarray, band: int, lines: slice) -> int:
+        """Hashes the next block of the .raw, the lines of one band for BSQ (of every band otherwise)."""
+        if band is not None:
+            # A BSQ block is the contiguous lines of a single band
+            data = raw[band, lines]
+            self._file_hash.update(data)
+            self._band_crcs[band] = zlib.crc32(data, self._band_crcs[band])
+            return data.nbytes
+
+        data = raw[lines]
+        self._file_hash.update(data)
+        # The bands are gathered into a (band, line, sample) copy, so every band is contiguous
+        height = lines.stop - lines.start
+        size = self.bands * height * self.samples
+        if self._scratch.size < size:
+            self._scratch = np.empty(size, dtype=self.dtype)
+        bsq = self._scratch[:size].reshape(self.bands, height, self.samples)
+        bsq[...] = np.transpose(data, (1, 0, 2) if self.interleave == InterleaveEnum.BIL else (2, 0, 1))
+        for b in range(self.bands):
+            self._band_crcs[b] = zlib.crc32(bsq[b], self._band_crcs[b])
+        return data.nbytes
@@ -0,0 +1,105 @@
+# ==================================================================================
+#                           CHUNK JOURNAL
+#
+# DESCRIPTION: This file contains the journal that makes conversions resumable.
+#              It lives beside the .hdr while the .raw is being written and holds
+#              the fingerprint of the inputs and parameters on its first line,
+#              followed by one line per chunk once that chunk is on disk. A rerun
+#              with the same fingerprint skips every chunk already listed.
+#
+# ==================================================================================
+import json
+import os
+
+JOURNAL_EXT = ".journal"
+
+
+def journal_path(hdr_path: str):
+    return os.path.splitext(hdr_path)[0] + JOURNAL_EXT
+
+
+def journal_fingerprint(paths: list, **params):
+    """
+    Identifies a conversion by its input files (path, size and modification time) and
+    every parameter that changes the bytes written, so a journal is only ever resumed
+    by the exact same conversion.
+    """
+    files = []
+    for path in paths:
+        if path:
+            stat = os.stat(path)
+            files.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+    return {"files": files, "params": params}
+
+
+def window_key(window):
+    return f"{window.row_off},{window.col_off},{window.height},{window.width}"
+
+
+class ChunkJournal:
+    def __init__(self, path: str, fingerprint: dict):
+        self.path = path
+        self.fingerprint = json.loads(json.dumps(fingerprint))
+        self.done = set()
+        self._file = None
+
+    def open(self, resume: bool) -> bool:
+        """
+        Resumes the journal when asked to and it was written for the same fingerprint,
+        otherwise starts an empty one. Returns whether it was resumed.
+        """
+        done = self.read() if resume else None
+        if done is not None:
+            self.done = done
+            # Cuts off a line cut short by a crash, which read has already dropped, so it
+            # is never completed by the next key written
+            self._truncate_partial_line()
+            self._file = open(self.path, "a")
+            print(f"Resuming conversion, {len(self.done)} chunks already written")
+            return True
+
+        self.done = set()
+        self._file = open(self.path, "w")
+        self._file.write(json.dumps(self.fingerprint) + "\n")
+        self._sync()
+        return False
+
+    def read(self):
+        if not os.path.isfile(self.path):
+            return None
+        with open(self.path) as journal:
+            # Only lines ending in a newline were written completely
+            lines = journal.read().split("\n")[:-1]
+        try:
+            if not lines or json.loads(lines[0]) != self.fingerprint:
+                return None
+        except ValueError:
+            return None
+        return {line for line in lines[1:] if line}
+
+    def _truncate_partial_line(self):
+        with open(self.path, "rb+") as journal:
+            content = journal.read()
+            journal.truncate(content.rfind(b"\n") + 1)
+
+    def is_done(self, key: str) -> bool:
+        return key in self.done
+
+    def mark_done(self, key: str):
+        self.done.add(key)
+        self._file.write(key + "\n")
+        self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        self.close()
+        if os.path.isfile(self.path):
+            os.remove(self.path)
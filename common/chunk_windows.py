@@ -0,0 +1,47 @@
+# ==================================================================================
+#                           CHUNK WINDOWS
+#
+# DESCRIPTION: This file contains the window iteration shared by the streaming
+#              converters, so a GeoTIFF can be processed one bounded chunk at a
+#              time instead of being read into memory as a whole, optionally
+#              limited to a region of it.
+#
+# ==================================================================================
+from rasterio.windows import Window
+
+
+def iter_chunk_windows(src, chunk_size: int, pixel_bytes: int, region: Window = None):
+    """
+    Yields windows that follow the internal block layout of the GeoTIFF. Striped files
+    have consecutive strips merged, tiled files have tiles split by rows, so that a
+    window never holds more than chunk_size bytes (or a single row of a block). With a
+    region (e.g. an area of interest), only the parts of the blocks inside it are
+    yielded.
+    """
+    if region is None:
+        region = Window(0, 0, src.width, src.height)
+    row_end = region.row_off + region.height
+    col_end = region.col_off + region.width
+    block_height, block_width = src.block_shapes[0]
+    if block_width >= src.width:
+        rows = max(1, chunk_size // (region.width * pixel_bytes))
+        if rows >= block_height:
+            rows -= rows % block_height
+        for row_off in range(region.row_off, row_end, rows):
+            yield Window(region.col_off, row_off, region.width, min(rows, row_end - row_off))
+    else:
+        for _, block in src.block_windows(1):
+            if (block.row_off >= row_end or block.col_off >= col_end
+                    or block.row_off + block.height <= region.row_off or block.col_off + block.width <= region.col_off):
+                continue
+            block = block.intersection(region)
+            rows = max(1, chunk_size // (block.width * pixel_bytes))
+            for row_off in range(0, block.height, rows):
+                yield Window(block.col_off, block.row_off + row_off, block.width, min(rows, block.height - row_off))
+
+
+def relative_window(window: Window, region: Window = None) -> Window:
+    # The window with its offsets counted from the corner of region, i.e. in the output
+    if region is None:
+        return window
+    return Window(window.col_off - region.col_off, window.row_off - region.row_off, window.width, window.height)
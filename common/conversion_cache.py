@@ -0,0 +1,176 @@
+# ==================================================================================
+#                           CONVERSION CACHE
+#
+# DESCRIPTION: This file contains an opt-in cache of finished conversions, so a
+#              scene that is converted again with the same settings is linked
+#              (or copied) from the cache instead of being converted. Entries are
+#              keyed by a fingerprint of the input files, the converter and its
+#              options, and evicted in least recently used order once the cache
+#              grows past its size limit.
+#
+# ==================================================================================
+import functools
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from converters import path_size
+
+# Bumped whenever the layout of the cache entries or of their keys changes
+CACHE_VERSION = 2
+# Bytes hashed at the start, middle and end of every input with hash_inputs
+HASH_SAMPLE_SIZE = 1024 * 1024
+DEFAULT_MAX_SIZE_GB = 50
+COMMON_DIR = os.path.dirname(os.path.realpath(__file__))
+
+
+def fast_hash(path: str):
+    """
+    Hashes the size and three samples of a file instead of its whole content, which
+    tells apart different deliveries of a scene without reading GBs of pixels.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, "rb") as f:
+        for offset in sorted({0, max(0, size // 2 - HASH_SAMPLE_SIZE // 2), max(0, size - HASH_SAMPLE_SIZE)}):
+            f.seek(offset)
+            digest.update(f.read(HASH_SAMPLE_SIZE))
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def source_hash(*directories: str):
+    """
+    Hashes the Python sources of directories, i.e. the code a conversion runs. Taken
+    once per process, as the code that is loaded does not change while it runs.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for directory in directories:
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".py"):
+                with open(os.path.join(directory, name), "rb") as f:
+                    digest.update(name.encode())
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+class ConversionCache:
+    def __init__(self, directory: str, max_size_gb: float = DEFAULT_MAX_SIZE_GB, hash_inputs: bool = False,
+                 link: bool = True):
+        self.directory = directory
+        self.max_size = int(max_size_gb * 1024 ** 3)
+        self.hash_inputs = hash_inputs
+        self.link = link
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, converter_class, inputs: list, options: dict):
+        """
+        Without hash_inputs the inputs are identified by path, size and modification time.
+        With it, by size, modification time and fast_hash, so the same files at another
+        path also hit, as long as they were copied with their modification time. The
+        sources of the converter directory and of the shared code writing the outputs are
+        part of the key, so code changes miss.
+        """
+        files = []
+        for path in inputs:
+            if self.hash_inputs:
+                # A file reprocessed in place keeps its size and may keep the sampled blocks
+                stat = os.stat(path)
+                files.append([stat.st_size, stat.st_mtime_ns, fast_hash(path)])
+            else:
+                stat = os.stat(path)
+                files.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+        module = sys.modules[converter_class.__module__]
+        fingerprint = {
+            "version": CACHE_VERSION,
+            "converter": f"{converter_class.__module__}.{converter_class.__qualname__}",
+            "source": source_hash(os.path.dirname(os.path.realpath(module.__file__)), COMMON_DIR),
+            "files": files,
+            "options": options,
+        }
+        return hashlib.sha256(json.dumps(fingerprint, sort_keys=True, default=str).encode()).hexdigest()
+
+    def entry_path(self, key: str):
+        return os.path.join(self.directory, key)
+
+    def fetch(self, key: str, hdr_path: str) -> bool:
+        """Places the cached files of key at hdr_path, returning whether there was an entry."""
+        entry = self.entry_path(key)
+        if not os.path.isdir(entry):
+            return False
+        base = os.path.splitext(hdr_path)[0]
+        for name in os.listdir(entry):
+            target = base + os.path.splitext(name)[1]
+            # Removed first, so a file linked to another entry is never written through
+            if os.path.isdir(target) and not os.path.islink(target):
+                shutil.rmtree(target)
+            elif os.path.lexists(target):
+                os.remove(target)
+            self._place(os.path.join(entry, name), target)
+        os.utime(entry)
+        return True
+
+    def store(self, key: str, paths: list):
+        """Adds the output files of a conversion under key, then evicts down to the size limit."""
+        entry = self.entry_path(key)
+        if os.path.isdir(entry):
+            os.utime(entry)
+            return
+        # Assembled next to the entry and renamed, so concurrent workers never see half of it
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=self.directory)
+        try:
+            for path in paths:
+                self._place(path, os.path.join(staging, "scene" + os.path.splitext(path)[1]))
+            os.rename(staging, entry)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.path.isdir(entry):
+                raise
+        self.evict()
+
+    def _place(self, source: str, target: str):
+        if os.path.isdir(source):
+            # A Zarr array, whose chunk files are placed one by one
+            shutil.copytree(source, target, copy_function=self._place)
+            return
+        if self.link:
+            try:
+                os.link(source, target)
+                return
+            except OSError:
+                # e.g. the cache is on another file system
+                pass
+        shutil.copy2(source, target)
+
+    def entries(self):
+        # (last used, size, path) of every entry
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith(".") or not os.path.isdir(path):
+                continue
+            try:
+                size = path_size(path)
+                entries.append((os.path.getmtime(path), size, path))
+            except FileNotFoundError:
+                # Evicted by another worker in the meantime
+                continue
+        return entries
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for last_used, size, path in entries:
+            if total <= self.max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            print(f"Evicted {os.path.basename(path)} from the conversion cache "
+                  f"(last used {time.ctime(last_used)})")
@@ -0,0 +1,162 @@
+# ==================================================================================
+#                           CONVERTER REGISTRY
+#
+# DESCRIPTION: This file contains the registry of the four converters, so tools
+#              that work across sensors (e.g. batch conversion or inspection) can
+#              load and run any of them by name. Every converter lives in its own
+#              directory, which is added to the import path the first time it is
+#              loaded.
+#
+# ==================================================================================
+import importlib
+import os
+import re
+import sys
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+# sensor: (converter directory, module, class)
+SENSORS = {
+    "enmap": ("enmap-to-envi-converter", "convert_enmap_geotiff_to_envi", "EnMapConverter"),
+    "pixxel": ("pixxel-to-envi-converter", "convert_pixxel_geotiff_to_envi", "PixxelConverter"),
+    "worldview3": ("worldview3-to-envi-converter", "convert_worldview3_geotiff_to_envi", "WorldView3Converter"),
+    "hyperion": ("hyperion-to-envi-converter", "convert_hyperion_to_envi", "HyperionConverter"),
+}
+# Sensors whose converter needs the XML metadata file next to the GeoTIFF
+SENSORS_WITH_METADATA = ("enmap", "pixxel")
+RAW_FILE_EXTS = (".raw", ".img")
+GEOTIFF_EXTS = (".tif", ".tiff")
+# Names that tell the sensor of a delivery without opening it
+HYPERION_BAND_FILE = re.compile(r"_B\d{3}_", re.IGNORECASE)
+HYPERION_SCENE_PREFIX = "EO1H"
+ENMAP_IMAGE_FILE = re.compile(r"^ENMAP.*SPECTRAL_IMAGE", re.IGNORECASE)
+
+
+def load_converter_class(sensor: str):
+    if sensor not in SENSORS:
+        raise ValueError(f"Unknown sensor '{sensor}', expected one of {', '.join(SENSORS)}")
+    directory, module_name, class_name = SENSORS[sensor]
+    converter_dir = os.path.join(REPO_DIR, directory)
+    if converter_dir not in sys.path:
+        sys.path.append(converter_dir)
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def convert_scene(sensor: str, geotiff_path: str, output_path: str, metadata_path: str = None, **options):
+    converter = create_converter(sensor, geotiff_path, output_path, metadata_path=metadata_path, **options)
+    if sensor == "hyperion":
+        converter.write_envi(output_path)
+    else:
+        converter.convert_geotiff()
+    return converter
+
+
+def create_converter(sensor: str, geotiff_path: str, output_path: str = "", metadata_path: str = None, **options):
+    converter_class = load_converter_class(sensor)
+    match sensor:
+        case "enmap" | "pixxel":
+            if not metadata_path:
+                raise ValueError(f"A metadata XML file is required for {sensor} scenes")
+            return converter_class(geotiff_path, metadata_path, output_path, **options)
+        case "worldview3":
+            return converter_class(geotiff_path, output_path, **options)
+        case "hyperion":
+            return converter_class(geotiff_path, **options)
+
+
+def inspect_scene(sensor: str, geotiff_path: str, metadata_path: str = None, **options):
+    # The would-be ENVI header of a scene, without reading any pixel data
+    return create_converter(sensor, geotiff_path, metadata_path=metadata_path, **options).inspect()
+
+
+def input_files(geotiff_path: str, metadata_path: str = None):
+    # Hyperion scenes may be a directory of band files
+    if os.path.isdir(geotiff_path):
+        paths = [os.path.join(geotiff_path, p) for p in sorted(os.listdir(geotiff_path)) if p.lower().endswith(".tif")]
+    else:
+        paths = [geotiff_path]
+    if metadata_path:
+        paths.append(metadata_path)
+    return paths
+
+
+def output_files(hdr_path: str):
+    base = os.path.splitext(hdr_path)[0]
+    paths = [hdr_path] if os.path.isfile(hdr_path) else []
+    paths += [base + ext for ext in RAW_FILE_EXTS if os.path.isfile(base + ext)]
+    # Imported here, as zarr_writer and checksums pull in pydantic, which the CLIs only need to convert
+    from checksums import MANIFEST_EXT
+    from zarr_writer import ZARR_EXT
+    paths += [base + MANIFEST_EXT] if os.path.isfile(base + MANIFEST_EXT) else []
+    return paths + ([base + ZARR_EXT] if os.path.isdir(base + ZARR_EXT) else [])
+
+
+def path_size(path: str):
+    # Size of a file, or of every file under a directory such as a Zarr array
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def find_metadata_file(geotiff_path: str):
+    # Deliveries keep the XML metadata in the same directory as the GeoTIFF
+    directory = os.path.dirname(os.path.abspath(geotiff_path))
+    candidates = sorted(p for p in os.listdir(directory) if p.lower().endswith(".xml"))
+    if len(candidates) != 1:
+        raise ValueError(f"Expected a single XML metadata file next to {geotiff_path}, found {len(candidates)}")
+    return os.path.join(directory, candidates[0])
+
+
+def is_geotiff(path: str):
+    return os.path.splitext(path)[1].lower() in GEOTIFF_EXTS
+
+
+def detect_scene(delivery_path: str):
+    """
+    Tells which sensor a delivery (a GeoTIFF, or a directory holding a scene) comes
+    from by its file names alone, and returns it as a scene of the batch converter:
+    a directory of _B###_ band files is Hyperion, as is a GeoTIFF named EO1H...,
+    an ENMAP*SPECTRAL_IMAGE GeoTIFF is EnMap, and any other GeoTIFF is Pixxel when
+    an XML metadata file comes with it and WorldView-3 otherwise.
+    """
+    if os.path.isdir(delivery_path):
+        paths = sorted(os.path.join(root, name) for root, _, names in os.walk(delivery_path) for name in names)
+        geotiffs = [p for p in paths if is_geotiff(p)]
+        band_files = [p for p in geotiffs if HYPERION_BAND_FILE.search(os.path.basename(p))]
+        if band_files:
+            return {"sensor": "hyperion", "geotiff_path": os.path.dirname(band_files[0])}
+        # EnMap deliveries also hold quality masks and quicklooks as GeoTIFFs
+        geotiffs = [p for p in geotiffs if ENMAP_IMAGE_FILE.search(os.path.basename(p))] or geotiffs
+        if len(geotiffs) != 1:
+            raise ValueError(f"Expected a single GeoTIFF in {delivery_path}, found {len(geotiffs)}")
+        geotiff_path = geotiffs[0]
+    elif is_geotiff(delivery_path):
+        geotiff_path = delivery_path
+    else:
+        raise ValueError(f"{delivery_path} is neither a GeoTIFF nor a directory")
+
+    name = os.path.basename(geotiff_path)
+    if name.upper().startswith(HYPERION_SCENE_PREFIX):
+        return {"sensor": "hyperion", "geotiff_path": geotiff_path}
+    sensor = "enmap" if ENMAP_IMAGE_FILE.search(name) else "pixxel"
+    metadata_path = delivery_metadata_file(geotiff_path, os.path.isdir(delivery_path))
+    if metadata_path is None:
+        if sensor == "enmap":
+            raise ValueError(f"No XML metadata file found for the EnMap scene {geotiff_path}")
+        return {"sensor": "worldview3", "geotiff_path": geotiff_path}
+    return {"sensor": sensor, "geotiff_path": geotiff_path, "metadata_path": metadata_path}
+
+
+def delivery_metadata_file(geotiff_path: str, own_directory: bool):
+    # The XML named after the GeoTIFF (EnMap names it ..._METADATA.XML), or the only XML
+    # of a directory holding nothing but the delivery
+    directory = os.path.dirname(os.path.abspath(geotiff_path))
+    stem = os.path.splitext(os.path.basename(geotiff_path))[0].upper()
+    names = {stem + ".XML", re.sub("SPECTRAL_IMAGE", "METADATA", stem) + ".XML"}
+    xml_files = sorted(p for p in os.listdir(directory) if p.lower().endswith(".xml"))
+    for xml_file in xml_files:
+        if xml_file.upper() in names:
+            return os.path.join(directory, xml_file)
+    if own_directory and len(xml_files) == 1:
+        return os.path.join(directory, xml_files[0])
+    return None
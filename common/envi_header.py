@@ -0,0 +1,123 @@
+# ==================================================================================
+#                           ENVI HEADER
+#
+# DESCRIPTION: This file contains the reader of the ENVI .hdr files written by
+#              ENVIModel.to_header_string (and by ENVI itself). Every "key = value"
+#              line is read into a dictionary keyed by the lower case key. Values in
+#              curly brackets may span several lines; the ones in LIST_KEYS are split
+#              into lists of strings, the others (map info, coordinate system
+#              string, description, ...) are kept as a single string. Nothing but the
+#              header is read, the data file is only found and sized.
+#
+# ==================================================================================
+import os
+from typing import Dict, List, Union
+
+import numpy as np
+
+from ENVI import DataTypeEnum
+
+# Header values that hold one entry per band (or per class), split on commas
+LIST_KEYS = (
+    "band names",
+    "bbl",
+    "class lookup",
+    "class names",
+    "data gain values",
+    "data offset values",
+    "data reflectance gain values",
+    "data reflectance offset values",
+    "fwhm",
+    "wavelength",
+)
+# The lists that must have one entry per band
+BAND_LIST_KEYS = ("band names", "bbl", "data gain values", "data offset values", "fwhm", "wavelength")
+
+NUMPY_DTYPES = {
+    DataTypeEnum.BYTE: np.uint8,
+    DataTypeEnum.INT16: np.int16,
+    DataTypeEnum.INT32: np.int32,
+    DataTypeEnum.FLOAT32: np.float32,
+    DataTypeEnum.FLOAT64: np.float64,
+    DataTypeEnum.COMPLEX: np.complex64,
+    DataTypeEnum.COMPLEX64: np.complex128,
+    DataTypeEnum.UINT16: np.uint16,
+    DataTypeEnum.UINT32: np.uint32,
+    DataTypeEnum.INT64: np.int64,
+    DataTypeEnum.UINT64: np.uint64,
+}
+
+# Extensions ENVI data files are found with, in order of preference
+DATA_FILE_EXTS = (".raw", ".img", ".dat", ".bsq", ".bil", ".bip", "")
+
+HeaderValue = Union[str, List[str]]
+
+
+def parse_envi_header(text: str) -> Dict[str, HeaderValue]:
+    """
+    Reads the text of an ENVI header into a dictionary. Raises ValueError when the
+    text does not start with "ENVI" or a value in curly brackets is never closed.
+    """
+    lines = text.splitlines()
+    if not lines or lines[0].strip() != "ENVI":
+        raise ValueError("An ENVI header must start with ENVI")
+
+    header = {}
+    key, parts = None, []
+    for line in lines[1:]:
+        if key is None:
+            if "=" not in line:
+                # Blank lines and comments (starting with ;) between the fields
+                continue
+            key, value = (part.strip() for part in line.split("=", 1))
+            key = key.lower()
+            parts = [value]
+        else:
+            parts.append(line.strip())
+        # A value in curly brackets goes on until the bracket is closed
+        value = "\n".join(parts) if parts[0].startswith("{") else parts[0]
+        if value.startswith("{") and value.count("{") > value.count("}"):
+            continue
+        header[key] = parse_value(key, value)
+        key, parts = None, []
+
+    if key is not None:
+        raise ValueError(f"The value of '{key}' is never closed with }}")
+    return header
+
+
+def parse_value(key: str, value: str) -> HeaderValue:
+    if not value.startswith("{"):
+        return value
+    value = value[1:value.rindex("}")].strip()
+    if key in LIST_KEYS:
+        return list(filter(None, map(str.strip, value.split(","))))
+    return value
+
+
+def read_envi_header(hdr_path: str) -> Dict[str, HeaderValue]:
+    with open(hdr_path) as hdr_file:
+        return parse_envi_header(hdr_file.read())
+
+
+def header_dtype(header: dict) -> np.dtype:
+    """
+    The numpy dtype of the data file, in its byte order. Raises ValueError for data
+    types and byte orders ENVI does not define.
+    """
+    data_type = DataTypeEnum(int(header["data type"]))
+    if data_type not in NUMPY_DTYPES:
+        raise ValueError(f"Unknown data type {header['data type']}")
+    byte_order = int(header.get("byte order", 0))
+    if byte_order not in (0, 1):
+        raise ValueError(f"Unknown byte order {byte_order}, expected 0 or 1")
+    # Byte order 1 is most significant byte first
+    return np.dtype(NUMPY_DTYPES[data_type]).newbyteorder(">" if byte_order == 1 else "<")
+
+
+def find_data_file(hdr_path: str) -> str:
+    base = os.path.splitext(hdr_path)[0]
+    for ext in DATA_FILE_EXTS:
+        if os.path.isfile(base + ext):
+            return base + ext
+    raise FileNotFoundError(f"No data file was found next to {hdr_path}")
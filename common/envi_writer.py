@@ -0,0 +1,295 @@
+# ==================================================================================
+#                           ENVI WRITER
+#
+# DESCRIPTION: This file contains the ENVI writer shared by the converters. The
+#              .raw file is preallocated and exposed as an np.memmap in the target
+#              interleave, so every chunk written into it is copied exactly once
+#              (instead of spectral.envi.save_image making a contiguous copy of
+#              the whole cube first). The header is emitted from ENVIModel.
+#
+# ==================================================================================
+import os
+import sys
+
+import numpy as np
+
+from ENVI import (
+    ENVIModel,
+    ByteOrderEnum,
+    DataTypeEnum,
+    InterleaveEnum,
+    DATA_TYPES,
+    TRANSPOSE_MAP,
+)
+from checksums import StreamingChecksums, manifest_path
+from stage_profiler import DISABLED_PROFILER
+from upload import PipelinedUpload, Uploader
+from writer_options import WriterOptions, as_writer_options
+from written_blocks import WrittenBlocks
+from zarr_writer import ZarrWriter, zarr_path
+
+RAW_FILE_EXT = ".raw"
+# Suffix of the .raw while a resumable conversion is still writing it
+PARTIAL_EXT = ".partial"
+
+
+def remove_existing(path: str):
+    # Replacing instead of overwriting a previous output keeps files it is hard linked
+    # to (e.g. by the conversion cache) intact
+    if os.path.lexists(path):
+        os.remove(path)
+
+
+def interleave_shape(interleave: InterleaveEnum, bands: int, lines: int, samples: int):
+    return {
+        InterleaveEnum.BSQ: (bands, lines, samples),
+        InterleaveEnum.BIL: (lines, bands, samples),
+        InterleaveEnum.BIP: (lines, samples, bands),
+    }[InterleaveEnum(interleave)]
+
+
+def prepare_header(header: ENVIModel, dtype):
+    """
+    Sets the fields describing the layout of the .raw file, which the writer always
+    writes from offset 0 in the native byte order of this machine.
+    """
+    header.data_type = DATA_TYPES.get(np.dtype(dtype).name, DataTypeEnum.UNKNOWN)
+    if header.data_type == DataTypeEnum.UNKNOWN:
+        raise ValueError(f"Data type {np.dtype(dtype).name} can not be written to ENVI")
+    header.byte_order = ByteOrderEnum.LSF if sys.byteorder == "little" else ByteOrderEnum.MSF
+    header.header_offset = 0
+    header.interleave = InterleaveEnum(header.interleave)
+    return header
+
+
+class ENVIWriter:
+    """
+    With a journal (see chunk_journal.py) the .raw is written to <raw>.partial, the
+    chunks the journal lists as done are kept from a previous run, and the .partial is
+    only renamed to the .raw once the whole file was written. Copies into the .raw are
+    profiled as "transpose" when they change the interleave and as "write" otherwise.
+
+    The outputs added by options (see writer_options.py) are produced from the rows
+    of the .raw flush finds complete: the Zarr array one row of chunks at a time (see
+    written), and the checksums and upload from the blocks of the .raw in file order
+    (see written_blocks.py). Rows that never were, e.g. when the whole cube is copied
+    at once, are handled on close, along with the manifest and the upload of the .hdr.
+    uploader replaces the one the upload options name.
+    """
+    def __init__(self, hdr_path: str, header: ENVIModel, dtype, raw_ext: str = RAW_FILE_EXT, journal=None,
+                 profiler=DISABLED_PROFILER, options: WriterOptions = None, uploader: Uploader = None):
+        self.hdr_path = hdr_path
+        self.raw_path = os.path.splitext(hdr_path)[0] + raw_ext
+        self.header = prepare_header(header, dtype)
+        self.dtype = np.dtype(dtype)
+        self.shape = interleave_shape(header.interleave, header.bands, header.lines, header.samples)
+        self.journal = journal
+        self.profiler = profiler
+        self.raw = None
+        # Bytes of the .raw already reported as written by flush, and waiting for the next one
+        self._flushed = 0
+        self._pending = 0
+        options = as_writer_options(options)
+        self.zarr = None
+        if options.zarr is not None:
+            self.zarr = ZarrWriter(zarr_path(hdr_path, options.zarr), self.header, self.dtype, options.zarr)
+        self.checksums = None
+        if options.checksums:
+            self.checksums = StreamingChecksums(header.interleave, header.bands, header.lines, header.samples, self.dtype)
+        self.upload = None
+        if options.upload is not None:
+            size = int(np.prod(self.shape)) * self.dtype.itemsize
+            self.upload = PipelinedUpload(hdr_path, self.raw_path, size, options.upload, uploader)
+        self.blocks = None
+        if self.checksums is not None or self.upload is not None:
+            self.blocks = WrittenBlocks(header.interleave, header.bands, header.lines, header.samples, self.dtype.itemsize)
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # The header is only written once all the data made it into the .raw
+        self.close(write_header=exc_type is None)
+
+    def open(self):
+        if self.zarr is not None:
+            self.open_zarr()
+        # A manifest of a previous output must never be left to describe the new one
+        remove_existing(manifest_path(self.hdr_path))
+        if self.journal is None:
+            remove_existing(self.raw_path)
+            self.raw = np.memmap(self.raw_path, dtype=self.dtype, mode="w+", shape=self.shape)
+        else:
+            partial_path = self.raw_path + PARTIAL_EXT
+            size = int(np.prod(self.shape)) * self.dtype.itemsize
+            resume = os.path.isfile(partial_path) and os.path.getsize(partial_path) == size
+            mode = "r+" if self.journal.open(resume) else "w+"
+            self.raw = np.memmap(partial_path, dtype=self.dtype, mode=mode, shape=self.shape)
+        if self.upload is not None:
+            self.upload.open(self.raw.filename)
+        return self
+
+    def open_zarr(self):
+        self.zarr.open()
+        # Elements of the .raw written (and needed) in every row of Zarr chunks
+        height = self.zarr.row_height
+        row_starts = np.arange(0, self.header.lines, height)
+        row_heights = np.minimum(row_starts + height, self.header.lines) - row_starts
+        self._zarr_coverage = np.zeros(len(row_starts), dtype=np.int64)
+        self._zarr_needed = row_heights * self.header.samples * self.header.bands
+        self._zarr_written = np.zeros(len(row_starts), dtype=bool)
+
+    def as_interleave(self, interleave: InterleaveEnum):
+        """The .raw memmap viewed with the axes of the given interleave."""
+        transpose_vector = TRANSPOSE_MAP[(self.header.interleave, InterleaveEnum(interleave))]
+        return np.transpose(self.raw, transpose_vector)
+
+    def window(self, row_off: int, col_off: int, height: int, width: int, interleave=InterleaveEnum.BSQ):
+        """The region of the .raw covering a window, viewed with the axes of the given interleave."""
+        rows = slice(row_off, row_off + height)
+        cols = slice(col_off, col_off + width)
+        index = {
+            InterleaveEnum.BSQ: (slice(None), rows, cols),
+            InterleaveEnum.BIL: (rows, slice(None), cols),
+            InterleaveEnum.BIP: (rows, cols, slice(None)),
+        }[InterleaveEnum(interleave)]
+        return self.as_interleave(interleave)[index]
+
+    def write(self, chunk: np.ndarray, row_off: int = 0, col_off: int = 0, interleave=InterleaveEnum.BSQ):
+        """
+        Copies a chunk into place. The chunk holds every band and is laid out in the
+        given interleave, BSQ being the (band, line, sample) order rasterio reads.
+        """
+        interleave = InterleaveEnum(interleave)
+        height, width = {
+            InterleaveEnum.BSQ: (chunk.shape[1], chunk.shape[2]),
+            InterleaveEnum.BIL: (chunk.shape[0], chunk.shape[2]),
+            InterleaveEnum.BIP: (chunk.shape[0], chunk.shape[1]),
+        }[interleave]
+        with self.profiler.stage(self._copy_stage(interleave), chunk.nbytes):
+            self.window(row_off, col_off, height, width, interleave)[...] = chunk
+
+    def write_band(self, band: int, data: np.ndarray):
+        with self.profiler.stage(self._copy_stage(InterleaveEnum.BSQ), data.nbytes):
+            self.as_interleave(InterleaveEnum.BSQ)[band] = data
+        if self.blocks is not None:
+            # Bands are written whole, so their blocks are passed on without waiting for a flush
+            self.blocks.add(0, self.header.lines, self.header.samples, band)
+            self.pass_blocks(self.blocks.complete())
+
+    def _copy_stage(self, interleave: InterleaveEnum):
+        return "write" if interleave == self.header.interleave else "transpose"
+
+    def is_done(self, key: str) -> bool:
+        # Whether a previous run already wrote the chunk, always False without a journal
+        return self.journal is not None and self.journal.is_done(key)
+
+    def mark_done(self, key: str):
+        # The chunk was flushed to disk by flush before the journal lists it
+        if self.journal is not None:
+            with self.profiler.stage("write"):
+                self.journal.mark_done(key)
+
+    def written(self, window, band: int = None):
+        """
+        Records that a window of the .raw holds its final data, for a single band or for
+        every band. It is then counted as written by the next flush.
+        """
+        bands = self.header.bands if band is None else 1
+        self._pending += window.height * window.width * bands * self.dtype.itemsize
+        if self.blocks is not None:
+            self.blocks.add(window.row_off, window.height, window.width, band)
+        if self.zarr is None:
+            return
+        height = self.zarr.row_height
+        end = window.row_off + window.height
+        for row in range(window.row_off // height, (end - 1) // height + 1):
+            lines = min(end, (row + 1) * height) - max(window.row_off, row * height)
+            self._zarr_coverage[row] += lines * window.width * bands
+
+    def flush(self, window=None, band: int = None):
+        # window (of band) is the chunk that was just written, see written
+        if window is not None:
+            self.written(window, band)
+        if self.raw is None:
+            return
+        if self.journal is not None:
+            # Only a resumable .raw needs every chunk on disk before it is listed as done,
+            # otherwise the dirty pages are written back once, on close
+            with self.profiler.stage("write", self._pending):
+                self.raw.flush()
+            self._flushed += self._pending
+        self._pending = 0
+        if self.blocks is not None:
+            self.pass_blocks(self.blocks.complete())
+        if self.zarr is not None:
+            self.write_zarr_rows(np.flatnonzero(~self._zarr_written & (self._zarr_coverage >= self._zarr_needed)))
+
+    def pass_blocks(self, blocks):
+        # Hands the blocks of the .raw, in file order, to the checksums and the upload
+        for index in blocks:
+            if self.checksums is not None:
+                band, lines = self.blocks.block(index)
+                with self.profiler.stage("checksum") as stage:
+                    stage.add(self.checksums.update(self.raw, band, lines))
+            if self.upload is not None:
+                # Time spent here is the conversion waiting for the upload to catch up
+                with self.profiler.stage("upload"):
+                    self.upload.advance(self.blocks.end_byte(index))
+
+    def write_zarr_rows(self, rows):
+        bsq = self.as_interleave(InterleaveEnum.BSQ)
+        height = self.zarr.row_height
+        for row in rows:
+            lines = slice(row * height, min((row + 1) * height, self.header.lines))
+            data = bsq[:, lines]
+            with self.profiler.stage("zarr", data.nbytes):
+                self.zarr.write_rows(lines.start, data)
+            self._zarr_written[row] = True
+
+    def close(self, write_header: bool = True):
+        if write_header and self.zarr is not None and self.raw is not None:
+            self.write_zarr_rows(np.flatnonzero(~self._zarr_written))
+            self.zarr.close()
+        complete = write_header and self.raw is not None
+        try:
+            if complete and self.blocks is not None:
+                # Blocks that were never reported as written are read back from the .raw
+                self.pass_blocks(self.blocks.remaining())
+            if complete and self.upload is not None:
+                with self.profiler.stage("upload", self.upload.size):
+                    self.upload.finish_raw()
+        except BaseException:
+            # A failed upload leaves the output as a failed conversion would
+            if self.upload is not None:
+                self.upload.close()
+            self._close(write_header=False)
+            raise
+        if self.upload is not None and not complete:
+            # The parts already sent are kept for the next run to resume from
+            self.upload.close()
+        # Whatever was not flushed chunk by chunk, i.e. everything without a journal, is written now
+        nbytes = self.raw.nbytes - self._flushed if self.raw is not None and write_header else 0
+        with self.profiler.stage("write", nbytes):
+            self._close(write_header)
+        if complete and self.checksums is not None:
+            self.checksums.manifest(self.hdr_path).write(manifest_path(self.hdr_path))
+        if complete and self.upload is not None:
+            with self.profiler.stage("upload"):
+                self.upload.put(self.hdr_path, manifest_path(self.hdr_path))
+
+    def _close(self, write_header: bool):
+        if self.raw is not None:
+            self.raw.flush()
+            self.raw = None
+        if not write_header:
+            # With a journal, the .partial is kept for the next run to resume from
+            if self.journal is not None:
+                self.journal.close()
+            return
+        if self.journal is not None:
+            os.replace(self.raw_path + PARTIAL_EXT, self.raw_path)
+            self.journal.remove()
+        remove_existing(self.hdr_path)
+        with open(self.hdr_path, "w") as hdr_file:
+            hdr_file.write(self.header.to_header_string() + "\n")
@@ -0,0 +1,41 @@
+# ==================================================================================
+#                           RUNNING STATISTICS
+#
+# DESCRIPTION: This file contains a streaming accumulator for the global count,
+#              mean, standard deviation, min and max of a cube. Chunks are merged
+#              with the parallel form of Welford's algorithm (Chan et al.), so the
+#              statistics of a whole scene come out of a single windowed pass.
+#
+# ==================================================================================
+import math
+
+import numpy as np
+
+
+class RunningStatistics:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, chunk: np.ndarray):
+        n = chunk.size
+        if n == 0:
+            return
+        chunk_mean = float(np.mean(chunk, dtype=np.float64))
+        chunk_m2 = float(np.sum(np.square(chunk - chunk_mean, dtype=np.float64)))
+
+        total = self.count + n
+        delta = chunk_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += chunk_m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, float(np.min(chunk)))
+        self.max = max(self.max, float(np.max(chunk)))
+
+    @property
+    def std(self):
+        # Population standard deviation, the same as np.std
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
@@ -0,0 +1,198 @@
+# ==================================================================================
+#                           SOURCE LAYOUT
+#
+# DESCRIPTION: This file contains the detection of GeoTIFFs whose storage layout
+#              already matches the interleave of the ENVI output. A pixel
+#              interleaved GeoTIFF holds BIP data and a band interleaved one BSQ
+#              data, so when the output uses the same interleave there is nothing
+#              to reorder:
+#                - uncompressed strips in native byte order already hold the exact
+#                  bytes of the .raw and are copied into it as they are
+#                - otherwise GDAL decodes every window straight into its place in
+#                  the .raw, without a band-first chunk in between
+#
+# ==================================================================================
+import contextlib
+import sys
+
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+
+from aoi import is_full_window
+from chunk_journal import window_key
+from chunk_windows import iter_chunk_windows, relative_window
+from ENVI import InterleaveEnum
+
+# How the pixels of a scene made it into the .raw, reported by the converters
+STRIP_COPY = "strip copy"
+DIRECT_READ = "direct read"
+REORDER = "reorder"
+
+# GDAL IMAGE_STRUCTURE INTERLEAVE: ENVI interleave holding the same byte order
+GEOTIFF_INTERLEAVE = {
+    "PIXEL": InterleaveEnum.BIP,
+    "BAND": InterleaveEnum.BSQ,
+}
+
+
+@contextlib.contextmanager
+def open_source(geotiff_path: str, src=None):
+    """
+    Yields src when the caller already opened the GeoTIFF, so a whole conversion runs on
+    a single GDAL open, otherwise opens (and closes) geotiff_path.
+    """
+    if src is not None:
+        yield src
+        return
+    with rasterio.open(geotiff_path) as src:
+        yield src
+
+
+def source_interleave(src):
+    return GEOTIFF_INTERLEAVE.get(src.tags(ns="IMAGE_STRUCTURE").get("INTERLEAVE"))
+
+
+def layout_matches(src, interleave) -> bool:
+    return source_interleave(src) == InterleaveEnum(interleave.lower())
+
+
+def native_byte_order(geotiff_path: str) -> bool:
+    with open(geotiff_path, "rb") as tiff_file:
+        return tiff_file.read(2) == (b"II" if sys.byteorder == "little" else b"MM")
+
+
+def strip_ranges(src, geotiff_path: str, indexes: list = None):
+    """
+    The (band, row_off, height, offset, size) of every strip of an uncompressed, striped
+    GeoTIFF in native byte order, band being the band of the output (None for pixel
+    interleaved files). indexes selects the source bands, all of them by default.
+    Returns None when the strips can not be copied as they are, which includes pixel
+    interleaved files of which only some bands are selected.
+    """
+    interleave = source_interleave(src)
+    if indexes is not None and interleave == InterleaveEnum.BIP and list(indexes) != list(range(1, src.count + 1)):
+        return None
+    block_height, block_width = src.block_shapes[0]
+    if (
+        interleave is None
+        or src.compression is not None
+        or block_width != src.width
+        or len(set(src.dtypes)) != 1
+        or "NBITS" in src.tags(ns="IMAGE_STRUCTURE")
+        or not native_byte_order(geotiff_path)
+    ):
+        return None
+
+    itemsize = np.dtype(src.dtypes[0]).itemsize
+    pixel_bytes = itemsize * (src.count if interleave == InterleaveEnum.BIP else 1)
+    if interleave == InterleaveEnum.BIP:
+        bands = [(None, 1)]
+    else:
+        bands = enumerate(indexes or range(1, src.count + 1))
+    strips = []
+    for band, index in bands:
+        for strip, row_off in enumerate(range(0, src.height, block_height)):
+            height = min(block_height, src.height - row_off)
+            offset = src.get_tag_item(f"BLOCK_OFFSET_0_{strip}", "TIFF", bidx=index)
+            size = src.get_tag_item(f"BLOCK_SIZE_0_{strip}", "TIFF", bidx=index)
+            # Strips that were never written (sparse files) have no offset
+            if not offset or int(size) != height * src.width * pixel_bytes:
+                return None
+            strips.append((band, row_off, height, int(offset), int(size)))
+    return strips
+
+
+def write_path(src, geotiff_path: str, interleave, dtype, indexes: list = None, region: Window = None) -> str:
+    # Strips are only copied as they are when the whole extent of the scene is converted
+    if not layout_matches(src, interleave):
+        return REORDER
+    if (
+        np.dtype(dtype) == np.dtype(src.dtypes[0])
+        and is_full_window(src, region)
+        and strip_ranges(src, geotiff_path, indexes) is not None
+    ):
+        return STRIP_COPY
+    return DIRECT_READ
+
+
+def group_strips(strips: list, chunk_size: int):
+    # Consecutive strips are grouped into chunks of about chunk_size bytes
+    group, group_size = [], 0
+    for strip in strips:
+        group.append(strip)
+        group_size += strip[4]
+        if group_size >= chunk_size:
+            yield group
+            group, group_size = [], 0
+    if group:
+        yield group
+
+
+def copy_strips(src, geotiff_path: str, writer, chunk_size: int, indexes: list = None):
+    # Every strip is read from the file straight into the pages of the .raw memmap
+    output = writer.as_interleave(writer.header.interleave)
+    with open(geotiff_path, "rb") as tiff_file:
+        for group in group_strips(strip_ranges(src, geotiff_path, indexes), chunk_size):
+            key = f"strips {group[0][0]},{group[0][1]}:{group[-1][0]},{group[-1][1]}"
+            if writer.is_done(key):
+                continue
+            group_size = sum(strip[4] for strip in group)
+            with writer.profiler.stage("read", group_size):
+                for band, row_off, height, offset, size in group:
+                    rows = slice(row_off, row_off + height)
+                    region = output[rows] if band is None else output[band, rows]
+                    tiff_file.seek(offset)
+                    if tiff_file.readinto(memoryview(region).cast("B")) != size:
+                        raise IOError(f"{geotiff_path} ended inside the strip at offset {offset}")
+                    writer.written(Window(0, row_off, src.width, height), band)
+            writer.flush()
+            writer.mark_done(key)
+
+
+def read_direct(src, writer, chunk_size: int, process=None, process_stage: str = "scale", indexes: list = None,
+                region: Window = None):
+    """
+    Lets GDAL decode every window (of the bands in indexes, all of them by default, and
+    inside region, the whole extent by default) straight into its place in the .raw,
+    converting to the output data type on the way. process, when given, is then called
+    with that (band, line, sample) view of the .raw to modify it in place, and profiled
+    as process_stage.
+    """
+    pixel_bytes = writer.header.bands * writer.dtype.itemsize
+    for window in iter_chunk_windows(src, chunk_size, pixel_bytes, region):
+        if writer.is_done(window_key(window)):
+            continue
+        target = relative_window(window, region)
+        out = writer.window(target.row_off, target.col_off, target.height, target.width)
+        with writer.profiler.stage("read", out.nbytes):
+            src.read(indexes, window=window, out=out)
+        if process is not None:
+            with writer.profiler.stage(process_stage, out.nbytes):
+                process(out)
+        writer.flush(target)
+        writer.mark_done(window_key(window))
+
+
+def copy_source(src, geotiff_path: str, writer, chunk_size: int, process=None, process_stage: str = "scale",
+                indexes: list = None, region: Window = None) -> str:
+    """
+    Writes a GeoTIFF (or the bands of it in indexes, inside region) whose layout
+    matches the interleave of the writer without any reordering, returning which of
+    the two paths was taken.
+    """
+    path = write_path(src, geotiff_path, writer.header.interleave, writer.dtype, indexes, region)
+    if process is None and path == STRIP_COPY:
+        copy_strips(src, geotiff_path, writer, chunk_size, indexes)
+        return STRIP_COPY
+    read_direct(src, writer, chunk_size, process, process_stage, indexes, region)
+    return DIRECT_READ
+
+
+def describe(path: str, interleave) -> str:
+    interleave = interleave.upper()
+    return {
+        STRIP_COPY: f"GeoTIFF is stored in {interleave} order, copying its strips into the .raw as they are",
+        DIRECT_READ: f"GeoTIFF is stored in {interleave} order, reading it straight into the .raw",
+        REORDER: f"GeoTIFF layout differs from {interleave}, reordering it into the .raw",
+    }[path]
@@ -0,0 +1,157 @@
+# ==================================================================================
+#                           SPECTRAL METADATA
+#
+# DESCRIPTION: This file contains the reader of the band wavelengths and FWHM from
+#              the XML metadata delivered with Pixxel and EnMap GeoTIFFs. The layout
+#              of the file is detected from the first element that identifies it:
+#
+#              - pixxel_v1: Wavelength_list and FWHM_list elements holding
+#                "{470.0,480.0,...}" lists
+#              - pixxel_v2: one Bands element per band, with its Status (1 when the
+#                band is in the image), Central_Wavelength and Bandwidth
+#              - enmap: a bandID element per band under specific/bandCharacterisation,
+#                with its wavelengthCenterOfBand and FWHMOfBand
+#
+#              The file is read in a single iterparse pass, which stops as soon as
+#              the band lists are complete: at the end of the Wavelength_list and
+#              FWHM_list (pixxel_v1) or of the bandCharacterisation (enmap), and at
+#              the first element after the run of Bands elements (pixxel_v2), which
+#              are listed one after another. Every element is freed once its end is
+#              reached, so the memory used does not grow with the size of the
+#              metadata, and nothing but the band lists is kept.
+#
+# ==================================================================================
+import xml.etree.ElementTree as ET
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+PIXXEL_V1 = "pixxel_v1"
+PIXXEL_V2 = "pixxel_v2"
+ENMAP = "enmap"
+
+# The element that identifies each layout
+SCHEMA_ELEMENTS = {
+    "Wavelength_list": PIXXEL_V1,
+    "FWHM_list": PIXXEL_V1,
+    "Bands": PIXXEL_V2,
+    "bandCharacterisation": ENMAP,
+}
+# Elements holding the values of a single band
+BAND_ELEMENTS = ("Bands", "bandID")
+# Elements read at their end, besides the children of BAND_ELEMENTS
+READ_ELEMENTS = {"Wavelength_list", "FWHM_list", "Central_Wavelength", "Bands", "bandID", "bandCharacterisation"}
+
+
+class SpectralMetadata(BaseModel):
+    # One of PIXXEL_V1, PIXXEL_V2 or ENMAP
+    schema_name: str
+    # Center wavelength and FWHM of every band in the image, in band order
+    wavelengths: List[float] = []
+    fwhm: List[float] = []
+    # Units of the wavelengths, None when the metadata does not give them
+    wavelength_units: Optional[str] = None
+    # Bands listed in the metadata, including those that are not in the image
+    listed_bands: int = 0
+
+
+def local_name(tag: str) -> str:
+    # "{namespace}tag" -> "tag"
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_list(text: str) -> list:
+    # "{470.0,480.0,}" -> [470.0, 480.0]
+    return [float(value) for value in (text or "").strip().strip("{}").split(",") if value.strip()]
+
+
+def read_spectral_metadata(path: str, schema_name: str = None) -> SpectralMetadata:
+    """
+    The band wavelengths and FWHM of a Pixxel or EnMap metadata file, read in a single
+    pass that stops as soon as the band lists are complete. The layout is detected
+    unless schema_name is given. Raises ValueError when the file does not match any of
+    the layouts.
+    """
+    metadata = SpectralMetadata(schema_name=schema_name) if schema_name else None
+    path_tags = []
+    root = None
+    # Values of the Bands or bandID element being read
+    band = {}
+    # Depth of the Bands elements of a pixxel_v2 file, once the first one was read
+    bands_depth = None
+    for event, element in ET.iterparse(path, events=("start", "end")):
+        tag = element.tag
+        if "}" in tag:
+            tag = local_name(tag)
+        if event == "start":
+            if root is None:
+                root = element
+            elif bands_depth == len(path_tags) and tag != "Bands":
+                # The first element after the run of Bands elements
+                break
+            path_tags.append(tag)
+            if metadata is None and tag in SCHEMA_ELEMENTS:
+                metadata = SpectralMetadata(schema_name=SCHEMA_ELEMENTS[tag])
+            if tag in BAND_ELEMENTS:
+                band = {}
+            continue
+
+        path_tags.pop()
+        if metadata is not None and (tag in READ_ELEMENTS or (path_tags and path_tags[-1] in BAND_ELEMENTS)):
+            if read_element(metadata, tag, path_tags, element, band):
+                break
+            if tag == "Bands" and metadata.schema_name == PIXXEL_V2:
+                bands_depth = len(path_tags)
+        elif bands_depth is not None and len(path_tags) < bands_depth:
+            # The end of the element holding the Bands elements
+            break
+        # The text and attributes were read above, so the element is no longer needed.
+        # Children of the root are detached as well, so the root does not keep growing.
+        element.clear()
+        if len(path_tags) == 1:
+            root.clear()
+
+    if metadata is None:
+        raise ValueError(f"{path} is not a Pixxel (v1 or v2) or EnMap metadata file")
+    return metadata
+
+
+def read_element(metadata: SpectralMetadata, tag: str, parents: list, element, band: dict) -> bool:
+    """
+    Reads an element of the metadata at its end, parents being the tags from the root
+    down to its parent. Returns True once the band lists are complete.
+    """
+    if metadata.schema_name == PIXXEL_V1:
+        if tag == "Wavelength_list" and not metadata.listed_bands:
+            metadata.wavelengths = parse_list(element.text)
+            metadata.wavelength_units = element.get("unit")
+            metadata.listed_bands = len(metadata.wavelengths)
+        elif tag == "FWHM_list" and not metadata.fwhm:
+            metadata.fwhm = parse_list(element.text)
+        return bool(metadata.listed_bands and metadata.fwhm)
+    if metadata.schema_name == PIXXEL_V2:
+        if tag == "Central_Wavelength" and metadata.wavelength_units is None:
+            metadata.wavelength_units = element.get("unit")
+        if parents and parents[-1] == "Bands":
+            band[tag] = (element.text or "").strip()
+        elif tag == "Bands":
+            metadata.listed_bands += 1
+            # Only the bands with a status of 1 appear in the image
+            if band.get("Status") == "1":
+                if "Central_Wavelength" in band:
+                    metadata.wavelengths.append(float(band["Central_Wavelength"]))
+                if "Bandwidth" in band:
+                    metadata.fwhm.append(float(band["Bandwidth"]))
+        # The end of the Bands elements is told by the element after them, see read_spectral_metadata
+        return False
+    if metadata.schema_name == ENMAP:
+        # Only the bands of the first specific/bandCharacterisation below the root are read
+        in_characterisation = parents[1:3] == ["specific", "bandCharacterisation"]
+        if parents and parents[-1] == "bandID":
+            band[tag] = (element.text or "").strip()
+        elif tag == "bandID" and in_characterisation:
+            metadata.listed_bands += 1
+            metadata.wavelengths.append(float(band["wavelengthCenterOfBand"]))
+            metadata.fwhm.append(float(band["FWHMOfBand"]))
+        return tag == "bandCharacterisation" and parents[1:] == ["specific"]
+    return False
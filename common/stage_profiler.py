@@ -0,0 +1,189 @@
+# ==================================================================================
+#                           STAGE PROFILER
+#
+# DESCRIPTION: This file contains the per-stage instrumentation of the converters.
+#              Every stage of a conversion (validate, metadata, read, transpose,
+#              scale, normalise, write and zarr) is timed, along with the bytes it
+#              processed and the peak resident memory of the process while it ran.
+#              Chunked stages add up over all of their chunks. When the conversion
+#              ends, one JSON record per stage and one for the whole conversion are
+#              appended to a JSON lines file and/or passed to a callback.
+#
+# ==================================================================================
+import contextlib
+import functools
+import json
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, where the peak memory is not reported
+    resource = None
+
+# Stages in the order they are reported
+STAGES = ("validate", "metadata", "read", "transpose", "scale", "normalise", "write", "zarr")
+# Writing 5 to clear_refs resets the peak RSS (VmHWM) of the process on Linux
+CLEAR_REFS_PATH = "/proc/self/clear_refs"
+STATUS_PATH = "/proc/self/status"
+
+
+def reset_peak_rss() -> bool:
+    try:
+        with open(CLEAR_REFS_PATH, "w") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss():
+    # Peak resident memory in bytes, since the last reset_peak_rss where supported
+    try:
+        with open(STATUS_PATH) as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class StageCall:
+    def __init__(self):
+        self.bytes = 0
+
+    def add(self, nbytes: int):
+        self.bytes += int(nbytes)
+
+
+class _DisabledCall:
+    def add(self, nbytes: int):
+        pass
+
+
+_DISABLED_CALL = _DisabledCall()
+
+
+class StageProfiler:
+    """
+    Disabled unless given a callback (called with every record) or a JSON lines path,
+    in which case stage() costs nothing beyond entering a context manager. Stages may
+    run on several threads at once (e.g. the Hyperion band readers); their times then
+    add up to more than the wall time of the conversion, and the peak memory of a stage
+    includes whatever the other threads held at the time.
+    """
+    def __init__(self, callback=None, path: str = None, **context):
+        self.callback = callback
+        self.path = path
+        self.context = context
+        self.enabled = callback is not None or bool(path)
+        self._lock = threading.Lock()
+        self._stages = {}
+        # Without a resettable peak, every stage reports the peak of the process so far
+        self._resettable = self.enabled and reset_peak_rss()
+
+    @contextlib.contextmanager
+    def stage(self, name: str, nbytes: int = 0):
+        """
+        Times the block as one call of a stage. nbytes, or the bytes added to the yielded
+        call with add() once they are known, are reported as processed by the stage.
+        """
+        if not self.enabled:
+            yield _DISABLED_CALL
+            return
+        call = StageCall()
+        call.add(nbytes)
+        if self._resettable:
+            reset_peak_rss()
+        start = time.perf_counter()
+        try:
+            yield call
+        finally:
+            seconds = time.perf_counter() - start
+            peak = peak_rss()
+            with self._lock:
+                totals = self._stages.setdefault(name, {"seconds": 0.0, "bytes": 0, "calls": 0, "peak_rss": peak})
+                totals["seconds"] += seconds
+                totals["bytes"] += call.bytes
+                totals["calls"] += 1
+                if peak is not None:
+                    totals["peak_rss"] = max(totals["peak_rss"] or 0, peak)
+
+    @contextlib.contextmanager
+    def conversion(self, **context):
+        # Collects the stages of a single conversion and emits them when it ends
+        self._stages = {}
+        start = time.perf_counter()
+        status = "failed"
+        try:
+            yield self
+            status = "ok"
+        finally:
+            if self.enabled:
+                self.emit(self.records(time.perf_counter() - start, status, context))
+
+    def records(self, seconds: float, status: str, context: dict):
+        context = {**self.context, **context}
+        order = {stage: i for i, stage in enumerate(STAGES)}
+        records = []
+        for name in sorted(self._stages, key=lambda stage: order.get(stage, len(order))):
+            totals = self._stages[name]
+            records.append({
+                **context,
+                "event": "stage",
+                "stage": name,
+                **totals,
+                "mb_per_s": totals["bytes"] / 1024 ** 2 / totals["seconds"] if totals["bytes"] and totals["seconds"] else None,
+            })
+        peaks = [record["peak_rss"] for record in records if record["peak_rss"] is not None]
+        records.append({
+            **context,
+            "event": "conversion",
+            "status": status,
+            "seconds": seconds,
+            "peak_rss": max(peaks) if peaks else peak_rss(),
+        })
+        return records
+
+    def emit(self, records: list):
+        if self.path:
+            # A single write per conversion, so processes appending to the same file do
+            # not interleave their lines
+            with open(self.path, "a") as profile_file:
+                profile_file.write("".join(json.dumps(record, default=str) + "\n" for record in records))
+        if self.callback is not None:
+            for record in records:
+                self.callback(record)
+
+
+def profiled(stage: str):
+    """Decorator timing a converter method, which must have a profiler attribute, as one call of stage."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.profiler.stage(stage):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def profiled_conversion(sensor: str):
+    """Decorator emitting the stages of a converter method that runs a whole conversion."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.profiler.conversion(sensor=sensor, geotiff_path=self.geotiff_path):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Default of the shared functions that take a profiler
+DISABLED_PROFILER = StageProfiler()
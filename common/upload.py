@@ -0,0 +1,305 @@
+# ==================================================================================
+#                           UPLOAD
+#
+# DESCRIPTION: This file contains the upload of the ENVI files while the .raw is
+#              still being written. The .raw is uploaded as a multipart upload of
+#              fixed-size parts: a part is queued as soon as the blocks of the .raw
+#              it covers were written (see written_blocks.py), and a few worker
+#              threads read it back from the page cache and send it. The queue is
+#              bounded, so when the network is slower than the conversion the
+#              conversion waits instead of buffering the whole cube. The upload of
+#              the .raw completes before the .hdr is written, and the .hdr and the
+#              checksum manifest are sent right after.
+#
+#              The id of the upload is kept in <name>.upload next to the .hdr until
+#              the upload completes. A rerun (e.g. of a resumable conversion) picks
+#              the upload up again and skips every part the store already holds
+#              with the same ETag (the MD5 of the part), so only the parts that are
+#              missing or different are sent again.
+#
+#              Stores are reached through the Uploader interface, modelled on S3
+#              multipart uploads. LocalUploader writes to a directory, so uploads
+#              can be run and checked offline; other stores are added to UPLOADERS.
+#
+# ==================================================================================
+import abc
+import hashlib
+import json
+import os
+import queue
+import shutil
+import threading
+import uuid
+from typing import Dict
+
+from pydantic import BaseModel
+
+UPLOAD_STATE_EXT = ".upload"
+DEFAULT_PART_SIZE_MB = 16
+
+
+class UploadOptions(BaseModel):
+    # Where the files go, e.g. a directory for the local uploader
+    destination: str
+    # One of UPLOADERS
+    uploader: str = "local"
+    # Prefix of the keys, which end with the file names of the outputs
+    prefix: str = ""
+    # Size of the parts of the .raw; S3 requires at least 5 MB
+    part_size_mb: int = DEFAULT_PART_SIZE_MB
+    # Parts queued at most, on top of the ones being sent
+    max_queued_parts: int = 4
+    # Parts sent at the same time
+    workers: int = 2
+
+
+def upload_state_path(hdr_path: str):
+    return os.path.splitext(hdr_path)[0] + UPLOAD_STATE_EXT
+
+
+def part_etag(data) -> str:
+    return hashlib.md5(data).hexdigest()
+
+
+class Uploader(abc.ABC):
+    """
+    Interface of the stores the outputs are uploaded to. Parts are numbered from 1 and
+    identified by the ETag upload_part returns, the MD5 of their bytes.
+    """
+    @abc.abstractmethod
+    def create_upload(self, key: str) -> str:
+        """Starts a multipart upload of key, returning its id."""
+
+    @abc.abstractmethod
+    def list_parts(self, upload_id: str) -> Dict[int, str]:
+        """The parts the store holds for an upload, by number, or None if it is unknown."""
+
+    @abc.abstractmethod
+    def upload_part(self, upload_id: str, part_number: int, data: bytes) -> str:
+        """Uploads one part of an upload, returning its ETag."""
+
+    @abc.abstractmethod
+    def complete_upload(self, upload_id: str, parts: Dict[int, str]):
+        """Assembles the parts in order into the key of the upload."""
+
+    @abc.abstractmethod
+    def put(self, key: str, data: bytes):
+        """Uploads a small file in a single request."""
+
+
+class LocalUploader(Uploader):
+    """
+    Uploads to a directory: parts are kept under .uploads/<upload id> until the upload
+    is complete, then assembled into <directory>/<key>.
+    """
+    def __init__(self, destination: str):
+        self.directory = destination
+        self.uploads_dir = os.path.join(destination, ".uploads")
+        os.makedirs(self.uploads_dir, exist_ok=True)
+
+    def _upload_dir(self, upload_id: str):
+        return os.path.join(self.uploads_dir, upload_id)
+
+    def create_upload(self, key: str) -> str:
+        upload_id = uuid.uuid4().hex
+        os.makedirs(self._upload_dir(upload_id))
+        with open(os.path.join(self._upload_dir(upload_id), "key"), "w") as key_file:
+            key_file.write(key)
+        return upload_id
+
+    def list_parts(self, upload_id: str) -> Dict[int, str]:
+        if not os.path.isdir(self._upload_dir(upload_id)):
+            return None
+        parts = {}
+        for name in os.listdir(self._upload_dir(upload_id)):
+            if name.endswith(".etag"):
+                with open(os.path.join(self._upload_dir(upload_id), name)) as etag_file:
+                    parts[int(name[:-len(".etag")])] = etag_file.read()
+        return parts
+
+    def upload_part(self, upload_id: str, part_number: int, data: bytes) -> str:
+        part_path = os.path.join(self._upload_dir(upload_id), str(part_number))
+        with open(part_path, "wb") as part_file:
+            part_file.write(data)
+        etag = part_etag(data)
+        # The ETag is written last, so a part cut short is never listed
+        with open(part_path + ".etag", "w") as etag_file:
+            etag_file.write(etag)
+        return etag
+
+    def complete_upload(self, upload_id: str, parts: Dict[int, str]):
+        upload_dir = self._upload_dir(upload_id)
+        with open(os.path.join(upload_dir, "key")) as key_file:
+            target = os.path.join(self.directory, key_file.read())
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target + ".tmp", "wb") as target_file:
+            for number in sorted(parts):
+                with open(os.path.join(upload_dir, str(number)), "rb") as part_file:
+                    shutil.copyfileobj(part_file, target_file)
+        os.replace(target + ".tmp", target)
+        shutil.rmtree(upload_dir)
+
+    def put(self, key: str, data: bytes):
+        target = os.path.join(self.directory, key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target + ".tmp", "wb") as target_file:
+            target_file.write(data)
+        os.replace(target + ".tmp", target)
+
+
+# uploader name: class taking the destination
+UPLOADERS = {
+    "local": LocalUploader,
+}
+
+
+def create_uploader(options: UploadOptions) -> Uploader:
+    if options.uploader not in UPLOADERS:
+        raise ValueError(f"Unknown uploader '{options.uploader}', expected one of {', '.join(UPLOADERS)}")
+    return UPLOADERS[options.uploader](options.destination)
+
+
+class PipelinedUpload:
+    """
+    Uploads a .raw part by part while it is written. open is given the path the .raw
+    is being written to (e.g. a .partial), advance the bytes of it that are final so
+    far, finish_raw sends what is left, and put sends the other files.
+    """
+    def __init__(self, hdr_path: str, raw_path: str, size: int, options: UploadOptions, uploader: Uploader = None):
+        if isinstance(options, dict):
+            options = UploadOptions(**options)
+        self.options = options
+        self.uploader = uploader or create_uploader(options)
+        self.raw_key = self.key(raw_path)
+        self.state_path = upload_state_path(hdr_path)
+        self.size = size
+        self.part_size = options.part_size_mb * 1024 * 1024
+        self.part_count = max(1, -(-size // self.part_size))
+        self.upload_id = None
+        # Parts the store already held when the upload was resumed, and the ones sent
+        self.existing = {}
+        self.parts = {}
+        self.skipped = 0
+        self._queued = 0
+        self._queue = queue.Queue(maxsize=options.max_queued_parts)
+        self._workers = []
+        self._lock = threading.Lock()
+        self._error = None
+        self._read_path = None
+
+    def key(self, path: str):
+        return self.options.prefix + os.path.basename(path)
+
+    def open(self, read_path: str):
+        self._read_path = read_path
+        self._resume()
+        for _ in range(self.options.workers):
+            worker = threading.Thread(target=self._work, daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        return self
+
+    def _resume(self):
+        state = self._read_state()
+        if state is not None:
+            existing = self.uploader.list_parts(state["upload_id"])
+            if existing is not None:
+                self.upload_id = state["upload_id"]
+                self.existing = existing
+                print(f"Resuming upload of {self.raw_key}, {len(existing)} parts already uploaded")
+                return
+        self.upload_id = self.uploader.create_upload(self.raw_key)
+        with open(self.state_path, "w") as state_file:
+            json.dump({"key": self.raw_key, "upload_id": self.upload_id, "size": self.size,
+                       "part_size": self.part_size}, state_file)
+
+    def _read_state(self):
+        try:
+            with open(self.state_path) as state_file:
+                state = json.load(state_file)
+        except (OSError, ValueError):
+            return None
+        same = (state.get("key"), state.get("size"), state.get("part_size")) == (self.raw_key, self.size, self.part_size)
+        return state if same else None
+
+    def advance(self, written_bytes: int):
+        """Queues every part that lies within the first written_bytes of the .raw."""
+        while self._queued < self.part_count and min((self._queued + 1) * self.part_size, self.size) <= written_bytes:
+            self._raise_error()
+            # Blocks while the queue is full, which holds the conversion back
+            self._queue.put(self._queued + 1)
+            self._queued += 1
+
+    def finish_raw(self):
+        """Sends the parts left and completes the upload of the .raw."""
+        self.advance(self.size)
+        self._stop()
+        self._raise_error()
+        self.uploader.complete_upload(self.upload_id, self.parts)
+        os.remove(self.state_path)
+
+    def put(self, *paths: str):
+        # Files other than the .raw are small enough to be sent in one request
+        for path in paths:
+            if os.path.isfile(path):
+                with open(path, "rb") as f:
+                    self.uploader.put(self.key(path), f.read())
+
+    def close(self):
+        """Stops the workers without completing the upload, which a rerun resumes."""
+        self._stop()
+
+    def _stop(self):
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise RuntimeError(f"Upload of {self.raw_key} failed: {self._error}") from self._error
+
+    def _work(self):
+        while True:
+            part_number = self._queue.get()
+            if part_number is None:
+                return
+            # After a failure the queue is still drained, so advance never blocks for good
+            if self._error is not None:
+                continue
+            try:
+                self._send(part_number)
+            except Exception as e:
+                self._error = e
+
+    def _send(self, part_number: int):
+        offset = (part_number - 1) * self.part_size
+        # Read back while the part is still in the page cache
+        with open(self._read_path, "rb") as raw_file:
+            raw_file.seek(offset)
+            data = raw_file.read(min(self.part_size, self.size - offset))
+        # Parts are only hashed here when the store may hold them already
+        if part_number in self.existing and part_etag(data) == self.existing[part_number]:
+            with self._lock:
+                self.parts[part_number] = self.existing[part_number]
+                self.skipped += 1
+            return
+        etag = self.uploader.upload_part(self.upload_id, part_number, data)
+        with self._lock:
+            self.parts[part_number] = etag
+
+
+def upload_written(hdr_path: str, raw_path: str, options: UploadOptions, other_paths: list = (),
+                   uploader: Uploader = None):
+    """
+    Uploads outputs that are already written, e.g. placed from the conversion cache,
+    the way ENVIWriter does: the .raw part by part, then the .hdr and other_paths.
+    """
+    upload = PipelinedUpload(hdr_path, raw_path, os.path.getsize(raw_path), options, uploader).open(raw_path)
+    try:
+        # Every part is queued at once, the queue holds back what does not fit
+        upload.finish_raw()
+    finally:
+        upload.close()
+    upload.put(hdr_path, *other_paths)
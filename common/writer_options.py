@@ -0,0 +1,54 @@
+# ==================================================================================
+#                           WRITER OPTIONS
+#
+# DESCRIPTION: This file contains the options of the ENVI writer that every
+#              converter takes as one writer_options argument, so they are
+#              documented once here instead of in every converter. Each of them
+#              adds an output next to the .hdr/.raw pair, produced in the same
+#              pass over the pixels as the .raw:
+#                - zarr:      the cube is also written to a chunked Zarr array
+#                             (see zarr_writer.py)
+#                - checksums: the SHA-256 of the .raw and the CRC-32 of every
+#                             band are computed while the .raw is written and
+#                             saved to a manifest beside the .hdr (see
+#                             checksums.py)
+#                - upload:    the outputs are uploaded part by part while the
+#                             .raw is written (see upload.py)
+#
+# ==================================================================================
+from typing import Optional
+
+from pydantic import BaseModel
+
+from upload import DEFAULT_PART_SIZE_MB, UploadOptions
+from zarr_writer import DEFAULT_CHUNK_SIZE, DEFAULT_COMPRESSION, ZarrOptions
+
+
+class WriterOptions(BaseModel):
+    zarr: Optional[ZarrOptions] = None
+    checksums: bool = False
+    upload: Optional[UploadOptions] = None
+
+
+def as_writer_options(options) -> WriterOptions:
+    # Converter options may hold the writer options as a dict, e.g. in a batch manifest
+    if options is None:
+        return WriterOptions()
+    if isinstance(options, WriterOptions):
+        return options
+    return WriterOptions(**options)
+
+
+def writer_options_from(zarr: bool = False, zarr_chunk_size: int = DEFAULT_CHUNK_SIZE, zarr_band_chunk_size: int = 0,
+                        zarr_compression: str = DEFAULT_COMPRESSION, checksums: bool = False,
+                        upload_destination: str = None, upload_part_size_mb: int = DEFAULT_PART_SIZE_MB) -> WriterOptions:
+    # The writer options from the settings of a converter, where a band chunk size of 0
+    # means all bands and an empty destination no upload
+    zarr_options = None
+    if zarr:
+        zarr_options = ZarrOptions(chunk_size=zarr_chunk_size, band_chunk_size=zarr_band_chunk_size or None,
+                                   compression=zarr_compression)
+    upload_options = None
+    if upload_destination:
+        upload_options = UploadOptions(destination=upload_destination, part_size_mb=upload_part_size_mb)
+    return WriterOptions(zarr=zarr_options, checksums=checksums, upload=upload_options)
@@ -0,0 +1,72 @@
+# ==================================================================================
+#                           WRITTEN BLOCKS
+#
+# DESCRIPTION: This file contains the tracker of which part of a .raw holds its
+#              final data. Chunks may be written in any order, so the .raw is split
+#              into blocks of lines (of a single band for BSQ, of every band
+#              otherwise), each one contiguous in the file, and the blocks are
+#              handed out in file order as soon as a block and all the blocks
+#              before it were written. Whatever reads the .raw in order as it is
+#              written (checksums.py, upload.py) follows these blocks, while they
+#              are still in the page cache.
+#
+# ==================================================================================
+import numpy as np
+
+from ENVI import InterleaveEnum
+
+# Bytes of the .raw per block
+DEFAULT_BLOCK_BYTES = 16 * 1024 * 1024
+
+
+class WrittenBlocks:
+    def __init__(self, interleave: InterleaveEnum, bands: int, lines: int, samples: int, itemsize: int,
+                 block_bytes: int = DEFAULT_BLOCK_BYTES):
+        self.interleave = InterleaveEnum(interleave)
+        self.bands, self.lines, self.samples = bands, lines, samples
+        self.line_bytes = samples * itemsize * (1 if self.interleave == InterleaveEnum.BSQ else bands)
+        self.row_height = max(1, block_bytes // max(1, self.line_bytes))
+        row_starts = np.arange(0, lines, self.row_height)
+        self.rows = len(row_starts)
+        self.count = self.rows * (bands if self.interleave == InterleaveEnum.BSQ else 1)
+        # Elements of every band needed and written in every block of lines
+        self._needed = (np.minimum(row_starts + self.row_height, lines) - row_starts) * samples
+        self._coverage = np.zeros((bands, self.rows), dtype=np.int64)
+        # The first block not handed out yet
+        self.next = 0
+
+    def add(self, row_off: int, height: int, width: int, band: int = None):
+        """Records that a window of the .raw holds its final data, for one band or all of them."""
+        end = row_off + height
+        bands = slice(None) if band is None else band
+        for row in range(row_off // self.row_height, (end - 1) // self.row_height + 1):
+            lines = min(end, (row + 1) * self.row_height) - max(row_off, row * self.row_height)
+            self._coverage[bands, row] += lines * width
+
+    def complete(self):
+        """Hands out the blocks that are written, up to the first one that is not."""
+        while self.next < self.count and self._is_written(self.next):
+            self.next += 1
+            yield self.next - 1
+
+    def remaining(self):
+        """Hands out every block left, whether it was reported as written or not."""
+        while self.next < self.count:
+            self.next += 1
+            yield self.next - 1
+
+    def block(self, index: int):
+        # (band, lines) of a block, band being None for the blocks of every band
+        band, row = divmod(index, self.rows) if self.interleave == InterleaveEnum.BSQ else (None, index)
+        return band, slice(row * self.row_height, min((row + 1) * self.row_height, self.lines))
+
+    def end_byte(self, index: int) -> int:
+        # Offset in the .raw just past the block
+        band, lines = self.block(index)
+        return ((band or 0) * self.lines + lines.stop) * self.line_bytes
+
+    def _is_written(self, index: int) -> bool:
+        band, lines = self.block(index)
+        row = lines.start // self.row_height
+        bands = slice(None) if band is None else band
+        return bool(np.all(self._coverage[bands, row] >= self._needed[row]))
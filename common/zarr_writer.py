@@ -0,0 +1,109 @@
+# ==================================================================================
+#                           ZARR WRITER
+#
+# DESCRIPTION: This file contains the optional Zarr output of the converters. The
+#              cube is stored as a (band, y, x) array split into spatial tiles
+#              (and optionally groups of bands), each compressed on its own, so a
+#              random spatial patch is read from a handful of chunks instead of
+#              seeking across the whole .raw. The ENVI writer feeds it every row of
+#              tiles as soon as those rows of the .raw are complete, in the same
+#              pass that writes the .raw. The ENVI header fields (wavelength, fwhm,
+#              map info, units, ...) are kept as attributes of the array.
+#
+#              Requires the zarr package, version 2 or 3, which the converters list
+#              in their requirements.txt.
+#
+# ==================================================================================
+import os
+from typing import Optional
+
+from pydantic import BaseModel
+
+from ENVI import ENVIModel
+
+ZARR_EXT = ".zarr"
+ZSTD_LEVEL = 3
+COMPRESSIONS = ("zstd", "none")
+DEFAULT_CHUNK_SIZE = 256
+DEFAULT_COMPRESSION = "zstd"
+DIMENSIONS = ("band", "y", "x")
+# Header fields describing the layout of the .raw, which do not apply to the array
+RAW_LAYOUT_FIELDS = {"byte_order", "data_type", "file_type", "header_offset", "interleave"}
+
+
+class ZarrOptions(BaseModel):
+    # Directory of the Zarr array, <name>.zarr next to the .hdr by default
+    path: Optional[str] = None
+    # Lines and samples per chunk
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+    # Bands per chunk, all of them by default
+    band_chunk_size: Optional[int] = None
+    compression: str = DEFAULT_COMPRESSION
+
+
+def zarr_path(hdr_path: str, options: ZarrOptions):
+    return options.path or os.path.splitext(hdr_path)[0] + ZARR_EXT
+
+
+def import_zarr():
+    try:
+        import zarr
+    except ImportError:
+        raise ImportError("Zarr output requires the zarr package, install it with 'pip install zarr'")
+    return zarr
+
+
+class ZarrWriter:
+    def __init__(self, path: str, header: ENVIModel, dtype, options: ZarrOptions):
+        if options.compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown Zarr compression '{options.compression}', expected one of {', '.join(COMPRESSIONS)}")
+        self.path = path
+        self.header = header
+        self.dtype = dtype
+        self.options = options
+        self.shape = (header.bands, header.lines, header.samples)
+        self.chunks = (
+            min(options.band_chunk_size or header.bands, header.bands),
+            min(options.chunk_size, header.lines),
+            min(options.chunk_size, header.samples),
+        )
+        self.array = None
+
+    def open(self):
+        zarr = import_zarr()
+        compress = self.options.compression == "zstd"
+        if int(zarr.__version__.split(".")[0]) >= 3:
+            self.array = zarr.create_array(
+                store=self.path, shape=self.shape, chunks=self.chunks, dtype=self.dtype, overwrite=True,
+                compressors=[zarr.codecs.ZstdCodec(level=ZSTD_LEVEL)] if compress else None,
+                dimension_names=DIMENSIONS,
+            )
+        else:
+            from numcodecs import Zstd
+            self.array = zarr.open_array(
+                self.path, mode="w", shape=self.shape, chunks=self.chunks, dtype=self.dtype,
+                compressor=Zstd(level=ZSTD_LEVEL) if compress else None,
+            )
+        return self
+
+    @property
+    def row_height(self):
+        # Lines per row of chunks, the unit the rows are written in
+        return self.chunks[1]
+
+    def write_rows(self, row_off: int, data):
+        """
+        Writes a (band, line, sample) block of whole rows of chunks starting at line
+        row_off, one column of chunks at a time so only a chunk's worth of lines is
+        copied out of data at once.
+        """
+        for col_off in range(0, self.shape[2], self.chunks[2]):
+            cols = slice(col_off, col_off + self.chunks[2])
+            self.array[:, row_off:row_off + data.shape[1], cols] = data[:, :, cols]
+
+    def close(self):
+        # The ENVI header fields are written last, so a Zarr array with attributes is complete
+        attributes = self.header.model_dump(mode="json", exclude=RAW_LAYOUT_FIELDS, exclude_none=True)
+        attributes["_ARRAY_DIMENSIONS"] = list(DIMENSIONS)
+        self.array.attrs.update(attributes)
+        self.array = None
@@ -11,8 +11,85 @@
 #   OUTPUT_HDR_FILE_PATH   - Location of the ENVI output. This file path MUST be
 #                            the .hdr file, the .raw file will automatically be
 #                            created in the same dir
+#   STREAMING              - When True, the GeoTIFF is converted window by window
+#                            straight into the .raw file instead of being read
+#                            into memory as a whole
+#   CHUNK_SIZE_MB          - Upper bound (in MB) of the data held in memory per
+#                            window when STREAMING is enabled
+#   INSPECT                - When True, only the ENVI header that would be written
+#                            is printed, without reading any pixel data
+#   INTERLEAVE             - Interleave of the ENVI output (BSQ, BIL or BIP). When
+#                            the GeoTIFF is already stored in that order (BIP for
+#                            pixel, BSQ for band interleaved files), it is read
+#                            straight into the .raw without reordering
+#                            (BIL by default, earlier versions wrote BIP to a .img)
+#   RESUMABLE              - When True, the GeoTIFF is converted window by window
+#                            and every finished window is recorded in a .journal
+#                            file beside the .hdr, so a rerun of an interrupted
+#                            conversion skips the windows already written
+#   PROFILE_PATH           - JSON lines file the time, bytes processed and peak
+#                            memory of every stage of the conversion are appended
+#                            to. Leave empty to disable profiling
+#   ZARR_OUTPUT            - When True, the cube is also written to a chunked Zarr
+#                            array (<name>.zarr next to the .hdr) in the same pass,
+#                            with the wavelengths, fwhm and map info as attributes.
+#                            Requires the zarr package (pip install zarr)
+#   ZARR_CHUNK_SIZE        - Lines and samples per Zarr chunk
+#   ZARR_BAND_CHUNK_SIZE   - Bands per Zarr chunk, 0 for all bands
+#   ZARR_COMPRESSION       - Compression of the Zarr chunks (zstd or none)
+#   WAVELENGTH_RANGE       - [min, max] wavelengths (nm) of the bands to convert,
+#                            empty for all bands. Only the selected bands are
+#                            read, and the wavelength and fwhm lists of the header
+#                            are trimmed to match
+#   BAND_LIST              - Numbers (counted from 1) of the bands to convert,
+#                            empty for all bands
+#   EXCLUDE_BANDS          - Numbers of the bands to leave out
+#   EXCLUDE_WAVELENGTH_RANGES - [min, max] wavelength ranges (nm) to leave out,
+#                            e.g. [[1340, 1460], [1790, 1960]] for the water
+#                            absorption bands
+#   AOI_BBOX               - [min x, min y, max x, max y] of an area of interest,
+#                            empty for the whole scene. Only the pixel window
+#                            covering it is read, and the map info of the output
+#                            starts at the corner of that window
+#   AOI_POLYGON            - [[x, y], ...] vertices of a polygon to crop to the
+#                            bounding box of instead of AOI_BBOX
+#   AOI_CRS                - CRS of the AOI coordinates, e.g. "EPSG:4326" for
+#                            lon/lat, empty for the CRS of the scene
+#   NATIVE_DTYPE           - When True, the data keeps the integer type of the
+#                            GeoTIFF and the reflectance scaling is written to the
+#                            header as data gain values and data offset values
+#                            instead of being applied, halving the .raw size
+#   CHECKSUMS              - When True, the SHA-256 of the .raw and the CRC-32 of
+#                            every band are computed while the .raw is written and
+#                            saved to <name>.checksums next to the .hdr
+#   UPLOAD_DESTINATION     - Directory the outputs are uploaded to while the .raw
+#                            is written, part by part, so the upload is done soon
+#                            after the conversion. Leave empty to disable uploads
+#   UPLOAD_PART_SIZE_MB    - Size (in MB) of the parts the .raw is uploaded in. An
+#                            interrupted upload is resumed part by part on rerun
 # ==================================================================================
 
 GEOTIFF_FILE_PATH = "/location/to/enmap/img.TIF"
 XML_METADATA_FILE_PATH = "/location/to/enmap/metadata.XML"
 OUTPUT_HDR_FILE_PATH = "/location/to/where/you/want/to/save/the/output.hdr"
+STREAMING = False
+CHUNK_SIZE_MB = 64
+INSPECT = False
+INTERLEAVE = "BIL"
+RESUMABLE = False
+PROFILE_PATH = ""
+ZARR_OUTPUT = False
+ZARR_CHUNK_SIZE = 256
+ZARR_BAND_CHUNK_SIZE = 0
+ZARR_COMPRESSION = "zstd"
+WAVELENGTH_RANGE = []
+BAND_LIST = []
+EXCLUDE_BANDS = []
+EXCLUDE_WAVELENGTH_RANGES = []
+AOI_BBOX = []
+AOI_POLYGON = []
+AOI_CRS = ""
+NATIVE_DTYPE = False
+CHECKSUMS = False
+UPLOAD_DESTINATION = ""
+UPLOAD_PART_SIZE_MB = 16
\ No newline at end of file
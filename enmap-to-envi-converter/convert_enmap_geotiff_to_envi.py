@@ -2,52 +2,96 @@
 DESCRIPTION: Python script that converts an EnMap GeoTIFF to ENVI Standard.
 """
 import os
+import sys
 import rasterio
 
 import numpy as np
-import xml.etree.ElementTree as ET
 
-from spectral import envi
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "common"))
+from aoi import AOI, aoi_window, as_aoi, cropped_transform, full_window
+from band_scaling import BandScaler
+from band_selection import BandSelection, as_band_selection, source_band_count
+from chunk_journal import ChunkJournal, journal_fingerprint, journal_path, window_key
+from chunk_windows import iter_chunk_windows, relative_window
+from envi_writer import ENVIWriter, prepare_header
+from ENVI import ENVIModel, InterleaveEnum
+from spectral_metadata import ENMAP as ENMAP_SCHEMA, read_spectral_metadata
+from source_layout import REORDER, copy_source, describe, open_source, write_path
+from stage_profiler import StageProfiler, profiled, profiled_conversion
+from writer_options import WriterOptions, as_writer_options
 
 # Hard coded constants specific to an EnMap GeoTIFF file
 WAVELENGTH_UNITS = 'nm'
 DATA_IGNORE_VALUE = 0
+# Fill value of the digital numbers, which scales to DATA_IGNORE_VALUE
+NATIVE_DATA_IGNORE_VALUE = -32768
 FILE_TYPE = "ENVI"
-HEADER_OFFSET = 0
-BYTE_ORDER = 0
 INTERLEAVE = "BIL"
+OUTPUT_DTYPE = np.float32  # see process_hsi_data, unless native_dtype
+DEFAULT_CHUNK_SIZE_MB = 64
+# Maps the signed int16 digital numbers onto [0, 1]
+DN_OFFSET = 32768.0
+DN_RANGE = 65535.0
+
 
 class EnMapConverter(object):
-    def __init__(self, geotiff_path: str, metadata_path: str, output_dir: str):
+    def __init__(self, geotiff_path: str, metadata_path: str, output_dir: str,
+                 streaming: bool = False, chunk_size_mb: int = DEFAULT_CHUNK_SIZE_MB, interleave: str = INTERLEAVE,
+                 resumable: bool = False, profiler: StageProfiler = None, band_selection: BandSelection = None,
+                 aoi: AOI = None, native_dtype: bool = False, writer_options: WriterOptions = None):
         self.geotiff_path = geotiff_path
         self.metadata_path = metadata_path
         self.output_dir = output_dir
+        self.streaming = streaming
+        self.resumable = resumable
+        self.profiler = profiler or StageProfiler()
+        self.band_selection = as_band_selection(band_selection)
+        self.band_indexes = None
+        self.aoi = as_aoi(aoi)
+        self.aoi_window = None
+        # Keeps the integer type of the GeoTIFF and records the scaling as the data gain
+        # and offset values of the header instead of writing scaled float32
+        self.native_dtype = native_dtype
+        self.writer_options = as_writer_options(writer_options)
+        self.output_dtype = np.dtype(OUTPUT_DTYPE)
+        self.chunk_size = chunk_size_mb * 1024 * 1024
         self.wavelengths = []
         self.wavelength_units = WAVELENGTH_UNITS
         self.data_ignore_value = DATA_IGNORE_VALUE
         self.file_type = FILE_TYPE
         self.map_info = ""
-        self.header_offset = HEADER_OFFSET
         self.lines = 0
         self.samples = 0
         self.bands = 0
-        self.byte_order = BYTE_ORDER
-        self.interleave = INTERLEAVE
-        self.data_type = -1
+        self.interleave = interleave
+        self.write_path = REORDER
         self.fwhm = []
         self.data = []
 
+    @profiled_conversion("enmap")
     def convert_geotiff(self):
         print("Validating input files...")
         self.validate_input_file()
         print("Starting conversion...")
         self.parse_metadata_file()
-        self.parse_geotiff_file()
-        self.get_data_type()
-        self.validate_wavelengths()
-        print("Creating ENVI files...")
-        self.create_envi_files()
+        self.select_bands()
+        # The GeoTIFF is opened once for the whole conversion, as in inspect
+        with rasterio.open(self.geotiff_path) as src:
+            self.get_write_path(src)
+            if self.streaming or self.resumable or self.write_path != REORDER:
+                self.parse_geotiff_header(src)
+            else:
+                self.parse_geotiff_file(src)
+            self.validate_wavelengths()
+            print("Creating ENVI files...")
+            if self.write_path != REORDER:
+                self.copy_envi_files(src)
+            elif self.streaming or self.resumable:
+                self.stream_envi_files(src)
+            else:
+                self.create_envi_files()
 
+    @profiled("validate")
     def validate_input_file(self):
         if not os.path.isfile(self.geotiff_path):
             print(f"ERROR: GeoTIFF file doesn't exist - {self.geotiff_path}")
@@ -57,95 +101,195 @@ class EnMapConverter(object):
             raise FileNotFoundError(f"{self.metadata_path} was not found or is a directory")
         print("GeoTIFF and XML Metadata files are valid")
 
+    @profiled("metadata")
     def parse_metadata_file(self):
-        # constants specific to reading the XML Metadata file
-        band_info_root = "specific/bandCharacterisation"
-        band_str = 'bandID'
-        band_num = 'number'
-        wavelength_txt = 'wavelengthCenterOfBand'
-        fwhm_txt = 'FWHMOfBand'
-
-        tree = ET.parse(self.metadata_path)
-        root = tree.getroot()
-        band_statistics = root.find(band_info_root)
-
-        if band_statistics is not None:
-            for element in band_statistics.iter(band_str):
-                number = element.attrib[band_num]
-                self.wavelengths.append(float(element.find(wavelength_txt).text))
-                self.fwhm.append(float(element.find(fwhm_txt).text))
+        # The bandCharacterisation of the metadata holds the wavelength and FWHM of every band
+        metadata = read_spectral_metadata(self.metadata_path, ENMAP_SCHEMA)
+        self.wavelengths = metadata.wavelengths
+        self.fwhm = metadata.fwhm
         print("XML Metadata file parsed")
 
-    def get_byte_order(self):                
-        with open(self.geotiff_path, 'rb') as tiff_file:
-            # Read the first 2 bytes of the file
-            header = tiff_file.read(2)
-            if header == b'II':
-                self.byte_order = 0
-            elif header == b'MM':
-                self.byte_order = 1
-            else:
-                self.byte_order = -1
+    def select_bands(self):
+        # The selected bands are resolved against the wavelengths of the metadata, so
+        # their indexes are known before any pixel data is read
+        if self.band_selection is None:
+            return
+        selected = self.band_selection.select(self.wavelengths)
+        print(f"Selected {len(selected)} of {len(self.wavelengths)} bands")
+        self.band_indexes = [i + 1 for i in selected]
+        self.wavelengths = [self.wavelengths[i] for i in selected]
+        self.fwhm = [self.fwhm[i] for i in selected]
 
-    def get_data_type(self):
-        with rasterio.open(self.geotiff_path) as src:
-            match src.dtypes[0]:
-                case "byte":
-                    self.data_type = 1
-                case "int16":
-                    self.data_type = 2
-                case _:
-                    self.data_type = -1
-
-    def parse_geotiff_file(self):
-        with rasterio.open(self.geotiff_path) as src:
+    @profiled("metadata")
+    def get_write_path(self, src=None):
+        with open_source(self.geotiff_path, src) as src:
+            self.locate_aoi(src)
+            self.get_output_dtype(src)
+            self.write_path = write_path(src, self.geotiff_path, self.interleave, self.output_dtype, self.band_indexes,
+                                         self.aoi_window)
+        print(describe(self.write_path, self.interleave))
+
+    def locate_aoi(self, src):
+        # The pixel window covering the area of interest, the whole scene without one
+        self.aoi_window = aoi_window(src, self.aoi)
+        if self.aoi is not None:
+            window = self.aoi_window
+            print(f"Area of interest covers lines {window.row_off} to {window.row_off + window.height - 1} "
+                  f"and samples {window.col_off} to {window.col_off + window.width - 1}")
+
+    def get_output_dtype(self, src):
+        self.output_dtype = np.dtype(src.dtypes[0] if self.native_dtype else OUTPUT_DTYPE)
+        if self.native_dtype:
+            # A stored 0 is a valid digital number, the fill value of the GeoTIFF is ignored instead
+            self.data_ignore_value = int(src.nodata) if src.nodata is not None else NATIVE_DATA_IGNORE_VALUE
+
+    def parse_geotiff_file(self, src=None):
+        with open_source(self.geotiff_path, src) as src:
             # Get the geospatial metadata (map information).
             crs = src.crs
-            transform = src.transform
+            transform = cropped_transform(src, self.aoi_window)
             self.map_info = f'{crs}, 1.000, 1.000, {transform.c}, {transform.f}, {transform.a}, {transform.e}'
-            self.data = src.read()
-            self.lines = self.data.shape[2]
-            self.samples = self.data.shape[1]
+            with self.profiler.stage("read") as stage:
+                self.data = src.read(self.band_indexes, window=self.aoi_window)
+                stage.add(self.data.nbytes)
+            self.lines = self.data.shape[1]
+            self.samples = self.data.shape[2]
             self.bands = self.data.shape[0]
             print(f"The dimensions of the image are: {self.data.shape}")
             print(f"Lines = {self.lines} | Samples = {self.samples} | Bands = {self.bands}")
         print("GeoTIFF file parsed")
 
+    @profiled("metadata")
+    def parse_geotiff_header(self, src=None):
+        # Same as parse_geotiff_file but leaves the pixel data on disk for stream_envi_files
+        with open_source(self.geotiff_path, src) as src:
+            self.read_geotiff_header(src)
+        print("GeoTIFF header parsed")
+
+    def read_geotiff_header(self, src):
+        crs = src.crs
+        transform = cropped_transform(src, self.aoi_window)
+        self.map_info = f'{crs}, 1.000, 1.000, {transform.c}, {transform.f}, {transform.a}, {transform.e}'
+        window = self.aoi_window or full_window(src)
+        self.lines = window.height
+        self.samples = window.width
+        self.bands = source_band_count(src, self.band_indexes)
+        print(f"Lines = {self.lines} | Samples = {self.samples} | Bands = {self.bands}")
+
+    def inspect(self):
+        # Returns the header the conversion would write, reading only the XML and the
+        # GeoTIFF header (a single GDAL open) and never the pixel data
+        self.parse_metadata_file()
+        self.select_bands()
+        with rasterio.open(self.geotiff_path) as src:
+            self.locate_aoi(src)
+            self.get_output_dtype(src)
+            self.read_geotiff_header(src)
+        self.validate_wavelengths()
+        return self.get_envi_header().dict()
+
     def validate_wavelengths(self):
         if len(self.wavelengths) != self.bands:
             print(f"ERROR: The number of wavelengths ({len(self.wavelengths)}) does not equal the number of bands ({self.bands})")
         if len(self.fwhm) != self.bands:
             print(f"ERROR: The number of fwhm ({len(self.fwhm)}) does not equal the number of bands ({self.bands})")
 
-    def process_hsi_data(self):
-        hsi_data = np.transpose(self.data, [1, 2, 0])
-        hsi_data = hsi_data + 32768.0
-        hsi_data = hsi_data.astype(np.float32)
-        hsi_data = hsi_data / 65535.0
-        return hsi_data
+    def get_scaler(self):
+        return BandScaler.uniform(self.bands, offset=DN_OFFSET, divisor=DN_RANGE)
+
+    def process_hsi_data(self, out=None):
+        # Scales the (band, line, sample) data onto [0, 1], straight into out when given
+        with self.profiler.stage("scale", self.data.size * np.dtype(OUTPUT_DTYPE).itemsize):
+            return self.get_scaler().apply_chunked(self.data, band_axis=0, out=out, chunk_size=self.chunk_size)
+
+    def get_envi_header(self):
+        header = ENVIModel(
+            wavelength=self.wavelengths,
+            wavelength_units=self.wavelength_units,
+            data_ignore_value=self.data_ignore_value,
+            map_info=self.map_info,
+            lines=self.lines,
+            samples=self.samples,
+            bands=self.bands,
+            file_type=self.file_type,
+            interleave=self.interleave.lower(),
+            fwhm=self.fwhm,
+        )
+        if self.native_dtype:
+            header.data_gain_values, header.data_offset_values = self.get_scaler().header_values()
+        return prepare_header(header, self.output_dtype)
+
+    def get_journal(self):
+        # Only resumable conversions keep a journal of the written chunks beside the .hdr
+        if not self.resumable:
+            return None
+        fingerprint = journal_fingerprint(
+            [self.geotiff_path, self.metadata_path],
+            interleave=self.interleave.lower(),
+            chunk_size=self.chunk_size,
+            write_path=self.write_path,
+            bands=self.band_indexes,
+            region=window_key(self.aoi_window),
+            native_dtype=self.native_dtype,
+        )
+        return ChunkJournal(journal_path(self.output_dir), fingerprint)
 
     def create_envi_files(self):
-        metadata = {
-            "wavelength": self.wavelengths,
-            "wavelength units": self.wavelength_units,
-            "data ignore value": self.data_ignore_value,
-            "map info": self.map_info,
-            "lines": self.lines,
-            "samples": self.samples,
-            "bands": self.bands,
-            "file type": self.file_type,
-            "header offset": self.header_offset,
-            "byte order": self.byte_order,
-            "interleave": self.interleave,
-            "data type": self.data_type,
-            "fwhm": self.fwhm,
-        }
-
-        hsi_data = self.process_hsi_data()
-
-        envi.save_image(self.output_dir, hsi_data, metadata=metadata, force=True)
+        with ENVIWriter(self.output_dir, self.get_envi_header(), self.output_dtype, profiler=self.profiler,
+                        options=self.writer_options) as writer:
+            if self.native_dtype:
+                writer.write(self.data)
+            else:
+                self.process_hsi_data(out=writer.as_interleave(InterleaveEnum.BSQ))
 
         if os.path.isfile(self.output_dir):
             print("ENVI Files successfully created.")
         else:
-            print("ERROR: The ENVI Header File was not successfully created.")
\ No newline at end of file
+            print("ERROR: The ENVI Header File was not successfully created.")
+
+    def copy_envi_files(self, src=None):
+        # The GeoTIFF is stored in the output interleave, so every window is read straight
+        # into the .raw and scaled in place there (or its strips copied as they are, when
+        # the scaling is left to the header)
+        scaler = self.get_scaler()
+        process = None if self.native_dtype else lambda out: scaler.apply(out, band_axis=0, out=out)
+        with ENVIWriter(self.output_dir, self.get_envi_header(), self.output_dtype, journal=self.get_journal(),
+                        profiler=self.profiler, options=self.writer_options) as writer, \
+                open_source(self.geotiff_path, src) as src:
+            self.write_path = copy_source(src, self.geotiff_path, writer, self.chunk_size, process=process,
+                                          indexes=self.band_indexes, region=self.aoi_window)
+
+        if os.path.isfile(self.output_dir) and os.path.isfile(writer.raw_path):
+            print("ENVI Files successfully created.")
+        else:
+            print("ERROR: The ENVI Header File was not successfully created.")
+
+    def stream_envi_files(self, src=None):
+        # Writes the .raw one window at a time, so only a single chunk is ever held in memory
+        scaler = self.get_scaler()
+        pixel_bytes = self.bands * self.output_dtype.itemsize
+        with ENVIWriter(self.output_dir, self.get_envi_header(), self.output_dtype, journal=self.get_journal(),
+                        profiler=self.profiler, options=self.writer_options) as writer, \
+                open_source(self.geotiff_path, src) as src:
+            for window in iter_chunk_windows(src, self.chunk_size, pixel_bytes, self.aoi_window):
+                if writer.is_done(window_key(window)):
+                    continue
+                target = relative_window(window, self.aoi_window)
+                out = writer.window(target.row_off, target.col_off, target.height, target.width)
+                with self.profiler.stage("read") as stage:
+                    if self.native_dtype:
+                        # Read straight into the .raw, the scaling is left to the header
+                        chunk = src.read(self.band_indexes, window=window, out=out)
+                    else:
+                        chunk = src.read(self.band_indexes, window=window)
+                    stage.add(chunk.nbytes)
+                if not self.native_dtype:
+                    with self.profiler.stage("scale", out.nbytes):
+                        scaler.apply(chunk, band_axis=0, out=out)
+                writer.flush(target)
+                writer.mark_done(window_key(window))
+
+        if os.path.isfile(self.output_dir) and os.path.isfile(writer.raw_path):
+            print("ENVI Files successfully created.")
+        else:
+            print("ERROR: The ENVI Header File was not successfully created.")
@@ -2,6 +2,10 @@
 DESCRIPTION: The main python file to be executed.
 """
 from convert_enmap_geotiff_to_envi import EnMapConverter
+from aoi import aoi_from
+from band_selection import band_selection_from
+from stage_profiler import StageProfiler
+from writer_options import writer_options_from
 import constants
 import time
 
@@ -11,8 +15,22 @@ print("==============================================")
 
 start_time = time.time()
 
-converter = EnMapConverter(constants.GEOTIFF_FILE_PATH, constants.XML_METADATA_FILE_PATH, constants.OUTPUT_HDR_FILE_PATH)
-converter.convert_geotiff()
+band_selection = band_selection_from(constants.WAVELENGTH_RANGE, constants.BAND_LIST, constants.EXCLUDE_BANDS,
+                                     constants.EXCLUDE_WAVELENGTH_RANGES)
+aoi = aoi_from(constants.AOI_BBOX, constants.AOI_POLYGON, constants.AOI_CRS)
+writer_options = writer_options_from(constants.ZARR_OUTPUT, constants.ZARR_CHUNK_SIZE, constants.ZARR_BAND_CHUNK_SIZE,
+                                     constants.ZARR_COMPRESSION, constants.CHECKSUMS, constants.UPLOAD_DESTINATION,
+                                     constants.UPLOAD_PART_SIZE_MB)
+converter = EnMapConverter(constants.GEOTIFF_FILE_PATH, constants.XML_METADATA_FILE_PATH, constants.OUTPUT_HDR_FILE_PATH,
+                           streaming=constants.STREAMING, chunk_size_mb=constants.CHUNK_SIZE_MB,
+                           interleave=constants.INTERLEAVE, resumable=constants.RESUMABLE,
+                           profiler=StageProfiler(path=constants.PROFILE_PATH), band_selection=band_selection,
+                           aoi=aoi, native_dtype=constants.NATIVE_DTYPE, writer_options=writer_options)
+if constants.INSPECT:
+    for key, value in converter.inspect().items():
+        print(f"{key} = {value}")
+else:
+    converter.convert_geotiff()
 
 end_time = time.time()
 total_time = end_time - start_time
@@ -0,0 +1,75 @@
+# ==================================================================================
+#                           MAIN FILE
+#
+# DESCRIPTION: This file contains the CLI interface for tools that work on ENVI
+#              files the converters have already written.
+#
+# ==================================================================================
+import time
+from typing import List
+
+import typer
+
+from reinterleave import DEFAULT_BLOCK_SIZE_MB, reinterleave
+from verify import find_headers, verify_envi_file
+
+# Rich help is turned off, like in the other CLIs, it is slower to import than the rest
+app = typer.Typer(add_completion=False, rich_markup_mode=None)
+
+
+@app.callback()
+def callback():
+    """Tools for ENVI Standard Files written by the converters."""
+
+
+@app.command("reinterleave")
+def reinterleave_command(
+    hdr_path: str = typer.Argument(..., help="Header (.hdr) of the ENVI file"),
+    interleave: str = typer.Argument(..., help="Target interleave (bsq, bil or bip)"),
+    output: str = typer.Option(
+        None, "--output", "-o", help="Header path of the copy (defaults to <name>_<interleave>.hdr)"
+    ),
+    block_size_mb: int = typer.Option(
+        DEFAULT_BLOCK_SIZE_MB, "--block-size-mb", "-b", help="Size of the blocks of lines moved at a time"
+    ),
+):
+    """Write a copy of an ENVI file in another interleave, a block of lines at a time."""
+    if interleave.lower() not in ("bsq", "bil", "bip"):
+        typer.echo(f"Unknown interleave '{interleave}', expected bsq, bil or bip")
+        raise typer.Exit(1)
+
+    start_time = time.time()
+    output_path = reinterleave(hdr_path, interleave, output, block_size_mb=block_size_mb)
+    total_time = time.time() - start_time
+
+    print(f"Re-interleaved {hdr_path} to {interleave.lower()}: {output_path}")
+    print(f"Completed in {total_time:.3f} seconds")
+
+
+@app.command("verify")
+def verify_command(
+    paths: List[str] = typer.Argument(..., help="Headers (.hdr), or directories searched for headers"),
+    quiet: bool = typer.Option(False, "--quiet", "-q", help="Only print the files with problems"),
+):
+    """Check that ENVI headers are complete and match their data files, without reading pixels."""
+    start_time = time.time()
+    verified = failed = 0
+    for hdr_path in find_headers(paths):
+        problems = verify_envi_file(hdr_path)
+        verified += 1
+        if problems:
+            failed += 1
+            print(f"FAILED {hdr_path}")
+            for problem in problems:
+                print(f"    {problem}")
+        elif not quiet:
+            print(f"OK     {hdr_path}")
+    total_time = time.time() - start_time
+
+    print(f"Verified {verified} ENVI files in {total_time:.3f} seconds, {failed} with problems")
+    if failed or not verified:
+        raise typer.Exit(1)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,126 @@
+# ==================================================================================
+#                           RE-INTERLEAVE
+#
+# DESCRIPTION: This file contains the logic for changing the interleave of an
+#              existing ENVI .hdr/.raw pair between BSQ, BIL and BIP without going
+#              back to the GeoTIFF. Both files are memory mapped and the cube is
+#              moved one block of lines at a time, so only two blocks are ever held
+#              in memory whatever the size of the cube. Between BSQ and BIP, where
+#              the band axis goes from slowest to fastest, a block is transposed one
+#              line (every band of it) at a time, which keeps each copy within the
+#              CPU cache.
+#
+# ==================================================================================
+import mmap
+import os
+import re
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "common"))
+from envi_header import find_data_file, header_dtype, read_envi_header
+from envi_writer import interleave_shape
+from ENVI import InterleaveEnum, TRANSPOSE_MAP
+
+DEFAULT_BLOCK_SIZE_MB = 64
+# Layout pairs that are transposed line by line, numpy copies the others faster at once
+LINE_BY_LINE_PAIRS = ((InterleaveEnum.BSQ, InterleaveEnum.BIP), (InterleaveEnum.BIP, InterleaveEnum.BSQ))
+
+
+def line_index(interleave: InterleaveEnum, lines: slice):
+    # Every interleave has lines on its first axis except BSQ, which has them second
+    return (slice(None), lines) if interleave == InterleaveEnum.BSQ else (lines,)
+
+
+def update_header_text(text: str, interleave: InterleaveEnum):
+    """
+    Rewrites only the interleave and header offset of a header, so every other field
+    (including the ones ENVIModel does not know about) is kept as it was.
+    """
+    text = re.sub(r"(?im)^(\s*interleave\s*=).*$", rf"\g<1> {interleave.value}", text)
+    if re.search(r"(?im)^\s*header offset\s*=", text):
+        text = re.sub(r"(?im)^(\s*header offset\s*=).*$", r"\g<1> 0", text)
+    return text
+
+
+def map_file(path: str, dtype: np.dtype, shape: tuple, offset: int = 0, write: bool = False):
+    """
+    Memory maps a file as an array of shape, creating it when write is set. Returns the
+    map along with the array, for release_pages and for closing it once the array is gone.
+    """
+    size = offset + int(np.prod(shape)) * dtype.itemsize
+    with open(path, "w+b" if write else "rb") as f:
+        if write:
+            f.truncate(size)
+        mapped = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_WRITE if write else mmap.ACCESS_READ)
+    return mapped, np.ndarray(shape, dtype=dtype, buffer=mapped, offset=offset)
+
+
+def release_pages(mapped: mmap.mmap):
+    # Pages of the maps count towards the resident memory of the process until they are
+    # released, which would otherwise grow to the size of both files
+    if hasattr(mmap, "MADV_DONTNEED"):
+        mapped.madvise(mmap.MADV_DONTNEED)
+
+
+def copy_by_line(src: np.ndarray, dst: np.ndarray):
+    # src and dst are views of the same (line, sample, band) block in different memory orders
+    for line in range(src.shape[0]):
+        dst[line] = src[line]
+
+
+def reinterleave(hdr_path: str, interleave: str, output_path: str = None,
+                 block_size_mb: int = DEFAULT_BLOCK_SIZE_MB):
+    """
+    Writes a copy of an ENVI file in another interleave and returns the path of its
+    header. The output defaults to <name>_<interleave>.hdr next to the input.
+    """
+    target = InterleaveEnum(interleave.lower())
+    header = read_envi_header(hdr_path)
+    source = InterleaveEnum(header["interleave"].lower())
+    bands, lines, samples = int(header["bands"]), int(header["lines"]), int(header["samples"])
+    dtype = header_dtype(header)
+
+    if output_path is None:
+        output_path = f"{os.path.splitext(hdr_path)[0]}_{target.value}.hdr"
+    data_path = find_data_file(hdr_path)
+    output_data_path = os.path.splitext(output_path)[0] + os.path.splitext(data_path)[1]
+    if os.path.abspath(output_data_path) == os.path.abspath(data_path):
+        raise ValueError("The output can not overwrite the input, choose another output path")
+
+    src_map, src = map_file(data_path, dtype, interleave_shape(source, bands, lines, samples),
+                            offset=int(header.get("header offset", 0)))
+    dst_map, dst = map_file(output_data_path, dtype, interleave_shape(target, bands, lines, samples), write=True)
+
+    line_bytes = bands * samples * dtype.itemsize
+    block_lines = max(1, block_size_mb * 1024 * 1024 // line_bytes)
+    src_buffer = np.empty(block_lines * bands * samples, dtype=dtype)
+    dst_buffer = np.empty(block_lines * bands * samples, dtype=dtype)
+    for start in range(0, lines, block_lines):
+        rows = slice(start, min(start + block_lines, lines))
+        height = rows.stop - rows.start
+        # Read the block sequentially, transpose it in memory, then write it sequentially
+        src_block = src_buffer[:height * bands * samples].reshape(interleave_shape(source, bands, height, samples))
+        dst_block = dst_buffer[:height * bands * samples].reshape(interleave_shape(target, bands, height, samples))
+        src_block[...] = src[line_index(source, rows)]
+        if (source, target) in LINE_BY_LINE_PAIRS:
+            copy_by_line(
+                np.transpose(src_block, TRANSPOSE_MAP[(source, InterleaveEnum.BIP)]),
+                np.transpose(dst_block, TRANSPOSE_MAP[(target, InterleaveEnum.BIP)]),
+            )
+        else:
+            dst_block[...] = np.transpose(src_block, TRANSPOSE_MAP[(source, target)])
+        dst[line_index(target, rows)] = dst_block
+        dst_map.flush()
+        release_pages(src_map)
+        release_pages(dst_map)
+    del src, dst
+    src_map.close()
+    dst_map.close()
+
+    with open(hdr_path) as hdr_file:
+        text = hdr_file.read()
+    with open(output_path, "w") as hdr_file:
+        hdr_file.write(update_header_text(text, target))
+    return output_path
@@ -0,0 +1,132 @@
+# ==================================================================================
+#                           VERIFY
+#
+# DESCRIPTION: This file contains the checks of ENVI .hdr/.raw pairs the converters
+#              have written. Only the header is read and the data file is sized
+#              with a stat, so no pixel is ever loaded and thousands of outputs are
+#              verified in seconds. A pair is consistent when:
+#
+#              - samples, lines, bands, data type, interleave and byte order are
+#                present and valid
+#              - the data file holds header offset + lines * samples * bands *
+#                bytes per value bytes, no more and no less
+#              - every per-band list (wavelength, fwhm, gain and offset values, ...)
+#                has one numeric entry per band
+#              - with a checksum manifest (see checksums.py), the .hdr still has the
+#                checksum and the data file the size it lists, and there is a
+#                checksum for every band. The .raw is not hashed again
+#
+# ==================================================================================
+import os
+import sys
+from typing import Iterator, List
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "common"))
+from checksums import file_checksum, manifest_path, read_manifest
+from envi_header import BAND_LIST_KEYS, find_data_file, header_dtype, read_envi_header
+from ENVI import InterleaveEnum
+
+REQUIRED_KEYS = ("samples", "lines", "bands", "data type", "interleave", "byte order")
+# Lists that hold names rather than numbers
+TEXT_LIST_KEYS = ("band names",)
+
+
+def find_headers(paths: List[str]) -> Iterator[str]:
+    # Headers given directly, and the .hdr files anywhere below the given directories
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for directory, _, file_names in os.walk(path):
+            for file_name in sorted(file_names):
+                if file_name.lower().endswith(".hdr"):
+                    yield os.path.join(directory, file_name)
+
+
+def verify_envi_file(hdr_path: str) -> List[str]:
+    """
+    Checks that an ENVI header is complete and matches its data file, and returns
+    the problems found (an empty list when there are none).
+    """
+    try:
+        header = read_envi_header(hdr_path)
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        return [f"unreadable header: {e}"]
+
+    problems = [f"missing '{key}'" for key in REQUIRED_KEYS if key not in header]
+    if problems:
+        return problems
+
+    dimensions = {}
+    for key in ("samples", "lines", "bands", "header offset"):
+        try:
+            dimensions[key] = int(header.get(key, 0))
+        except ValueError:
+            problems.append(f"'{key}' is not an integer: {header[key]}")
+            continue
+        if dimensions[key] < (0 if key == "header offset" else 1):
+            problems.append(f"'{key}' is out of range: {dimensions[key]}")
+    if header["interleave"].lower() not in {interleave.value for interleave in InterleaveEnum}:
+        problems.append(f"unknown interleave '{header['interleave']}', expected bsq, bil or bip")
+    try:
+        dtype = header_dtype(header)
+    except ValueError as e:
+        problems.append(str(e))
+        dtype = None
+
+    bands = dimensions.get("bands")
+    for key in BAND_LIST_KEYS:
+        if key not in header:
+            continue
+        values = header[key]
+        if not isinstance(values, list):
+            problems.append(f"'{key}' is not a list in curly brackets")
+            continue
+        if bands is not None and len(values) != bands:
+            problems.append(f"'{key}' has {len(values)} entries for {bands} bands")
+        if key not in TEXT_LIST_KEYS and not is_numeric(values):
+            problems.append(f"'{key}' has entries that are not numbers")
+
+    try:
+        data_path = find_data_file(hdr_path)
+    except FileNotFoundError as e:
+        problems.append(str(e))
+        return problems
+    if dtype is not None and len(dimensions) == 4:
+        expected = dimensions["header offset"] + (
+            dimensions["lines"] * dimensions["samples"] * dimensions["bands"] * dtype.itemsize
+        )
+        size = os.path.getsize(data_path)
+        if size != expected:
+            problems.append(
+                f"{os.path.basename(data_path)} is {size} bytes, the header describes {expected} bytes"
+            )
+    if os.path.isfile(manifest_path(hdr_path)):
+        problems += verify_manifest(hdr_path, data_path, dimensions.get("bands"))
+    return problems
+
+
+def verify_manifest(hdr_path: str, data_path: str, bands: int) -> List[str]:
+    try:
+        manifest = read_manifest(manifest_path(hdr_path))
+    except (OSError, ValueError) as e:
+        return [f"unreadable checksum manifest: {e}"]
+    problems = []
+    if file_checksum(hdr_path).checksum != manifest.header.checksum:
+        problems.append("the header does not match its checksum in the manifest")
+    if os.path.getsize(data_path) != manifest.raw.size:
+        problems.append(f"{os.path.basename(data_path)} is not the {manifest.raw.size} bytes listed in the manifest")
+    if bands is not None and len(manifest.bands.checksums) != bands:
+        problems.append(f"the manifest has {len(manifest.bands.checksums)} band checksums for {bands} bands")
+    return problems
+
+
+def is_numeric(values: List[str]) -> bool:
+    # numpy parses the whole list at once, much faster than float() value by value
+    try:
+        np.asarray(values, dtype=np.float64)
+    except ValueError:
+        return False
+    return True
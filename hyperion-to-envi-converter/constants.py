@@ -9,6 +9,18 @@
 #   OUTPUT_HDR_FILE_PATH   - Location of the ENVI output. This file path MUST be
 #                            the .hdr file, the .raw file will automatically be
 #                            created in the same dir
+#   WORKERS           - Number of threads reading band files in parallel when
+#                       GEOTIFF_PATH is a directory
+#   PROFILE_PATH      - JSON lines file the time, bytes processed and peak memory
+#                       of every stage of the conversion are appended to
+#   ZARR_OUTPUT       - When True, the cube is also written to a chunked Zarr array
+#                       (<name>.zarr next to the .hdr), see --zarr
+#   ZARR_CHUNK_SIZE   - Lines and samples per Zarr chunk, see --zarr-chunk-size
+#   ZARR_BAND_CHUNK_SIZE - Bands per Zarr chunk, 0 for all bands
+#   ZARR_COMPRESSION  - Compression of the Zarr chunks (zstd or none)
+#   UPLOAD_DESTINATION - Directory the outputs are uploaded to while the .raw is
+#                       written, see --upload-to. Leave empty to disable uploads
+#   UPLOAD_PART_SIZE_MB - Size (in MB) of the parts the .raw is uploaded in
 # ==================================================================================
 
 # If your GeoTIFF is split into multiple band files, use the directory path
@@ -20,3 +32,21 @@ GEOTIFF_PATH = ""
 
 # Example: OUTPUT_HDR_FILE_PATH ="/location/to/where/you/want/to/save/the/output.hdr"
 OUTPUT_HDR_FILE_PATH = ""
+
+# Example: WORKERS = 8
+WORKERS = 1
+
+# Example: PROFILE_PATH = "/location/to/profile.jsonl"
+PROFILE_PATH = ""
+
+# Example: ZARR_OUTPUT = True
+ZARR_OUTPUT = False
+
+# Example: ZARR_CHUNK_SIZE = 512
+ZARR_CHUNK_SIZE = 256
+ZARR_BAND_CHUNK_SIZE = 0
+ZARR_COMPRESSION = "zstd"
+
+# Example: UPLOAD_DESTINATION = "/location/to/the/upload/directory"
+UPLOAD_DESTINATION = ""
+UPLOAD_PART_SIZE_MB = 16
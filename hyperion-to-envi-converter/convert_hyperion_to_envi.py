@@ -8,59 +8,97 @@
 #
 # ==================================================================================
 import os
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import rasterio
 import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "common"))
+from aoi import AOI, aoi_window, as_aoi, cropped_transform
+from band_scaling import BandScaler
+from band_selection import BandSelection, as_band_selection
+from envi_writer import ENVIWriter
+from stage_profiler import StageProfiler, profiled, profiled_conversion
+from writer_options import WriterOptions, as_writer_options
 from ENVI import (
     ENVIModel,
     DataTypeEnum,
     InterleaveEnum,
     ByteOrderEnum,
     DATA_TYPES,
+    TRANSPOSE_MAP,
 )
 from hyperion_data import (
-    BANDS,
+    BAND_TABLE,
     BOM_MAP,
-    SCALING_MAP,
+    MAX_BAND_NUMBER,
+    band_numbers,
 )
 
-TRANSPOSE_MAP = {
-    # BIP (Band Interleaved by Pixel): Format is (line, sample, band).
-    (InterleaveEnum.BIP, InterleaveEnum.BIP): (0, 1, 2),
-    (InterleaveEnum.BIP, InterleaveEnum.BIL): (0, 2, 1),
-    (InterleaveEnum.BIP, InterleaveEnum.BSQ): (2, 0, 1),
-    # BIL (Band Interleaved by Line): Format is (line, band, sample).
-    (InterleaveEnum.BIL, InterleaveEnum.BIL): (0, 1, 2),
-    (InterleaveEnum.BIL, InterleaveEnum.BIP): (0, 2, 1),
-    (InterleaveEnum.BIL, InterleaveEnum.BSQ): (1, 0, 2),
-    # BSQ (Band Sequential): Format is (band, line, sample).
-    (InterleaveEnum.BSQ, InterleaveEnum.BSQ): (0, 1, 2),
-    (InterleaveEnum.BSQ, InterleaveEnum.BIP): (1, 2, 0),
-    (InterleaveEnum.BSQ, InterleaveEnum.BIL): (1, 0, 2),
-}
+
+def is_known_band(number: int) -> bool:
+    return 0 < number <= MAX_BAND_NUMBER and bool(BAND_TABLE["in_bands"][number])
 
 
 class HyperionConverter:
-    def __init__(self, geotiff_path: str):
+    def __init__(self, geotiff_path: str, workers: int = 1, profiler: StageProfiler = None,
+                 band_selection: BandSelection = None, aoi: AOI = None, native_dtype: bool = False,
+                 writer_options: WriterOptions = None):
         self.geotiff_path = geotiff_path
+        self.workers = max(1, workers)
+        self.profiler = profiler or StageProfiler()
+        # Narrows the bands of BAND_TABLE down further, see _select_bands
+        self.band_selection = as_band_selection(band_selection)
+        # Bands of a single GeoTIFF that are read, all of them when None
+        self.band_indexes = None
+        self.aoi = as_aoi(aoi)
+        self.aoi_window = None
+        # Keeps the integer type of the source and records the scaling as the data gain
+        # and offset values of the header instead of writing scaled float32
+        self.native_dtype = native_dtype
+        self.writer_options = as_writer_options(writer_options)
+        # Type the band files are written in, see _convert_band_files_metadata
+        self.band_dtype = np.dtype(np.float32)
         self.envi = ENVIModel()
         self.src = None
+        self.band_keys = []
+
+    def default_hdr_path(self):
+        if os.path.isdir(self.geotiff_path):
+            first_path = self._band_file_paths()[0]
+            return os.path.splitext(first_path.replace("_B001_", "_MERGED_"))[0] + ".hdr"
+        return os.path.splitext(self.geotiff_path)[0] + ".hdr"
 
     def to_envi(self):
-        remove_after = False
         if os.path.isdir(self.geotiff_path):
-            self._merge_band_files()
-            remove_after = True
-        self.src = rasterio.open(self.geotiff_path)
-        # Metadata conversion MUST be done before raw data conversion
-        hdr = self._convert_metadata()
-        raw = self._convert_raw_data()
-        if remove_after:
-            os.remove(self.geotiff_path)
+            raise IsADirectoryError(
+                f"{self.geotiff_path} is a directory, use write_envi to convert band files"
+            )
+        # The dataset is closed once the pixels are read, so a long-running process (e.g. the
+        # watch service of the batch converter) does not keep a file handle per scene
+        with rasterio.open(self.geotiff_path) as self.src:
+            # Metadata conversion MUST be done before raw data conversion
+            hdr = self._convert_metadata()
+            raw = self._convert_raw_data()
+        self.src = None
         return hdr, raw, self.geotiff_path
 
-    def _merge_band_files(self):
-        print("Found directory, merging band files...")
-        paths = sorted(
+    @profiled_conversion("hyperion")
+    def write_envi(self, hdr_file_path: str):
+        if not os.path.isdir(self.geotiff_path):
+            hdr, raw, _ = self.to_envi()
+            print(f"Writing {hdr_file_path}...")
+            with ENVIWriter(hdr_file_path, hdr, raw.dtype, profiler=self.profiler, options=self.writer_options) as writer:
+                writer.write(raw, interleave=hdr.interleave)
+            return
+
+        band_files = self._filter_band_files()
+        self._convert_band_files_metadata(band_files)
+        self._write_band_files(band_files, hdr_file_path)
+
+    def _band_file_paths(self):
+        return sorted(
             [
                 os.path.join(self.geotiff_path, p)
                 for p in os.listdir(self.geotiff_path)
@@ -68,69 +106,165 @@ class HyperionConverter:
             ]
         )
 
-        # File to save the merged raster
-        output_fp = paths[0].replace("_B001_", "_MERGED_")
-
-        # Read the first file to get the metadata
-        with rasterio.open(paths[0]) as src0:
-            meta = src0.meta
-
-        # Filter bands based on BANDS dictionary
+    @profiled("validate")
+    def _filter_band_files(self):
+        # Filter bands based on BAND_TABLE
         filtered_bands = {}
-        for i, path in enumerate(paths, start=1):
+        numbers = []
+        for i, path in enumerate(self._band_file_paths(), start=1):
             band_key = f"B{i:03d}"
-            if band_key in BANDS:
+            if is_known_band(i):
                 filtered_bands[band_key] = path
+                numbers.append(i)
+        # Band files that are not selected are never opened
+        band_keys = list(filtered_bands)
+        return {
+            band_keys[position]: filtered_bands[band_keys[position]]
+            for position in self._select_bands(band_keys, numbers)
+        }
+
+    def _select_bands(self, band_keys: list, numbers: list):
+        # Positions of the bands the band selection keeps, by band number and by the
+        # center wavelength of BAND_TABLE
+        if self.band_selection is None:
+            return list(range(len(band_keys)))
+        wavelengths = BAND_TABLE["center_wavelength"][band_numbers(band_keys)].tolist()
+        positions = self.band_selection.select(wavelengths, numbers)
+        print(f"Selected {len(positions)} of {len(band_keys)} bands")
+        return positions
+
+    def _selected_band_keys(self, src):
+        # The band keys of a single GeoTIFF, of which only the selected bands are read.
+        # Bands are numbered by their key (B001 to B242) as in the band file directories.
+        band_keys = self._band_keys(src)
+        # Bands that are not in BAND_TABLE are left out, as they are from band file directories
+        known = [position for position, number in enumerate(band_numbers(band_keys)) if is_known_band(number)]
+        known_keys = [band_keys[position] for position in known]
+        positions = [known[position] for position in self._select_bands(known_keys, band_numbers(known_keys).tolist())]
+        if len(positions) < len(band_keys):
+            self.band_indexes = [position + 1 for position in positions]
+        return [band_keys[position] for position in positions]
+
+    @profiled("metadata")
+    def _convert_band_files_metadata(self, band_files: dict):
+        first_path = next(iter(band_files.values()))
+        with rasterio.open(first_path) as src0:
+            self._convert_metadata_from(src0, first_path, list(band_files.keys()))
+            self.band_dtype = np.dtype(src0.dtypes[0]) if self.native_dtype else np.dtype(np.float32)
+        if not self.native_dtype:
+            # Band files are cast to float32 while they are copied into the .raw
+            self.envi.data_type = DataTypeEnum.FLOAT32
+        return self.envi
+
+    def _write_band_files(self, band_files: dict, hdr_file_path: str):
+        print("Found directory, writing band files...")
+        scaler = self._get_scaler()
+
+        def read_band(i, path):
+            with self.profiler.stage("read") as stage, rasterio.open(path) as src1:
+                data = src1.read(1, window=self.aoi_window)
+                stage.add(data.nbytes)
+            if self.native_dtype:
+                return data
+            out = np.empty((1,) + data.shape, dtype=np.float32)
+            with self.profiler.stage("scale", out.nbytes):
+                return scaler.apply(data[np.newaxis], 0, out=out, bands=[i])[0]
+
+        # GDAL releases the GIL while decoding, so band files are read, cast and scaled
+        # on a thread pool. At most two bands per worker are in flight, and the results
+        # are written into their place in the .raw strictly in band order.
+        items = iter(enumerate(band_files.items()))
+        pending = deque()
+        writer = ENVIWriter(hdr_file_path, self.envi, self.band_dtype, profiler=self.profiler,
+                            options=self.writer_options)
+        with writer, ThreadPoolExecutor(max_workers=self.workers) as executor:
+
+            def submit_next():
+                item = next(items, None)
+                if item is not None:
+                    i, (band_key, path) = item
+                    pending.append((i, band_key, executor.submit(read_band, i, path)))
+
+            for _ in range(2 * self.workers):
+                submit_next()
+            while pending:
+                i, band_key, future = pending.popleft()
+                print(f"Writing band: {band_key}...")
+                writer.write_band(i, future.result())
+                submit_next()
+        print(f"Saved {writer.hdr_path} and {writer.raw_path}")
 
-        # Update metadata
-        meta.update(count=len(filtered_bands), dtype=rasterio.float32)
+    def inspect(self):
+        # Returns the header the conversion would write, reading only the GeoTIFF header
+        # (of the first band file for directories) and never the pixel data
+        if os.path.isdir(self.geotiff_path):
+            self._convert_band_files_metadata(self._filter_band_files())
+        else:
+            with rasterio.open(self.geotiff_path) as src:
+                self._convert_metadata_from(src, self.geotiff_path, self._selected_band_keys(src))
+        return self.envi.dict()
 
-        # Read each filtered band, cast to float32, and write it to disk
-        with rasterio.open(output_fp, "w", **meta) as dst:
-            for i, (band_key, path) in enumerate(filtered_bands.items(), start=1):
-                with rasterio.open(path) as src1:
-                    print(f"Merging band: {band_key}...")
-                    data = src1.read(1).astype(np.float32)
-                    dst.write_band(i, data)
-                    dst.set_band_description(i, band_key)
+    def inspect_header_string(self):
+        self.inspect()
+        return self.envi.to_header_string()
 
-        print(f"Saved merged raster to: {output_fp}")
-        self.geotiff_path = output_fp
+    @staticmethod
+    def _band_keys(src):
+        return [
+            band_key or f"B{i:03d}"
+            for i, band_key in enumerate(src.descriptions, start=1)
+        ]
 
+    @profiled("metadata")
     def _convert_metadata(self):
+        return self._convert_metadata_from(self.src, self.geotiff_path, self._selected_band_keys(self.src))
+
+    def _convert_metadata_from(self, src, geotiff_path: str, band_keys: list):
         print("Converting metadata...")
-        transform_string = ", ".join(map(str, list(self.src.transform)[:6]))
-        self.envi.map_info = f"{self.src.crs}, {transform_string}"
-        self.envi.coordinate_system_string = self.src.crs.to_wkt()
+        # Band files share the grid of the first one, so its window is read from all of them
+        self.aoi_window = aoi_window(src, self.aoi)
+        transform_string = ", ".join(map(str, list(cropped_transform(src, self.aoi_window))[:6]))
+        self.envi.map_info = f"{src.crs}, {transform_string}"
+        self.envi.coordinate_system_string = src.crs.to_wkt()
 
         # Transpose the array to match the ENVI interleave
-        self.envi.bands = self.src.count
-        self.envi.samples = self.src.width
-        self.envi.lines = self.src.height
-        self.envi.data_type = DATA_TYPES.get(self.src.dtypes[0], DataTypeEnum.UNKNOWN)
+        self.envi.bands = len(band_keys)
+        self.envi.samples = self.aoi_window.width
+        self.envi.lines = self.aoi_window.height
+        self.envi.data_type = DATA_TYPES.get(src.dtypes[0], DataTypeEnum.UNKNOWN)
         self.envi.wavelength_units = "nm"
         self.envi.sensor_type = "Hyperion"
 
         # Read the BOM, e.g. the first 2 bytes
-        with open(self.geotiff_path, "rb") as tiff_file:
+        with open(geotiff_path, "rb") as tiff_file:
             self.envi.byte_order = BOM_MAP.get(tiff_file.read(2), ByteOrderEnum.UNKNOWN)
 
-        for i, band_key in enumerate(self.src.descriptions, start=1):
-            band_key = band_key or f"B{i:03d}"
-            band = BANDS[band_key]
-            self.envi.wavelength.append(band.center_wavelength)
-            self.envi.fwhm.append(band.fwhm)
+        self.band_keys = band_keys
+        # The header lists of all the bands come from a single lookup into the table
+        bands = BAND_TABLE[band_numbers(band_keys)]
+        self.envi.wavelength = bands["center_wavelength"].tolist()
+        self.envi.fwhm = bands["fwhm"].tolist()
+        if self.native_dtype:
+            self.envi.data_gain_values, self.envi.data_offset_values = self._get_scaler().header_values()
         print("Metadata converted.")
         return self.envi
 
     def _convert_raw_data(self):
         print("Starting raw data conversion...")
         print("Reading raw data...")
-        ndarray: np.ndarray = self.src.read()
+        with self.profiler.stage("read") as stage:
+            ndarray: np.ndarray = self.src.read(self.band_indexes, window=self.aoi_window)
+            stage.add(ndarray.nbytes)
         print("Transposing data...")
-        ndarray = self._transpose_data(ndarray)
+        with self.profiler.stage("transpose", ndarray.nbytes):
+            ndarray = self._transpose_data(ndarray)
+        if self.native_dtype:
+            # The scaling is left to the data gain values of the header
+            print("Raw data converted.")
+            return ndarray
         print("Scaling data...")
-        ndarray = self._scale_data(ndarray)
+        with self.profiler.stage("scale", ndarray.size * np.dtype(np.float32).itemsize):
+            ndarray = self._scale_data(ndarray)
         print("Raw data converted.")
         return ndarray
 
@@ -151,16 +285,21 @@ class HyperionConverter:
             ndarray = np.transpose(ndarray, transpose_vector)
         return ndarray
 
+    def _get_scaler(self):
+        divisors = BAND_TABLE["scale"][band_numbers(self.band_keys)]
+        return BandScaler(np.zeros(len(divisors)), divisors)
+
     def _scale_data(self, ndarray: np.ndarray):
-        for b in range(self.envi.bands):
-            band_range = BANDS[self.src.descriptions[b]].range
-            scaling_factor = SCALING_MAP.get(band_range, 1.0)
-
-            match self.envi.interleave:
-                case InterleaveEnum.BIP:
-                    ndarray[:, :, b] /= scaling_factor
-                case InterleaveEnum.BIL:
-                    ndarray[:, b, :] /= scaling_factor
-                case InterleaveEnum.BSQ:
-                    ndarray[b, :, :] /= scaling_factor
-        return ndarray
+        scaler = self._get_scaler()
+
+        match self.envi.interleave:
+            case InterleaveEnum.BIP:
+                band_axis = 2
+            case InterleaveEnum.BIL:
+                band_axis = 1
+            case InterleaveEnum.BSQ:
+                band_axis = 0
+
+        # Float32 input is scaled in place, anything else gets a float32 output buffer
+        out = ndarray if ndarray.dtype == np.float32 else None
+        return scaler.apply_chunked(ndarray, band_axis, out=out)
@@ -9,7 +9,8 @@
 # ==================================================================================
 
 from enum import Enum
-from pydantic import BaseModel
+from typing import NamedTuple
+import numpy as np
 from ENVI import ByteOrderEnum
 
 BOM_MAP = {
@@ -31,211 +32,235 @@ SCALING_MAP = {
 }
 
 
-class Band(BaseModel):
+class Band(NamedTuple):
     center_wavelength: float
     fwhm: float
     range: BandRangeEnum
 
 
-_bands_dict = {
-    "B008": {"center_wavelength": 426.8200, "fwhm": 11.3871, "range": "VNIR"},
-    "B009": {"center_wavelength": 436.9900, "fwhm": 11.3871, "range": "VNIR"},
-    "B010": {"center_wavelength": 447.1700, "fwhm": 11.3871, "range": "VNIR"},
-    "B011": {"center_wavelength": 457.3400, "fwhm": 11.3871, "range": "VNIR"},
-    "B012": {"center_wavelength": 467.5200, "fwhm": 11.3871, "range": "VNIR"},
-    "B013": {"center_wavelength": 477.6900, "fwhm": 11.3871, "range": "VNIR"},
-    "B014": {"center_wavelength": 487.8700, "fwhm": 11.3784, "range": "VNIR"},
-    "B015": {"center_wavelength": 498.0400, "fwhm": 11.3538, "range": "VNIR"},
-    "B016": {"center_wavelength": 508.2200, "fwhm": 11.3133, "range": "VNIR"},
-    "B017": {"center_wavelength": 518.3900, "fwhm": 11.2580, "range": "VNIR"},
-    "B018": {"center_wavelength": 528.5700, "fwhm": 11.1907, "range": "VNIR"},
-    "B019": {"center_wavelength": 538.7400, "fwhm": 11.1119, "range": "VNIR"},
-    "B020": {"center_wavelength": 548.9200, "fwhm": 11.0245, "range": "VNIR"},
-    "B021": {"center_wavelength": 559.0900, "fwhm": 10.9321, "range": "VNIR"},
-    "B022": {"center_wavelength": 569.2700, "fwhm": 10.8368, "range": "VNIR"},
-    "B023": {"center_wavelength": 579.4500, "fwhm": 10.7407, "range": "VNIR"},
-    "B024": {"center_wavelength": 589.6200, "fwhm": 10.6482, "range": "VNIR"},
-    "B025": {"center_wavelength": 599.8000, "fwhm": 10.5607, "range": "VNIR"},
-    "B026": {"center_wavelength": 609.9700, "fwhm": 10.4823, "range": "VNIR"},
-    "B027": {"center_wavelength": 620.1500, "fwhm": 10.4147, "range": "VNIR"},
-    "B028": {"center_wavelength": 630.3200, "fwhm": 10.3595, "range": "VNIR"},
-    "B029": {"center_wavelength": 640.5000, "fwhm": 10.3188, "range": "VNIR"},
-    "B030": {"center_wavelength": 650.6700, "fwhm": 10.2942, "range": "VNIR"},
-    "B031": {"center_wavelength": 660.8500, "fwhm": 10.2856, "range": "VNIR"},
-    "B032": {"center_wavelength": 671.0200, "fwhm": 10.2980, "range": "VNIR"},
-    "B033": {"center_wavelength": 681.2000, "fwhm": 10.3349, "range": "VNIR"},
-    "B034": {"center_wavelength": 691.3700, "fwhm": 10.3909, "range": "VNIR"},
-    "B035": {"center_wavelength": 701.5500, "fwhm": 10.4592, "range": "VNIR"},
-    "B036": {"center_wavelength": 711.7200, "fwhm": 10.5322, "range": "VNIR"},
-    "B037": {"center_wavelength": 721.9000, "fwhm": 10.6004, "range": "VNIR"},
-    "B038": {"center_wavelength": 732.0700, "fwhm": 10.6562, "range": "VNIR"},
-    "B039": {"center_wavelength": 742.2500, "fwhm": 10.6933, "range": "VNIR"},
-    "B040": {"center_wavelength": 752.4300, "fwhm": 10.7058, "range": "VNIR"},
-    "B041": {"center_wavelength": 762.6000, "fwhm": 10.7276, "range": "VNIR"},
-    "B042": {"center_wavelength": 772.7800, "fwhm": 10.7907, "range": "VNIR"},
-    "B043": {"center_wavelength": 782.9500, "fwhm": 10.8833, "range": "VNIR"},
-    "B044": {"center_wavelength": 793.1300, "fwhm": 10.9938, "range": "VNIR"},
-    "B045": {"center_wavelength": 803.3000, "fwhm": 11.1044, "range": "VNIR"},
-    "B046": {"center_wavelength": 813.4800, "fwhm": 11.1980, "range": "VNIR"},
-    "B047": {"center_wavelength": 823.6500, "fwhm": 11.2600, "range": "VNIR"},
-    "B048": {"center_wavelength": 833.8300, "fwhm": 11.2824, "range": "VNIR"},
-    "B049": {"center_wavelength": 844.0000, "fwhm": 11.2822, "range": "VNIR"},
-    "B050": {"center_wavelength": 854.1800, "fwhm": 11.2816, "range": "VNIR"},
-    "B051": {"center_wavelength": 864.3500, "fwhm": 11.2809, "range": "VNIR"},
-    "B052": {"center_wavelength": 874.5300, "fwhm": 11.2797, "range": "VNIR"},
-    "B053": {"center_wavelength": 884.7000, "fwhm": 11.2782, "range": "VNIR"},
-    "B054": {"center_wavelength": 894.8800, "fwhm": 11.2771, "range": "VNIR"},
-    "B055": {"center_wavelength": 905.0500, "fwhm": 11.2765, "range": "VNIR"},
-    "B056": {"center_wavelength": 915.2300, "fwhm": 11.2756, "range": "VNIR"},
-    "B057": {"center_wavelength": 925.4100, "fwhm": 11.2754, "range": "VNIR"},
-    "B077": {"center_wavelength": 912.4500, "fwhm": 11.0457, "range": "SWIR"},
-    "B078": {"center_wavelength": 922.5400, "fwhm": 11.0457, "range": "SWIR"},
-    "B079": {"center_wavelength": 932.6400, "fwhm": 11.0457, "range": "SWIR"},
-    "B080": {"center_wavelength": 942.7300, "fwhm": 11.0457, "range": "SWIR"},
-    "B081": {"center_wavelength": 952.8200, "fwhm": 11.0457, "range": "SWIR"},
-    "B082": {"center_wavelength": 962.9100, "fwhm": 11.0457, "range": "SWIR"},
-    "B083": {"center_wavelength": 972.9900, "fwhm": 11.0457, "range": "SWIR"},
-    "B084": {"center_wavelength": 983.0800, "fwhm": 11.0457, "range": "SWIR"},
-    "B085": {"center_wavelength": 993.1700, "fwhm": 11.0457, "range": "SWIR"},
-    "B086": {"center_wavelength": 1003.3000, "fwhm": 11.0457, "range": "SWIR"},
-    "B087": {"center_wavelength": 1013.3000, "fwhm": 11.0457, "range": "SWIR"},
-    "B088": {"center_wavelength": 1023.4000, "fwhm": 11.0451, "range": "SWIR"},
-    "B089": {"center_wavelength": 1033.4900, "fwhm": 11.0423, "range": "SWIR"},
-    "B090": {"center_wavelength": 1043.5900, "fwhm": 11.0372, "range": "SWIR"},
-    "B091": {"center_wavelength": 1053.6900, "fwhm": 11.0302, "range": "SWIR"},
-    "B092": {"center_wavelength": 1063.7900, "fwhm": 11.0218, "range": "SWIR"},
-    "B093": {"center_wavelength": 1073.8900, "fwhm": 11.0122, "range": "SWIR"},
-    "B094": {"center_wavelength": 1083.9900, "fwhm": 11.0013, "range": "SWIR"},
-    "B095": {"center_wavelength": 1094.0900, "fwhm": 10.9871, "range": "SWIR"},
-    "B096": {"center_wavelength": 1104.1900, "fwhm": 10.9732, "range": "SWIR"},
-    "B097": {"center_wavelength": 1114.1900, "fwhm": 10.9572, "range": "SWIR"},
-    "B098": {"center_wavelength": 1124.2800, "fwhm": 10.9418, "range": "SWIR"},
-    "B099": {"center_wavelength": 1134.3800, "fwhm": 10.9248, "range": "SWIR"},
-    "B100": {"center_wavelength": 1144.4800, "fwhm": 10.9065, "range": "SWIR"},
-    "B101": {"center_wavelength": 1154.5800, "fwhm": 10.8884, "range": "SWIR"},
-    "B102": {"center_wavelength": 1164.6800, "fwhm": 10.8696, "range": "SWIR"},
-    "B103": {"center_wavelength": 1174.7700, "fwhm": 10.8513, "range": "SWIR"},
-    "B104": {"center_wavelength": 1184.8700, "fwhm": 10.8335, "range": "SWIR"},
-    "B105": {"center_wavelength": 1194.9700, "fwhm": 10.8154, "range": "SWIR"},
-    "B106": {"center_wavelength": 1205.0700, "fwhm": 10.7979, "range": "SWIR"},
-    "B107": {"center_wavelength": 1215.1700, "fwhm": 10.7822, "range": "SWIR"},
-    "B108": {"center_wavelength": 1225.1700, "fwhm": 10.7663, "range": "SWIR"},
-    "B109": {"center_wavelength": 1235.2700, "fwhm": 10.7520, "range": "SWIR"},
-    "B110": {"center_wavelength": 1245.3600, "fwhm": 10.7385, "range": "SWIR"},
-    "B111": {"center_wavelength": 1255.4600, "fwhm": 10.7270, "range": "SWIR"},
-    "B112": {"center_wavelength": 1265.5600, "fwhm": 10.7174, "range": "SWIR"},
-    "B113": {"center_wavelength": 1275.6600, "fwhm": 10.7091, "range": "SWIR"},
-    "B114": {"center_wavelength": 1285.7600, "fwhm": 10.7022, "range": "SWIR"},
-    "B115": {"center_wavelength": 1295.8600, "fwhm": 10.6970, "range": "SWIR"},
-    "B116": {"center_wavelength": 1305.9600, "fwhm": 10.6946, "range": "SWIR"},
-    "B117": {"center_wavelength": 1316.0500, "fwhm": 10.6937, "range": "SWIR"},
-    "B118": {"center_wavelength": 1326.0500, "fwhm": 10.6949, "range": "SWIR"},
-    "B119": {"center_wavelength": 1336.1500, "fwhm": 10.6996, "range": "SWIR"},
-    "B120": {"center_wavelength": 1346.2500, "fwhm": 10.7058, "range": "SWIR"},
-    "B121": {"center_wavelength": 1356.3500, "fwhm": 10.7163, "range": "SWIR"},
-    "B122": {"center_wavelength": 1366.4500, "fwhm": 10.7283, "range": "SWIR"},
-    "B123": {"center_wavelength": 1376.5500, "fwhm": 10.7437, "range": "SWIR"},
-    "B124": {"center_wavelength": 1386.6500, "fwhm": 10.7612, "range": "SWIR"},
-    "B125": {"center_wavelength": 1396.7400, "fwhm": 10.7807, "range": "SWIR"},
-    "B126": {"center_wavelength": 1406.8400, "fwhm": 10.8034, "range": "SWIR"},
-    "B127": {"center_wavelength": 1416.9400, "fwhm": 10.8267, "range": "SWIR"},
-    "B128": {"center_wavelength": 1426.9400, "fwhm": 10.8534, "range": "SWIR"},
-    "B129": {"center_wavelength": 1437.0400, "fwhm": 10.8818, "range": "SWIR"},
-    "B130": {"center_wavelength": 1447.1400, "fwhm": 10.9110, "range": "SWIR"},
-    "B131": {"center_wavelength": 1457.2300, "fwhm": 10.9422, "range": "SWIR"},
-    "B132": {"center_wavelength": 1467.3300, "fwhm": 10.9743, "range": "SWIR"},
-    "B133": {"center_wavelength": 1477.4300, "fwhm": 11.0074, "range": "SWIR"},
-    "B134": {"center_wavelength": 1487.5300, "fwhm": 11.0414, "range": "SWIR"},
-    "B135": {"center_wavelength": 1497.6300, "fwhm": 11.0759, "range": "SWIR"},
-    "B136": {"center_wavelength": 1507.7300, "fwhm": 11.1108, "range": "SWIR"},
-    "B137": {"center_wavelength": 1517.8300, "fwhm": 11.1461, "range": "SWIR"},
-    "B138": {"center_wavelength": 1527.9200, "fwhm": 11.1811, "range": "SWIR"},
-    "B139": {"center_wavelength": 1537.9200, "fwhm": 11.2156, "range": "SWIR"},
-    "B140": {"center_wavelength": 1548.0200, "fwhm": 11.2496, "range": "SWIR"},
-    "B141": {"center_wavelength": 1558.1200, "fwhm": 11.2826, "range": "SWIR"},
-    "B142": {"center_wavelength": 1568.2200, "fwhm": 11.3146, "range": "SWIR"},
-    "B143": {"center_wavelength": 1578.3200, "fwhm": 11.3460, "range": "SWIR"},
-    "B144": {"center_wavelength": 1588.4200, "fwhm": 11.3753, "range": "SWIR"},
-    "B145": {"center_wavelength": 1598.5100, "fwhm": 11.4037, "range": "SWIR"},
-    "B146": {"center_wavelength": 1608.6100, "fwhm": 11.4302, "range": "SWIR"},
-    "B147": {"center_wavelength": 1618.7100, "fwhm": 11.4538, "range": "SWIR"},
-    "B148": {"center_wavelength": 1628.8100, "fwhm": 11.4760, "range": "SWIR"},
-    "B149": {"center_wavelength": 1638.8100, "fwhm": 11.4958, "range": "SWIR"},
-    "B150": {"center_wavelength": 1648.9000, "fwhm": 11.5133, "range": "SWIR"},
-    "B151": {"center_wavelength": 1659.0000, "fwhm": 11.5286, "range": "SWIR"},
-    "B152": {"center_wavelength": 1669.1000, "fwhm": 11.5404, "range": "SWIR"},
-    "B153": {"center_wavelength": 1679.2000, "fwhm": 11.5505, "range": "SWIR"},
-    "B154": {"center_wavelength": 1689.3000, "fwhm": 11.5580, "range": "SWIR"},
-    "B155": {"center_wavelength": 1699.4000, "fwhm": 11.5621, "range": "SWIR"},
-    "B156": {"center_wavelength": 1709.5000, "fwhm": 11.5634, "range": "SWIR"},
-    "B157": {"center_wavelength": 1719.6000, "fwhm": 11.5617, "range": "SWIR"},
-    "B158": {"center_wavelength": 1729.7000, "fwhm": 11.5563, "range": "SWIR"},
-    "B159": {"center_wavelength": 1739.7000, "fwhm": 11.5477, "range": "SWIR"},
-    "B160": {"center_wavelength": 1749.7900, "fwhm": 11.5346, "range": "SWIR"},
-    "B161": {"center_wavelength": 1759.8900, "fwhm": 11.5193, "range": "SWIR"},
-    "B162": {"center_wavelength": 1769.9900, "fwhm": 11.5002, "range": "SWIR"},
-    "B163": {"center_wavelength": 1780.0900, "fwhm": 11.4789, "range": "SWIR"},
-    "B164": {"center_wavelength": 1790.1900, "fwhm": 11.4548, "range": "SWIR"},
-    "B165": {"center_wavelength": 1800.2900, "fwhm": 11.4279, "range": "SWIR"},
-    "B166": {"center_wavelength": 1810.3800, "fwhm": 11.3994, "range": "SWIR"},
-    "B167": {"center_wavelength": 1820.4800, "fwhm": 11.3688, "range": "SWIR"},
-    "B168": {"center_wavelength": 1830.5800, "fwhm": 11.3366, "range": "SWIR"},
-    "B169": {"center_wavelength": 1840.5800, "fwhm": 11.3036, "range": "SWIR"},
-    "B170": {"center_wavelength": 1850.6800, "fwhm": 11.2696, "range": "SWIR"},
-    "B171": {"center_wavelength": 1860.7800, "fwhm": 11.2363, "range": "SWIR"},
-    "B172": {"center_wavelength": 1870.8700, "fwhm": 11.2007, "range": "SWIR"},
-    "B173": {"center_wavelength": 1880.9800, "fwhm": 11.1666, "range": "SWIR"},
-    "B174": {"center_wavelength": 1891.0700, "fwhm": 11.1333, "range": "SWIR"},
-    "B175": {"center_wavelength": 1901.1700, "fwhm": 11.1018, "range": "SWIR"},
-    "B176": {"center_wavelength": 1911.2700, "fwhm": 11.0714, "range": "SWIR"},
-    "B177": {"center_wavelength": 1921.3700, "fwhm": 11.0424, "range": "SWIR"},
-    "B178": {"center_wavelength": 1931.4700, "fwhm": 11.0155, "range": "SWIR"},
-    "B179": {"center_wavelength": 1941.5700, "fwhm": 10.9912, "range": "SWIR"},
-    "B180": {"center_wavelength": 1951.5700, "fwhm": 10.9698, "range": "SWIR"},
-    "B181": {"center_wavelength": 1961.6600, "fwhm": 10.9508, "range": "SWIR"},
-    "B182": {"center_wavelength": 1971.7600, "fwhm": 10.9355, "range": "SWIR"},
-    "B183": {"center_wavelength": 1981.8600, "fwhm": 10.9230, "range": "SWIR"},
-    "B184": {"center_wavelength": 1991.9600, "fwhm": 10.9139, "range": "SWIR"},
-    "B185": {"center_wavelength": 2002.0600, "fwhm": 10.9083, "range": "SWIR"},
-    "B186": {"center_wavelength": 2012.1500, "fwhm": 10.9069, "range": "SWIR"},
-    "B187": {"center_wavelength": 2022.2500, "fwhm": 10.9057, "range": "SWIR"},
-    "B188": {"center_wavelength": 2032.3500, "fwhm": 10.9013, "range": "SWIR"},
-    "B189": {"center_wavelength": 2042.4500, "fwhm": 10.8951, "range": "SWIR"},
-    "B190": {"center_wavelength": 2052.4500, "fwhm": 10.8854, "range": "SWIR"},
-    "B191": {"center_wavelength": 2062.5500, "fwhm": 10.8740, "range": "SWIR"},
-    "B192": {"center_wavelength": 2072.6500, "fwhm": 10.8591, "range": "SWIR"},
-    "B193": {"center_wavelength": 2082.7500, "fwhm": 10.8429, "range": "SWIR"},
-    "B194": {"center_wavelength": 2092.8400, "fwhm": 10.8242, "range": "SWIR"},
-    "B195": {"center_wavelength": 2102.9400, "fwhm": 10.8039, "range": "SWIR"},
-    "B196": {"center_wavelength": 2113.0400, "fwhm": 10.7820, "range": "SWIR"},
-    "B197": {"center_wavelength": 2123.1400, "fwhm": 10.7592, "range": "SWIR"},
-    "B198": {"center_wavelength": 2133.2400, "fwhm": 10.7342, "range": "SWIR"},
-    "B199": {"center_wavelength": 2143.3400, "fwhm": 10.7092, "range": "SWIR"},
-    "B200": {"center_wavelength": 2153.3400, "fwhm": 10.6834, "range": "SWIR"},
-    "B201": {"center_wavelength": 2163.4300, "fwhm": 10.6572, "range": "SWIR"},
-    "B202": {"center_wavelength": 2173.5300, "fwhm": 10.6312, "range": "SWIR"},
-    "B203": {"center_wavelength": 2183.6300, "fwhm": 10.6052, "range": "SWIR"},
-    "B204": {"center_wavelength": 2193.7300, "fwhm": 10.5803, "range": "SWIR"},
-    "B205": {"center_wavelength": 2203.8300, "fwhm": 10.5560, "range": "SWIR"},
-    "B206": {"center_wavelength": 2213.9300, "fwhm": 10.5328, "range": "SWIR"},
-    "B207": {"center_wavelength": 2224.0300, "fwhm": 10.5101, "range": "SWIR"},
-    "B208": {"center_wavelength": 2234.1200, "fwhm": 10.4904, "range": "SWIR"},
-    "B209": {"center_wavelength": 2244.2200, "fwhm": 10.4722, "range": "SWIR"},
-    "B210": {"center_wavelength": 2254.2200, "fwhm": 10.4552, "range": "SWIR"},
-    "B211": {"center_wavelength": 2264.3200, "fwhm": 10.4408, "range": "SWIR"},
-    "B212": {"center_wavelength": 2274.4200, "fwhm": 10.4285, "range": "SWIR"},
-    "B213": {"center_wavelength": 2284.5200, "fwhm": 10.4197, "range": "SWIR"},
-    "B214": {"center_wavelength": 2294.6100, "fwhm": 10.4129, "range": "SWIR"},
-    "B215": {"center_wavelength": 2304.7100, "fwhm": 10.4088, "range": "SWIR"},
-    "B216": {"center_wavelength": 2314.8100, "fwhm": 10.4077, "range": "SWIR"},
-    "B217": {"center_wavelength": 2324.9100, "fwhm": 10.4077, "range": "SWIR"},
-    "B218": {"center_wavelength": 2335.0100, "fwhm": 10.4077, "range": "SWIR"},
-    "B219": {"center_wavelength": 2345.1100, "fwhm": 10.4077, "range": "SWIR"},
-    "B220": {"center_wavelength": 2355.2100, "fwhm": 10.4077, "range": "SWIR"},
-    "B221": {"center_wavelength": 2365.2000, "fwhm": 10.4077, "range": "SWIR"},
-    "B222": {"center_wavelength": 2375.3000, "fwhm": 10.4077, "range": "SWIR"},
-    "B223": {"center_wavelength": 2385.4000, "fwhm": 10.4077, "range": "SWIR"},
-    "B224": {"center_wavelength": 2395.5000, "fwhm": 10.4077, "range": "SWIR"},
+# band key: (center wavelength, fwhm, range), kept as plain tuples so building the
+# table costs next to nothing at import time
+_bands_table = {
+    "B008": (426.8200, 11.3871, "VNIR"),
+    "B009": (436.9900, 11.3871, "VNIR"),
+    "B010": (447.1700, 11.3871, "VNIR"),
+    "B011": (457.3400, 11.3871, "VNIR"),
+    "B012": (467.5200, 11.3871, "VNIR"),
+    "B013": (477.6900, 11.3871, "VNIR"),
+    "B014": (487.8700, 11.3784, "VNIR"),
+    "B015": (498.0400, 11.3538, "VNIR"),
+    "B016": (508.2200, 11.3133, "VNIR"),
+    "B017": (518.3900, 11.2580, "VNIR"),
+    "B018": (528.5700, 11.1907, "VNIR"),
+    "B019": (538.7400, 11.1119, "VNIR"),
+    "B020": (548.9200, 11.0245, "VNIR"),
+    "B021": (559.0900, 10.9321, "VNIR"),
+    "B022": (569.2700, 10.8368, "VNIR"),
+    "B023": (579.4500, 10.7407, "VNIR"),
+    "B024": (589.6200, 10.6482, "VNIR"),
+    "B025": (599.8000, 10.5607, "VNIR"),
+    "B026": (609.9700, 10.4823, "VNIR"),
+    "B027": (620.1500, 10.4147, "VNIR"),
+    "B028": (630.3200, 10.3595, "VNIR"),
+    "B029": (640.5000, 10.3188, "VNIR"),
+    "B030": (650.6700, 10.2942, "VNIR"),
+    "B031": (660.8500, 10.2856, "VNIR"),
+    "B032": (671.0200, 10.2980, "VNIR"),
+    "B033": (681.2000, 10.3349, "VNIR"),
+    "B034": (691.3700, 10.3909, "VNIR"),
+    "B035": (701.5500, 10.4592, "VNIR"),
+    "B036": (711.7200, 10.5322, "VNIR"),
+    "B037": (721.9000, 10.6004, "VNIR"),
+    "B038": (732.0700, 10.6562, "VNIR"),
+    "B039": (742.2500, 10.6933, "VNIR"),
+    "B040": (752.4300, 10.7058, "VNIR"),
+    "B041": (762.6000, 10.7276, "VNIR"),
+    "B042": (772.7800, 10.7907, "VNIR"),
+    "B043": (782.9500, 10.8833, "VNIR"),
+    "B044": (793.1300, 10.9938, "VNIR"),
+    "B045": (803.3000, 11.1044, "VNIR"),
+    "B046": (813.4800, 11.1980, "VNIR"),
+    "B047": (823.6500, 11.2600, "VNIR"),
+    "B048": (833.8300, 11.2824, "VNIR"),
+    "B049": (844.0000, 11.2822, "VNIR"),
+    "B050": (854.1800, 11.2816, "VNIR"),
+    "B051": (864.3500, 11.2809, "VNIR"),
+    "B052": (874.5300, 11.2797, "VNIR"),
+    "B053": (884.7000, 11.2782, "VNIR"),
+    "B054": (894.8800, 11.2771, "VNIR"),
+    "B055": (905.0500, 11.2765, "VNIR"),
+    "B056": (915.2300, 11.2756, "VNIR"),
+    "B057": (925.4100, 11.2754, "VNIR"),
+    "B077": (912.4500, 11.0457, "SWIR"),
+    "B078": (922.5400, 11.0457, "SWIR"),
+    "B079": (932.6400, 11.0457, "SWIR"),
+    "B080": (942.7300, 11.0457, "SWIR"),
+    "B081": (952.8200, 11.0457, "SWIR"),
+    "B082": (962.9100, 11.0457, "SWIR"),
+    "B083": (972.9900, 11.0457, "SWIR"),
+    "B084": (983.0800, 11.0457, "SWIR"),
+    "B085": (993.1700, 11.0457, "SWIR"),
+    "B086": (1003.3000, 11.0457, "SWIR"),
+    "B087": (1013.3000, 11.0457, "SWIR"),
+    "B088": (1023.4000, 11.0451, "SWIR"),
+    "B089": (1033.4900, 11.0423, "SWIR"),
+    "B090": (1043.5900, 11.0372, "SWIR"),
+    "B091": (1053.6900, 11.0302, "SWIR"),
+    "B092": (1063.7900, 11.0218, "SWIR"),
+    "B093": (1073.8900, 11.0122, "SWIR"),
+    "B094": (1083.9900, 11.0013, "SWIR"),
+    "B095": (1094.0900, 10.9871, "SWIR"),
+    "B096": (1104.1900, 10.9732, "SWIR"),
+    "B097": (1114.1900, 10.9572, "SWIR"),
+    "B098": (1124.2800, 10.9418, "SWIR"),
+    "B099": (1134.3800, 10.9248, "SWIR"),
+    "B100": (1144.4800, 10.9065, "SWIR"),
+    "B101": (1154.5800, 10.8884, "SWIR"),
+    "B102": (1164.6800, 10.8696, "SWIR"),
+    "B103": (1174.7700, 10.8513, "SWIR"),
+    "B104": (1184.8700, 10.8335, "SWIR"),
+    "B105": (1194.9700, 10.8154, "SWIR"),
+    "B106": (1205.0700, 10.7979, "SWIR"),
+    "B107": (1215.1700, 10.7822, "SWIR"),
+    "B108": (1225.1700, 10.7663, "SWIR"),
+    "B109": (1235.2700, 10.7520, "SWIR"),
+    "B110": (1245.3600, 10.7385, "SWIR"),
+    "B111": (1255.4600, 10.7270, "SWIR"),
+    "B112": (1265.5600, 10.7174, "SWIR"),
+    "B113": (1275.6600, 10.7091, "SWIR"),
+    "B114": (1285.7600, 10.7022, "SWIR"),
+    "B115": (1295.8600, 10.6970, "SWIR"),
+    "B116": (1305.9600, 10.6946, "SWIR"),
+    "B117": (1316.0500, 10.6937, "SWIR"),
+    "B118": (1326.0500, 10.6949, "SWIR"),
+    "B119": (1336.1500, 10.6996, "SWIR"),
+    "B120": (1346.2500, 10.7058, "SWIR"),
+    "B121": (1356.3500, 10.7163, "SWIR"),
+    "B122": (1366.4500, 10.7283, "SWIR"),
+    "B123": (1376.5500, 10.7437, "SWIR"),
+    "B124": (1386.6500, 10.7612, "SWIR"),
+    "B125": (1396.7400, 10.7807, "SWIR"),
+    "B126": (1406.8400, 10.8034, "SWIR"),
+    "B127": (1416.9400, 10.8267, "SWIR"),
+    "B128": (1426.9400, 10.8534, "SWIR"),
+    "B129": (1437.0400, 10.8818, "SWIR"),
+    "B130": (1447.1400, 10.9110, "SWIR"),
+    "B131": (1457.2300, 10.9422, "SWIR"),
+    "B132": (1467.3300, 10.9743, "SWIR"),
+    "B133": (1477.4300, 11.0074, "SWIR"),
+    "B134": (1487.5300, 11.0414, "SWIR"),
+    "B135": (1497.6300, 11.0759, "SWIR"),
+    "B136": (1507.7300, 11.1108, "SWIR"),
+    "B137": (1517.8300, 11.1461, "SWIR"),
+    "B138": (1527.9200, 11.1811, "SWIR"),
+    "B139": (1537.9200, 11.2156, "SWIR"),
+    "B140": (1548.0200, 11.2496, "SWIR"),
+    "B141": (1558.1200, 11.2826, "SWIR"),
+    "B142": (1568.2200, 11.3146, "SWIR"),
+    "B143": (1578.3200, 11.3460, "SWIR"),
+    "B144": (1588.4200, 11.3753, "SWIR"),
+    "B145": (1598.5100, 11.4037, "SWIR"),
+    "B146": (1608.6100, 11.4302, "SWIR"),
+    "B147": (1618.7100, 11.4538, "SWIR"),
+    "B148": (1628.8100, 11.4760, "SWIR"),
+    "B149": (1638.8100, 11.4958, "SWIR"),
+    "B150": (1648.9000, 11.5133, "SWIR"),
+    "B151": (1659.0000, 11.5286, "SWIR"),
+    "B152": (1669.1000, 11.5404, "SWIR"),
+    "B153": (1679.2000, 11.5505, "SWIR"),
+    "B154": (1689.3000, 11.5580, "SWIR"),
+    "B155": (1699.4000, 11.5621, "SWIR"),
+    "B156": (1709.5000, 11.5634, "SWIR"),
+    "B157": (1719.6000, 11.5617, "SWIR"),
+    "B158": (1729.7000, 11.5563, "SWIR"),
+    "B159": (1739.7000, 11.5477, "SWIR"),
+    "B160": (1749.7900, 11.5346, "SWIR"),
+    "B161": (1759.8900, 11.5193, "SWIR"),
+    "B162": (1769.9900, 11.5002, "SWIR"),
+    "B163": (1780.0900, 11.4789, "SWIR"),
+    "B164": (1790.1900, 11.4548, "SWIR"),
+    "B165": (1800.2900, 11.4279, "SWIR"),
+    "B166": (1810.3800, 11.3994, "SWIR"),
+    "B167": (1820.4800, 11.3688, "SWIR"),
+    "B168": (1830.5800, 11.3366, "SWIR"),
+    "B169": (1840.5800, 11.3036, "SWIR"),
+    "B170": (1850.6800, 11.2696, "SWIR"),
+    "B171": (1860.7800, 11.2363, "SWIR"),
+    "B172": (1870.8700, 11.2007, "SWIR"),
+    "B173": (1880.9800, 11.1666, "SWIR"),
+    "B174": (1891.0700, 11.1333, "SWIR"),
+    "B175": (1901.1700, 11.1018, "SWIR"),
+    "B176": (1911.2700, 11.0714, "SWIR"),
+    "B177": (1921.3700, 11.0424, "SWIR"),
+    "B178": (1931.4700, 11.0155, "SWIR"),
+    "B179": (1941.5700, 10.9912, "SWIR"),
+    "B180": (1951.5700, 10.9698, "SWIR"),
+    "B181": (1961.6600, 10.9508, "SWIR"),
+    "B182": (1971.7600, 10.9355, "SWIR"),
+    "B183": (1981.8600, 10.9230, "SWIR"),
+    "B184": (1991.9600, 10.9139, "SWIR"),
+    "B185": (2002.0600, 10.9083, "SWIR"),
+    "B186": (2012.1500, 10.9069, "SWIR"),
+    "B187": (2022.2500, 10.9057, "SWIR"),
+    "B188": (2032.3500, 10.9013, "SWIR"),
+    "B189": (2042.4500, 10.8951, "SWIR"),
+    "B190": (2052.4500, 10.8854, "SWIR"),
+    "B191": (2062.5500, 10.8740, "SWIR"),
+    "B192": (2072.6500, 10.8591, "SWIR"),
+    "B193": (2082.7500, 10.8429, "SWIR"),
+    "B194": (2092.8400, 10.8242, "SWIR"),
+    "B195": (2102.9400, 10.8039, "SWIR"),
+    "B196": (2113.0400, 10.7820, "SWIR"),
+    "B197": (2123.1400, 10.7592, "SWIR"),
+    "B198": (2133.2400, 10.7342, "SWIR"),
+    "B199": (2143.3400, 10.7092, "SWIR"),
+    "B200": (2153.3400, 10.6834, "SWIR"),
+    "B201": (2163.4300, 10.6572, "SWIR"),
+    "B202": (2173.5300, 10.6312, "SWIR"),
+    "B203": (2183.6300, 10.6052, "SWIR"),
+    "B204": (2193.7300, 10.5803, "SWIR"),
+    "B205": (2203.8300, 10.5560, "SWIR"),
+    "B206": (2213.9300, 10.5328, "SWIR"),
+    "B207": (2224.0300, 10.5101, "SWIR"),
+    "B208": (2234.1200, 10.4904, "SWIR"),
+    "B209": (2244.2200, 10.4722, "SWIR"),
+    "B210": (2254.2200, 10.4552, "SWIR"),
+    "B211": (2264.3200, 10.4408, "SWIR"),
+    "B212": (2274.4200, 10.4285, "SWIR"),
+    "B213": (2284.5200, 10.4197, "SWIR"),
+    "B214": (2294.6100, 10.4129, "SWIR"),
+    "B215": (2304.7100, 10.4088, "SWIR"),
+    "B216": (2314.8100, 10.4077, "SWIR"),
+    "B217": (2324.9100, 10.4077, "SWIR"),
+    "B218": (2335.0100, 10.4077, "SWIR"),
+    "B219": (2345.1100, 10.4077, "SWIR"),
+    "B220": (2355.2100, 10.4077, "SWIR"),
+    "B221": (2365.2000, 10.4077, "SWIR"),
+    "B222": (2375.3000, 10.4077, "SWIR"),
+    "B223": (2385.4000, 10.4077, "SWIR"),
+    "B224": (2395.5000, 10.4077, "SWIR"),
 }
 
-BANDS = {k: Band(**v) for k, v in _bands_dict.items()}
+BANDS = {k: Band(w, f, BandRangeEnum(r)) for k, (w, f, r) in _bands_table.items()}
+
+# The same bands as a structured array indexed by band number (B001 is row 1), so the
+# header lists and scale factors of any selection of bands come from one fancy index.
+# Rows of the bands that are not in BANDS have in_bands False and a scale of 1.
+MAX_BAND_NUMBER = 242
+BAND_TABLE_DTYPE = np.dtype([
+    ("in_bands", np.bool_),
+    ("center_wavelength", np.float64),
+    ("fwhm", np.float64),
+    ("range", "U4"),
+    ("scale", np.float64),
+])
+BAND_TABLE = np.zeros(MAX_BAND_NUMBER + 1, dtype=BAND_TABLE_DTYPE)
+BAND_TABLE["scale"] = 1.0
+BAND_TABLE[[int(k[1:]) for k in _bands_table]] = [
+    (True, w, f, r, SCALING_MAP[BandRangeEnum(r)]) for w, f, r in _bands_table.values()
+]
+
+
+def band_numbers(band_keys: list) -> np.ndarray:
+    # ["B008", "B009"] -> [8, 9], the rows of the bands in BAND_TABLE
+    return np.array([int(band_key[1:]) for band_key in band_keys], dtype=np.intp)
@@ -9,12 +9,13 @@
 # ==================================================================================
 from datetime import datetime
 import os
-import spectral
-from convert_hyperion_to_envi import HyperionConverter
 import constants
 import typer
 
-app = typer.Typer(add_completion=False)
+# The converter and the shared code (rasterio, numpy, pydantic) are only imported once a
+# file is converted or inspected, so --help and argument errors come back right away.
+# Rich help is turned off for the same reason, it is slower to import than the rest.
+app = typer.Typer(add_completion=False, rich_markup_mode=None)
 
 
 @app.command()
@@ -23,6 +24,60 @@ def convert_file(
     output: str = typer.Option(
         None, "--output", "-o", help="The output file path (must end in .hdr)"
     ),
+    workers: int = typer.Option(
+        1, "--workers", "-w", help="Number of threads reading band files in parallel"
+    ),
+    inspect: bool = typer.Option(
+        False, "--inspect", help="Only print the ENVI header, without reading pixel data"
+    ),
+    profile: str = typer.Option(
+        None, "--profile", help="JSON lines file the time and memory of every stage are appended to"
+    ),
+    zarr: bool = typer.Option(
+        False, "--zarr", help="Also write the cube to a chunked Zarr array next to the .hdr"
+    ),
+    zarr_chunk_size: int = typer.Option(
+        constants.ZARR_CHUNK_SIZE, "--zarr-chunk-size", help="Lines and samples per Zarr chunk"
+    ),
+    zarr_band_chunk_size: int = typer.Option(
+        constants.ZARR_BAND_CHUNK_SIZE, "--zarr-band-chunk-size", help="Bands per Zarr chunk, 0 for all bands"
+    ),
+    zarr_compression: str = typer.Option(
+        constants.ZARR_COMPRESSION, "--zarr-compression", help="Compression of the Zarr chunks (zstd or none)"
+    ),
+    wavelengths: str = typer.Option(
+        None, "--wavelengths", help="Wavelength range (nm) of the bands to convert, e.g. 400-1000"
+    ),
+    bands: str = typer.Option(
+        None, "--bands", help="Numbers of the bands to convert, e.g. 8-57,77-224"
+    ),
+    exclude_bands: str = typer.Option(
+        None, "--exclude-bands", help="Numbers of the bands to leave out, e.g. 121-126,167-180"
+    ),
+    exclude_wavelengths: str = typer.Option(
+        None, "--exclude-wavelengths", help="Wavelength ranges (nm) to leave out, e.g. 1340-1460,1790-1960"
+    ),
+    aoi_bbox: str = typer.Option(
+        None, "--aoi-bbox", help="Area of interest to crop to, as min x,min y,max x,max y"
+    ),
+    aoi_polygon: str = typer.Option(
+        None, "--aoi-polygon", help="Polygon to crop to the bounding box of, as x1,y1,x2,y2,..."
+    ),
+    aoi_crs: str = typer.Option(
+        None, "--aoi-crs", help="CRS of the area of interest, e.g. EPSG:4326 for lon/lat (the scene CRS by default)"
+    ),
+    native_dtype: bool = typer.Option(
+        False, "--native-dtype", help="Keep the integer type of the source and write the scaling as header gains"
+    ),
+    checksums: bool = typer.Option(
+        False, "--checksums", help="Write the SHA-256 of the .raw and the CRC-32 of every band to <name>.checksums"
+    ),
+    upload_to: str = typer.Option(
+        None, "--upload-to", help="Directory the outputs are uploaded to, part by part while the .raw is written"
+    ),
+    upload_part_size_mb: int = typer.Option(
+        constants.UPLOAD_PART_SIZE_MB, "--upload-part-size-mb", help="Size (in MB) of the parts the .raw is uploaded in"
+    ),
 ):
     no_ext_path, ext = os.path.splitext(file_path)
     if os.path.exists(file_path):
@@ -35,26 +90,45 @@ def convert_file(
         typer.echo(f"File path {file_path} does not exist")
         exit(1)
 
+    # Also puts the shared code on the import path
+    from convert_hyperion_to_envi import HyperionConverter
+    from aoi import aoi_from, parse_coordinates
+    from band_selection import band_selection_from, parse_band_numbers, parse_ranges
+    from stage_profiler import StageProfiler
+    from writer_options import writer_options_from
+
+    wavelength_ranges = parse_ranges(wavelengths)
+    if len(wavelength_ranges) > 1:
+        typer.echo(f"--wavelengths takes a single range, got {wavelengths}")
+        exit(1)
+    band_selection = band_selection_from(wavelength_ranges[0] if wavelength_ranges else None, parse_band_numbers(bands),
+                                         parse_band_numbers(exclude_bands), parse_ranges(exclude_wavelengths))
+    bbox = parse_coordinates(aoi_bbox)
+    if bbox and len(bbox) != 4:
+        typer.echo(f"--aoi-bbox takes 4 coordinates, got {aoi_bbox}")
+        exit(1)
+    aoi = aoi_from(bbox, parse_coordinates(aoi_polygon), aoi_crs)
+
+    if inspect:
+        print(HyperionConverter(file_path, band_selection=band_selection, aoi=aoi,
+                                native_dtype=native_dtype).inspect_header_string())
+        return
+
     print("==============================================")
     print("              HYPERION CONVERSION")
     print("==============================================")
     print(f"Converting {file_path}...")
 
     converter_now = datetime.now()
-    converter = HyperionConverter(file_path)
-
-    hdr, raw, geotiff_path = converter.to_envi()
-    no_ext_path = os.path.splitext(geotiff_path)[0]
-    hdr_file_path = output or f"{no_ext_path}.hdr"
+    writer_options = writer_options_from(zarr, zarr_chunk_size, zarr_band_chunk_size, zarr_compression, checksums,
+                                         upload_to, upload_part_size_mb)
+    converter = HyperionConverter(file_path, workers=workers, profiler=StageProfiler(path=profile),
+                                  band_selection=band_selection, aoi=aoi, native_dtype=native_dtype,
+                                  writer_options=writer_options)
+    hdr_file_path = output or converter.default_hdr_path()
 
     print(f"Saving {hdr_file_path}...")
-    spectral.envi.save_image(
-        hdr_file=hdr_file_path,
-        image=raw,
-        force=True,
-        ext=".raw",
-        metadata=hdr.dict(),
-    )
+    converter.write_envi(hdr_file_path)
     print("")
     print(f"Conversion time: {datetime.now() - converter_now}")
     print("==============================================")
@@ -62,6 +136,13 @@ def convert_file(
 
 if __name__ == "__main__":
     if constants.GEOTIFF_PATH and constants.OUTPUT_HDR_FILE_PATH:
-        convert_file(constants.GEOTIFF_PATH, constants.OUTPUT_HDR_FILE_PATH)
+        # Called directly, so every option has to be given its value rather than a typer default
+        convert_file(constants.GEOTIFF_PATH, constants.OUTPUT_HDR_FILE_PATH, constants.WORKERS, inspect=False,
+                     profile=constants.PROFILE_PATH, zarr=constants.ZARR_OUTPUT,
+                     zarr_chunk_size=constants.ZARR_CHUNK_SIZE, zarr_band_chunk_size=constants.ZARR_BAND_CHUNK_SIZE,
+                     zarr_compression=constants.ZARR_COMPRESSION, wavelengths=None, bands=None, exclude_bands=None,
+                     exclude_wavelengths=None, aoi_bbox=None, aoi_polygon=None, aoi_crs=None, native_dtype=False,
+                     checksums=False, upload_to=constants.UPLOAD_DESTINATION or None,
+                     upload_part_size_mb=constants.UPLOAD_PART_SIZE_MB)
     else:
         app()
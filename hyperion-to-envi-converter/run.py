@@ -1,15 +1,27 @@
 #!/usr/bin/python
+import runpy
 import subprocess
 import shutil
 import sys
 import os
 
+# Arguments handled by the install scripts (run.sh takes --upgrade, run.ps1 --install)
+INSTALL_ARGS = ("--install", "--upgrade", "--recompile")
+
 
 def is_tool(name):
     """Check whether `name` is on PATH and marked as executable."""
     return shutil.which(name) is not None
 
 
+def venv_python(venv_path):
+    """The python of the virtual environment, None when it was not created yet."""
+    for path in (os.path.join(venv_path, "bin", "python"), os.path.join(venv_path, "Scripts", "python.exe")):
+        if os.path.isfile(path):
+            return path
+    return None
+
+
 def run_script(shell, script_path, args):
     try:
         subprocess.run([shell, script_path] + args, check=True)
@@ -25,18 +37,35 @@ script_dir = os.path.dirname(os.path.realpath(__file__))
 bash_script = os.path.join(script_dir, "run.sh")
 powershell_script = os.path.join(script_dir, "run.ps1")
 
+main_script = os.path.join(script_dir, "main.py")
+local_env_path = os.path.join(script_dir, "venv")
+
 # Get additional command line arguments
 additional_args = sys.argv[1:]
+python_path = venv_python(local_env_path)
 
-bash_available = is_tool("bash")
-powershell_available = is_tool("powershell")
-pwsh_available = is_tool("pwsh")
+if python_path is None or additional_args[:1] and additional_args[0] in INSTALL_ARGS:
+    # The scripts create (or update) the virtual environment, then run main.py in it
+    bash_available = is_tool("bash")
+    powershell_available = is_tool("powershell")
+    pwsh_available = is_tool("pwsh")
 
-if bash_available:
-    run_script("bash", bash_script, additional_args)
-elif powershell_available:
-    run_script("powershell", powershell_script, additional_args)
-elif pwsh_available:
-    run_script("pwsh", powershell_script, additional_args)
+    if bash_available:
+        run_script("bash", bash_script, additional_args)
+    elif powershell_available:
+        run_script("powershell", powershell_script, additional_args)
+    elif pwsh_available:
+        run_script("pwsh", powershell_script, additional_args)
+    else:
+        print("Neither Bash nor PowerShell is available.", file=sys.stderr)
+elif os.path.realpath(sys.prefix) == os.path.realpath(local_env_path):
+    # Already running in the virtual environment, so main.py is run in this process
+    sys.argv = [main_script] + additional_args
+    sys.path.insert(0, script_dir)
+    runpy.run_path(main_script, run_name="__main__")
+elif os.name == "nt":
+    sys.exit(subprocess.call([python_path, main_script] + additional_args))
 else:
-    print("Neither Bash nor PowerShell is available.", file=sys.stderr)
+    # The python of the virtual environment replaces this process, without starting a
+    # shell or activating the environment
+    os.execv(python_path, [python_path, main_script] + additional_args)
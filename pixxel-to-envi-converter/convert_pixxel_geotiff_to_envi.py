@@ -2,55 +2,99 @@
 DESCRIPTION: Python script that converts an Pixxel GeoTIFF to ENVI Standard.
 """
 import os
+import sys
 import rasterio
 
 import numpy as np
-import xml.etree.ElementTree as ET
 
-from spectral import envi
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "common"))
+from aoi import AOI, aoi_window, as_aoi, cropped_transform, full_window
+from band_selection import BandSelection, as_band_selection, source_band_count
+from chunk_journal import ChunkJournal, journal_fingerprint, journal_path, window_key
+from chunk_windows import iter_chunk_windows, relative_window
+from running_statistics import RunningStatistics
+from envi_writer import ENVIWriter, prepare_header
+from ENVI import ENVIModel
+from spectral_metadata import read_spectral_metadata
+from source_layout import REORDER, copy_source, describe, open_source, write_path
+from stage_profiler import StageProfiler, profiled, profiled_conversion
+from writer_options import WriterOptions, as_writer_options
 
 # Hard coded constants specific to an EnMap GeoTIFF file
 FILE_TYPE = "ENVI"
-HEADER_OFFSET = 0
-BYTE_ORDER = 0
 INTERLEAVE = "BIL"
+NORMALISED_DTYPE = np.float64  # the precision the normalisation is computed in
+DEFAULT_CHUNK_SIZE_MB = 64
+
+
+def is_constant(stats):
+    # A scene holding a single value has no spread to normalise by
+    return stats.std == 0 or stats.max == stats.min
 
 
 class PixxelConverter(object):
-    def __init__(self, geotiff_path: str, metadata_path: str, output_dir: str):
+    def __init__(self, geotiff_path: str, metadata_path: str, output_dir: str,
+                 normalise: bool = False, chunk_size_mb: int = DEFAULT_CHUNK_SIZE_MB, interleave: str = INTERLEAVE,
+                 resumable: bool = False, profiler: StageProfiler = None, band_selection: BandSelection = None,
+                 aoi: AOI = None, native_dtype: bool = False, writer_options: WriterOptions = None):
         self.geotiff_path = geotiff_path
         self.metadata_path = metadata_path
         self.output_dir = output_dir
+        self.normalise = normalise
+        self.resumable = resumable
+        self.profiler = profiler or StageProfiler()
+        self.band_selection = as_band_selection(band_selection)
+        self.band_indexes = None
+        self.aoi = as_aoi(aoi)
+        self.aoi_window = None
+        # With normalise, keeps the integer type of the GeoTIFF and records the
+        # normalisation as the data gain and offset values of the header instead
+        self.native_dtype = native_dtype
+        self.writer_options = as_writer_options(writer_options)
+        self.data_gain_values = []
+        self.data_offset_values = []
+        self.chunk_size = chunk_size_mb * 1024 * 1024
         self.wavelengths = []
         self.wavelength_units = ""
         self.file_type = FILE_TYPE
         self.map_info = ""
-        self.header_offset = HEADER_OFFSET
         self.lines = 0
         self.samples = 0
         self.bands = 0
-        self.byte_order = BYTE_ORDER
-        self.interleave = INTERLEAVE
-        self.data_type = -1
+        self.interleave = interleave
+        self.write_path = REORDER
         self.fwhm = []
         self.data = []
 
+    @profiled_conversion("pixxel")
     def convert_geotiff(self):
         print("Validating input files...")
         # self.validate_input_file()
         print("Starting conversion...")
+        self.parse_metadata_file()
+        self.select_bands()
 
-        # self.parse_metadata_file_v1()
-
-        # Uncomment this if the v1 method did not work:
-        self.parse_metadata_file_v2()
-
-        self.parse_geotiff_file()
-        self.get_data_type()
-        self.validate_wavelengths()
-        print("Creating ENVI files...")
-        self.create_envi_files()
+        # The GeoTIFF is opened once for the whole conversion, as in inspect
+        with rasterio.open(self.geotiff_path) as src:
+            self.get_write_path(src)
+            if self.normalise or self.resumable or self.write_path != REORDER:
+                self.parse_geotiff_header(src)
+            else:
+                self.parse_geotiff_file(src)
+            self.validate_wavelengths()
+            if self.normalise and self.native_dtype:
+                self.get_normalisation_values(self.compute_statistics(src))
+            print("Creating ENVI files...")
+            if self.normalise and not self.native_dtype:
+                self.create_normalised_envi_files(src)
+            elif self.write_path != REORDER:
+                self.copy_envi_files(src)
+            elif self.resumable or self.normalise:
+                self.stream_envi_files(src)
+            else:
+                self.create_envi_files()
 
+    @profiled("validate")
     def validate_input_file(self):
         if not os.path.isfile(self.geotiff_path):
             print(f"ERROR: GeoTIFF file doesn't exist - {self.geotiff_path}")
@@ -66,97 +110,56 @@ class PixxelConverter(object):
             )
         print("GeoTIFF and XML Metadata files are valid")
 
-    def parse_metadata_file_v1(self):
-        # constants specific to reading the XML Metadata file specific to Pixxel GeoTIFFs
-        wavelength_element = "Wavelength_list"
-        wavelength_unit_element = "unit"
-        fwhm_element = "FWHM_list"
-
-        tree = ET.parse(self.metadata_path)
-        root = tree.getroot()
-
-        wavelengths_txt = root.find(wavelength_element).text
-        wavelengths_str = wavelengths_txt.strip("{}").split(",")
-        filtered_array = [item for item in wavelengths_str if item != ""]
-        wavelengths = [float(number) for number in filtered_array if number.strip()]
-        self.wavelengths = wavelengths
-
-        self.wavelength_units = root.find(wavelength_element).get(
-            wavelength_unit_element
-        )
-
-        fwhm_txt = root.find(fwhm_element).text
-        fwhm_str = fwhm_txt.strip("{}").split(",")
-        filtered_array = [item for item in fwhm_str if item != ""]
-        fwhm = [float(number) for number in filtered_array]
-        self.fwhm = fwhm
-
-        print("XML Metadata file parsed")
-
-    def parse_metadata_file_v2(self):
-        # Some metadatas match this pattern
-        # constants specific to reading the XML Metadata file specific to Pixxel
-        # GeoTIFFs
-        wavelength_element = "Central_Wavelength"
-        wavelength_unit_element = "unit"
-        central_wavelength_element = ".//Central_Wavelength"
-        fwhm_element = "Bandwidth"
-        status_element = "Status"
-
-        tree = ET.parse(self.metadata_path)
-
-        # Extract the list of central wavelengths and bandwidths for bands that
-        # appear in the image
-        wavelengths = []
-        bandwidths = []
-        for band in tree.findall(".//Bands"):
-            status = band.find(status_element)
-            # Check if the band appears in the image
-            if status is not None and status.text == "1":
-                central_wavelength = band.find(wavelength_element)
-                if central_wavelength is not None:
-                    wavelengths.append(float(central_wavelength.text))
-
-                bandwidth_element_obj = band.find(fwhm_element)
-                if bandwidth_element_obj is not None:
-                    bandwidths.append(float(bandwidth_element_obj.text))
-
-        self.wavelengths = wavelengths
-        self.fwhm = bandwidths
-        self.wavelength_units = tree.find(central_wavelength_element).get(
-            wavelength_unit_element
-        )
-
-        print("XML Metadata file parsed")
-
-    def get_byte_order(self):
-        with open(self.geotiff_path, "rb") as tiff_file:
-            # Read the first 2 bytes of the file
-            header = tiff_file.read(2)
-            if header == b"II":
-                self.byte_order = 0
-            elif header == b"MM":
-                self.byte_order = 1
-            else:
-                self.byte_order = -1
-
-    def get_data_type(self):
-        with rasterio.open(self.geotiff_path) as src:
-            match src.dtypes[0]:
-                case "byte":
-                    self.data_type = 1
-                case "int16":
-                    self.data_type = 2
-                case _:
-                    self.data_type = -1
-
-    def parse_geotiff_file(self):
-        with rasterio.open(self.geotiff_path) as src:
+    @profiled("metadata")
+    def parse_metadata_file(self):
+        # Reads the v1 (wavelength and FWHM lists) and v2 (one Bands element per band)
+        # layouts alike, only the bands with a status of 1 are kept from v2
+        metadata = read_spectral_metadata(self.metadata_path)
+        self.wavelengths = metadata.wavelengths
+        self.fwhm = metadata.fwhm
+        self.wavelength_units = metadata.wavelength_units or ""
+        print(f"XML Metadata file parsed ({metadata.schema_name} layout)")
+
+    def select_bands(self):
+        # The selected bands are resolved against the wavelengths of the metadata, so
+        # their indexes are known before any pixel data is read
+        if self.band_selection is None:
+            return
+        selected = self.band_selection.select(self.wavelengths)
+        print(f"Selected {len(selected)} of {len(self.wavelengths)} bands")
+        self.band_indexes = [i + 1 for i in selected]
+        self.wavelengths = [self.wavelengths[i] for i in selected]
+        self.fwhm = [self.fwhm[i] for i in selected]
+
+    @profiled("metadata")
+    def get_write_path(self, src=None):
+        with open_source(self.geotiff_path, src) as src:
+            self.locate_aoi(src)
+            dtype = self.get_output_dtype(src)
+            self.write_path = write_path(src, self.geotiff_path, self.interleave, dtype, self.band_indexes,
+                                         self.aoi_window)
+        print(describe(self.write_path, self.interleave))
+
+    def locate_aoi(self, src):
+        # The pixel window covering the area of interest, the whole scene without one
+        self.aoi_window = aoi_window(src, self.aoi)
+        if self.aoi is not None:
+            window = self.aoi_window
+            print(f"Area of interest covers lines {window.row_off} to {window.row_off + window.height - 1} "
+                  f"and samples {window.col_off} to {window.col_off + window.width - 1}")
+
+    def get_output_dtype(self, src):
+        return NORMALISED_DTYPE if self.normalise and not self.native_dtype else src.dtypes[0]
+
+    def parse_geotiff_file(self, src=None):
+        with open_source(self.geotiff_path, src) as src:
             # Get the geospatial metadata (map information).
             crs = src.crs
-            transform = src.transform
+            transform = cropped_transform(src, self.aoi_window)
             self.map_info = f"{crs}, 1.000, 1.000, {transform.c}, {transform.f}, {transform.a}, {transform.e}"
-            self.data = src.read()
+            with self.profiler.stage("read") as stage:
+                self.data = src.read(self.band_indexes, window=self.aoi_window)
+                stage.add(self.data.nbytes)
             self.lines = self.data.shape[1]
             self.samples = self.data.shape[2]
             self.bands = self.data.shape[0]
@@ -166,6 +169,39 @@ class PixxelConverter(object):
             )
         print("GeoTIFF file parsed")
 
+    @profiled("metadata")
+    def parse_geotiff_header(self, src=None):
+        # Same as parse_geotiff_file but leaves the pixel data on disk to be read in windows
+        with open_source(self.geotiff_path, src) as src:
+            self.read_geotiff_header(src)
+        print("GeoTIFF header parsed")
+
+    def read_geotiff_header(self, src):
+        crs = src.crs
+        transform = cropped_transform(src, self.aoi_window)
+        self.map_info = f"{crs}, 1.000, 1.000, {transform.c}, {transform.f}, {transform.a}, {transform.e}"
+        window = self.aoi_window or full_window(src)
+        self.lines = window.height
+        self.samples = window.width
+        self.bands = source_band_count(src, self.band_indexes)
+        print(
+            f"Lines = {self.lines} | Samples = {self.samples} | Bands = {self.bands}"
+        )
+
+    def inspect(self):
+        # Returns the header the conversion would write, reading only the XML and the
+        # GeoTIFF header (a single GDAL open) and never the pixel data
+        self.parse_metadata_file()
+        self.select_bands()
+        with rasterio.open(self.geotiff_path) as src:
+            self.locate_aoi(src)
+            self.read_geotiff_header(src)
+            dtype = self.get_output_dtype(src)
+        # The gain and offset values of a native normalised conversion need the
+        # statistics of the pixel data and are left out here
+        self.validate_wavelengths()
+        return self.get_envi_header(dtype).dict()
+
     def validate_wavelengths(self):
         if len(self.wavelengths) != self.bands:
             print(
@@ -176,55 +212,166 @@ class PixxelConverter(object):
                 f"ERROR: The number of fwhm ({len(self.fwhm)}) does not equal the number of bands ({self.bands})"
             )
 
-    # NOTE: This function will normalise data between 0 and 1 using standard deviation
-    def normalise_hsi_data(self):
-        hsi_data = np.transpose(self.data, [1, 2, 0])
-        std_deviation = np.std(hsi_data)
-        mean_value = np.mean(hsi_data)
-        normalized_numbers = [(x - mean_value) / std_deviation for x in hsi_data]
-
+    # NOTE: These functions normalise data between 0 and 1 using standard deviation.
+    # The global statistics are gathered in one windowed pass, the affine map is then
+    # applied window by window in a second pass, see create_normalised_envi_files.
+    def compute_statistics(self, src=None):
+        stats = RunningStatistics()
+        pixel_bytes = self.bands * np.dtype(np.float64).itemsize
+        with open_source(self.geotiff_path, src) as src:
+            for window in iter_chunk_windows(src, self.chunk_size, pixel_bytes, self.aoi_window):
+                with self.profiler.stage("read") as stage:
+                    chunk = src.read(self.band_indexes, window=window)
+                    stage.add(chunk.nbytes)
+                with self.profiler.stage("normalise", chunk.nbytes):
+                    stats.update(chunk)
+        print(f"Mean = {stats.mean} | Std = {stats.std} | Min = {stats.min} | Max = {stats.max}")
+        return stats
+
+    def normalise_hsi_data(self, chunk, stats, out):
+        if is_constant(stats):
+            # Nothing to spread between 0 and 1 (e.g. an all-fill tile), every value maps to 0
+            out[...] = 0
+            return out
         min_value_out = 0
         max_value_out = 1
-        range_out = max_value_out - min_value_out
-        min_normalized = np.min(normalized_numbers)
-        max_normalized = np.max(normalized_numbers)
-
-        normalized_numbers = np.array(
-            [
-                (x - min_normalized)
-                / (max_normalized - min_normalized)
-                * (max_value_out - min_value_out)
-                + min_value_out
-                for x in normalized_numbers
-            ]
+        # The standardised extremes, i.e. the min and max of (x - mean) / std
+        min_normalized = (stats.min - stats.mean) / stats.std
+        max_normalized = (stats.max - stats.mean) / stats.std
+
+        if chunk is not out:
+            np.copyto(out, chunk, casting="unsafe")
+        out -= stats.mean
+        out /= stats.std
+        out -= min_normalized
+        out /= max_normalized - min_normalized
+        out *= max_value_out - min_value_out
+        out += min_value_out
+        return out
+
+    def get_normalisation_values(self, stats):
+        # normalise_hsi_data reduces to (x - min) / (max - min), which the header
+        # records as a gain and an offset for every band
+        if is_constant(stats):
+            # Same as normalise_hsi_data, every value maps to 0
+            self.data_gain_values = [0.0] * self.bands
+            self.data_offset_values = [0.0] * self.bands
+            return
+        value_range = stats.max - stats.min
+        self.data_gain_values = [1.0 / value_range] * self.bands
+        self.data_offset_values = [-stats.min / value_range] * self.bands
+
+    def get_envi_header(self, dtype):
+        header = ENVIModel(
+            wavelength=self.wavelengths,
+            wavelength_units=self.wavelength_units,
+            data_ignore_value=None,
+            map_info=self.map_info,
+            lines=self.lines,
+            samples=self.samples,
+            bands=self.bands,
+            file_type=self.file_type,
+            interleave=self.interleave.lower(),
+            fwhm=self.fwhm,
+            data_gain_values=self.data_gain_values,
+            data_offset_values=self.data_offset_values,
         )
-        return normalized_numbers
-
-    def process_hsi_data(self):
-        hsi_data = np.transpose(self.data, [1, 2, 0])
-        return hsi_data
+        return prepare_header(header, dtype)
+
+    def get_journal(self):
+        # Only resumable conversions keep a journal of the written chunks beside the .hdr
+        if not self.resumable:
+            return None
+        fingerprint = journal_fingerprint(
+            [self.geotiff_path, self.metadata_path],
+            interleave=self.interleave.lower(),
+            chunk_size=self.chunk_size,
+            normalise=self.normalise,
+            native_dtype=self.native_dtype,
+            write_path=self.write_path,
+            bands=self.band_indexes,
+            region=window_key(self.aoi_window),
+        )
+        return ChunkJournal(journal_path(self.output_dir), fingerprint)
 
     def create_envi_files(self):
-        metadata = {
-            "wavelength": self.wavelengths,
-            "wavelength units": self.wavelength_units,
-            "map info": self.map_info,
-            "lines": self.lines,
-            "samples": self.samples,
-            "bands": self.bands,
-            "file type": self.file_type,
-            "header offset": self.header_offset,
-            "byte order": self.byte_order,
-            "interleave": self.interleave,
-            "data type": self.data_type,
-            "fwhm": self.fwhm,
-        }
-
-        hsi_data = self.process_hsi_data()
-
-        envi.save_image(self.output_dir, hsi_data, metadata=metadata, force=True)
+        # The (band, line, sample) data keeps its type and is copied once into the .raw
+        with ENVIWriter(self.output_dir, self.get_envi_header(self.data.dtype), self.data.dtype,
+                        profiler=self.profiler, options=self.writer_options) as writer:
+            writer.write(self.data)
 
         if os.path.isfile(self.output_dir):
             print("ENVI Files successfully created.")
         else:
             print("ERROR: The ENVI Header File was not successfully created.")
+
+    def copy_envi_files(self, src=None):
+        # The GeoTIFF is stored in the output interleave, so it is copied into the .raw
+        # without being read into memory or reordered
+        with open_source(self.geotiff_path, src) as src, \
+                ENVIWriter(self.output_dir, self.get_envi_header(src.dtypes[0]), src.dtypes[0],
+                           journal=self.get_journal(), profiler=self.profiler, options=self.writer_options) as writer:
+            self.write_path = copy_source(src, self.geotiff_path, writer, self.chunk_size, indexes=self.band_indexes,
+                                          region=self.aoi_window)
+
+        if os.path.isfile(self.output_dir) and os.path.isfile(writer.raw_path):
+            print("ENVI Files successfully created.")
+        else:
+            print("ERROR: The ENVI Header File was not successfully created.")
+
+    def stream_envi_files(self, src=None):
+        # Same as create_envi_files, one window at a time
+        with open_source(self.geotiff_path, src) as src, \
+                ENVIWriter(self.output_dir, self.get_envi_header(src.dtypes[0]), src.dtypes[0],
+                           journal=self.get_journal(), profiler=self.profiler, options=self.writer_options) as writer:
+            pixel_bytes = self.bands * np.dtype(src.dtypes[0]).itemsize
+            for window in iter_chunk_windows(src, self.chunk_size, pixel_bytes, self.aoi_window):
+                if writer.is_done(window_key(window)):
+                    continue
+                with self.profiler.stage("read") as stage:
+                    chunk = src.read(self.band_indexes, window=window)
+                    stage.add(chunk.nbytes)
+                target = relative_window(window, self.aoi_window)
+                writer.write(chunk, target.row_off, target.col_off)
+                writer.flush(target)
+                writer.mark_done(window_key(window))
+
+        if os.path.isfile(self.output_dir) and os.path.isfile(writer.raw_path):
+            print("ENVI Files successfully created.")
+        else:
+            print("ERROR: The ENVI Header File was not successfully created.")
+
+    def create_normalised_envi_files(self, src=None):
+        stats = self.compute_statistics(src)
+
+        pixel_bytes = self.bands * np.dtype(NORMALISED_DTYPE).itemsize
+        buffer = np.empty(0, dtype=NORMALISED_DTYPE)
+        with ENVIWriter(self.output_dir, self.get_envi_header(NORMALISED_DTYPE), NORMALISED_DTYPE,
+                        journal=self.get_journal(), profiler=self.profiler, options=self.writer_options) as writer, \
+                open_source(self.geotiff_path, src) as src:
+            if self.write_path != REORDER:
+                # Each window is read straight into the .raw and normalised in place there
+                copy_source(src, self.geotiff_path, writer, self.chunk_size,
+                            process=lambda out: self.normalise_hsi_data(out, stats, out), process_stage="normalise",
+                            indexes=self.band_indexes, region=self.aoi_window)
+            else:
+                for window in iter_chunk_windows(src, self.chunk_size, pixel_bytes, self.aoi_window):
+                    if writer.is_done(window_key(window)):
+                        continue
+                    with self.profiler.stage("read") as stage:
+                        chunk = src.read(self.band_indexes, window=window)
+                        stage.add(chunk.nbytes)
+                    if buffer.size < chunk.size:
+                        buffer = np.empty(chunk.size, dtype=NORMALISED_DTYPE)
+                    out = buffer[:chunk.size].reshape(chunk.shape)
+                    with self.profiler.stage("normalise", out.nbytes):
+                        self.normalise_hsi_data(chunk, stats, out)
+                    target = relative_window(window, self.aoi_window)
+                    writer.write(out, target.row_off, target.col_off)
+                    writer.flush(target)
+                    writer.mark_done(window_key(window))
+
+        if os.path.isfile(self.output_dir) and os.path.isfile(writer.raw_path):
+            print("ENVI Files successfully created.")
+        else:
+            print("ERROR: The ENVI Header File was not successfully created.")
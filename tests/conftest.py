@@ -0,0 +1,30 @@
+"""
+DESCRIPTION: Shared fixtures of the tests. The converters and the common code are not
+             installed packages, so their directories are put on the import path the
+             same way the converter scripts do. Install the requirements with
+             pip install -r tests/requirements.txt and run python -m pytest tests.
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+for directory in ("common", "pixxel-to-envi-converter", "batch-converter", "envi-tools", "benchmarks"):
+    sys.path.append(os.path.join(REPO_DIR, directory))
+
+
+@pytest.fixture
+def write_geotiff(tmp_path):
+    # Writes a (band, line, sample) cube to a GeoTIFF in the test directory
+    def write(data: np.ndarray, name: str = "scene.tif"):
+        path = str(tmp_path / name)
+        bands, lines, samples = data.shape
+        with rasterio.open(path, "w", driver="GTiff", height=lines, width=samples, count=bands, dtype=data.dtype,
+                           crs="EPSG:32643", transform=from_origin(500000, 2000000, 5, 5)) as dst:
+            dst.write(data)
+        return path
+    return write
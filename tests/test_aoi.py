@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+import rasterio
+from rasterio.warp import transform_bounds
+from rasterio.windows import Window
+from spectral import envi
+
+from aoi import AOI, aoi_from, aoi_window
+from converters import convert_scene
+from synthetic_scenes import write_worldview3_scene
+
+RESOLUTION = 1.24
+# (band, line, sample) axes of the cube in the order each interleave stores them
+AXES = {"bsq": (0, 1, 2), "bil": (1, 0, 2), "bip": (1, 2, 0)}
+
+
+def scene_bbox(col_start, row_start, col_end, row_end):
+    # A bounding box in the CRS of the synthetic scenes, from fractional pixel positions
+    return (500000 + col_start * RESOLUTION, 5000000 - row_end * RESOLUTION,
+            500000 + col_end * RESOLUTION, 5000000 - row_start * RESOLUTION)
+
+
+@pytest.fixture
+def scene(tmp_path):
+    geotiff_path, _ = write_worldview3_scene(str(tmp_path), 9, 10)
+    return geotiff_path
+
+
+def test_window_keeps_every_pixel_touched(scene):
+    with rasterio.open(scene) as src:
+        assert aoi_window(src, AOI(bbox=scene_bbox(2.5, 1.3, 6.2, 4.6))) == Window(2, 1, 5, 4)
+        # A polygon is cropped to its bounding box
+        x0, y0, x1, y1 = scene_bbox(2.5, 1.3, 6.2, 4.6)
+        assert aoi_window(src, aoi_from(polygon=[x0, y0, x1, (y0 + y1) / 2, x0, y1])) == Window(2, 1, 5, 4)
+        # Clipped to the scene
+        assert aoi_window(src, AOI(bbox=scene_bbox(-3, -3, 4, 20))) == Window(0, 0, 4, 9)
+        assert aoi_window(src) == Window(0, 0, 10, 9)
+        with pytest.raises(ValueError, match="does not overlap"):
+            aoi_window(src, AOI(bbox=scene_bbox(20, 20, 30, 30)))
+
+
+def test_window_from_another_crs(scene):
+    with rasterio.open(scene) as src:
+        lonlat = transform_bounds(src.crs, "EPSG:4326", *scene_bbox(2.5, 1.3, 6.2, 4.6))
+        window = aoi_window(src, AOI(bbox=lonlat, crs="EPSG:4326"))
+    # The reprojected box covers at least the pixels of the box, and at most one more on each side
+    assert window.col_off in (1, 2) and window.row_off in (0, 1)
+    assert window.col_off + window.width in (7, 8) and window.row_off + window.height in (5, 6)
+
+
+@pytest.mark.parametrize("interleave", ["bsq", "bil", "bip"])
+def test_converted_window(tmp_path, scene, interleave):
+    with rasterio.open(scene) as src:
+        cube = src.read()
+    hdr_path = str(tmp_path / "cropped.hdr")
+    convert_scene("worldview3", scene, hdr_path, interleave=interleave,
+                  aoi={"bbox": scene_bbox(2.5, 1.3, 6.2, 4.6)})
+
+    header = envi.read_envi_header(hdr_path)
+    assert (int(header["lines"]), int(header["samples"])) == (4, 5)
+    # The map info is moved to the corner of the cropped grid
+    x, y, x_size, y_size = (float(value) for value in header["map info"][3:7])
+    assert (x, y) == pytest.approx((500000 + 2 * RESOLUTION, 5000000 - 1 * RESOLUTION))
+    assert (x_size, y_size) == pytest.approx((RESOLUTION, -RESOLUTION))
+    expected = np.transpose(cube[:, 1:5, 2:7], AXES[interleave])
+    raw = np.fromfile(str(tmp_path / "cropped.raw"), dtype=cube.dtype).reshape(expected.shape)
+    assert np.array_equal(raw, expected)
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+import rasterio
+from spectral import envi
+
+from band_selection import BandSelection, parse_band_numbers, parse_ranges
+from converters import convert_scene
+from synthetic_scenes import write_worldview3_scene
+
+WAVELENGTHS = [427.4, 481.9, 547.1, 604.3, 660.1, 722.7, 824.0, 913.6]
+# (band, line, sample) axes of the cube in the order each interleave stores them
+AXES = {"bsq": (0, 1, 2), "bil": (1, 0, 2), "bip": (1, 2, 0)}
+
+
+def test_select():
+    assert BandSelection(wavelength_range=(500, 700)).select(WAVELENGTHS) == [2, 3, 4]
+    assert BandSelection(bands=[8, 1, 3]).select(WAVELENGTHS) == [0, 2, 7]
+    selection = BandSelection(exclude_bands=[1], exclude_wavelength_ranges=[(600, 700), (900, 1000)])
+    assert selection.select(WAVELENGTHS) == [1, 2, 5, 6]
+    # Band numbers of a scene that does not start at band 1
+    assert BandSelection(bands=[11, 12]).select(WAVELENGTHS[:3], [10, 11, 12]) == [1, 2]
+    with pytest.raises(ValueError, match="keeps none"):
+        BandSelection(wavelength_range=(1000, 2000)).select(WAVELENGTHS)
+    with pytest.raises(ValueError, match="not among"):
+        BandSelection(bands=[9]).select(WAVELENGTHS)
+
+
+def test_parse():
+    assert parse_ranges("400-1000, 1500") == [(400.0, 1000.0), (1500.0, 1500.0)]
+    assert parse_band_numbers("2-4,7") == [2, 3, 4, 7]
+    assert parse_band_numbers(None) == []
+
+
+@pytest.mark.parametrize("source_interleave", ["pixel", "band"])
+@pytest.mark.parametrize("interleave", ["bsq", "bil", "bip"])
+def test_converted_bands(tmp_path, source_interleave, interleave):
+    # Every write path (strips copied as they are, or windows read and reordered)
+    geotiff_path, _ = write_worldview3_scene(str(tmp_path), 11, 9, interleave=source_interleave)
+    with rasterio.open(geotiff_path) as src:
+        cube = src.read()
+    hdr_path = str(tmp_path / "selected.hdr")
+    convert_scene("worldview3", geotiff_path, hdr_path, interleave=interleave,
+                  band_selection={"exclude_bands": [2, 5], "wavelength_range": [450, 900]})
+
+    positions = [2, 3, 5, 6]
+    header = envi.read_envi_header(hdr_path)
+    assert int(header["bands"]) == len(positions)
+    assert [float(w) for w in header["wavelength"]] == [WAVELENGTHS[p] for p in positions]
+    expected = np.transpose(cube[positions], AXES[interleave])
+    raw = np.fromfile(str(tmp_path / "selected.raw"), dtype=cube.dtype).reshape(expected.shape)
+    assert np.array_equal(raw, expected)
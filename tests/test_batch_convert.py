@@ -0,0 +1,66 @@
+import filecmp
+import json
+import os
+
+import pytest
+
+from batch_convert import run_batch, run_scene
+from conversion_cache import ConversionCache
+from synthetic_scenes import write_worldview3_scene
+from watch_folders import WatchService
+
+
+def convert(tmp_path, geotiff_path, name, cache, destination):
+    scene = {"sensor": "worldview3", "geotiff_path": geotiff_path, "output_path": str(tmp_path / name / "scene.hdr"),
+             "options": {"writer_options": {"upload": {"destination": destination}, "checksums": True}}}
+    os.makedirs(os.path.dirname(scene["output_path"]))
+    return run_scene(scene, cache=cache)
+
+
+def same_upload(record, destination):
+    base = os.path.splitext(record["output_path"])[0]
+    return all(filecmp.cmp(base + ext, os.path.join(destination, "scene" + ext), shallow=False)
+               for ext in (".hdr", ".raw", ".checksums"))
+
+
+def test_cache_hit_is_uploaded(tmp_path):
+    geotiff_path, _ = write_worldview3_scene(str(tmp_path), 20, 30)
+    cache = ConversionCache(str(tmp_path / "cache"))
+    first = convert(tmp_path, geotiff_path, "first", cache, str(tmp_path / "store-first"))
+    assert (first["status"], first["cache"]) == ("ok", "miss")
+    assert same_upload(first, str(tmp_path / "store-first"))
+
+    # Another destination still hits the cache, as the upload does not change the outputs
+    second = convert(tmp_path, geotiff_path, "second", cache, str(tmp_path / "store-second"))
+    assert (second["status"], second["cache"]) == ("ok", "hit")
+    assert same_upload(second, str(tmp_path / "store-second"))
+    assert second["sha256"] == first["sha256"]
+
+
+def test_same_output_is_refused(tmp_path):
+    scenes = []
+    for folder in ("a", "b"):
+        os.makedirs(tmp_path / folder)
+        scenes.append({"sensor": "worldview3", "geotiff_path": write_worldview3_scene(str(tmp_path / folder), 4, 5)[0]})
+    with pytest.raises(ValueError, match="same output"):
+        run_batch(scenes, str(tmp_path / "results.jsonl"), output_dir=str(tmp_path / "out"))
+    assert not os.path.exists(tmp_path / "results.jsonl")
+
+    # Unless they are given outputs of their own
+    scenes[1]["output_path"] = str(tmp_path / "out" / "other.hdr")
+    assert run_batch(scenes, str(tmp_path / "results.jsonl"), output_dir=str(tmp_path / "out")) == 0
+
+
+def test_same_delivery_name_in_two_drop_folders(tmp_path):
+    folders = [str(tmp_path / "a"), str(tmp_path / "b")]
+    for folder in folders:
+        os.makedirs(folder)
+        write_worldview3_scene(folder, 4, 5)
+    service = WatchService(folders, str(tmp_path / "out"), str(tmp_path / "results.jsonl"), poll_seconds=0.01,
+                           settle_seconds=0)
+    service.run(once=True)
+    assert (service.converted, service.failed) == (1, 1)
+    with open(tmp_path / "results.jsonl") as results:
+        records = {record["delivery"]: record for record in map(json.loads, results)}
+    assert records[os.path.join(folders[0], "worldview3.tif")]["status"] == "ok"
+    assert "already the output of" in records[os.path.join(folders[1], "worldview3.tif")]["error"]
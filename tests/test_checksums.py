@@ -0,0 +1,43 @@
+import hashlib
+import zlib
+
+import numpy as np
+import pytest
+import rasterio
+
+from checksums import file_checksum, manifest_path, read_manifest
+from converters import convert_scene
+from synthetic_scenes import write_worldview3_scene
+
+
+@pytest.fixture(scope="module")
+def manifests(tmp_path_factory):
+    # The same scene converted to every interleave
+    directory = tmp_path_factory.mktemp("checksums")
+    geotiff_path, _ = write_worldview3_scene(str(directory), 13, 7)
+    with rasterio.open(geotiff_path) as src:
+        cube = src.read()
+    paths = {}
+    for interleave in ("bsq", "bil", "bip"):
+        paths[interleave] = str(directory / f"{interleave}.hdr")
+        convert_scene("worldview3", geotiff_path, paths[interleave], interleave=interleave,
+                      writer_options={"checksums": True})
+    return cube, paths
+
+
+def test_band_checksums_do_not_depend_on_the_interleave(manifests):
+    cube, paths = manifests
+    # The CRC-32 of each band of the source, in (line, sample) order
+    expected = [f"{zlib.crc32(np.ascontiguousarray(band)):08x}" for band in cube]
+    for hdr_path in paths.values():
+        assert read_manifest(manifest_path(hdr_path)).bands.checksums == expected
+
+
+def test_raw_and_header_checksums(manifests):
+    _, paths = manifests
+    for hdr_path in paths.values():
+        manifest = read_manifest(manifest_path(hdr_path))
+        with open(hdr_path[:-len(".hdr")] + ".raw", "rb") as raw_file:
+            data = raw_file.read()
+        assert (manifest.raw.checksum, manifest.raw.size) == (hashlib.sha256(data).hexdigest(), len(data))
+        assert manifest.header == file_checksum(hdr_path)
@@ -0,0 +1,63 @@
+import filecmp
+import os
+
+import pytest
+
+from chunk_journal import ChunkJournal, journal_path
+from converters import convert_scene
+from synthetic_scenes import write_enmap_scene
+
+
+def test_resumes_the_same_fingerprint(tmp_path):
+    path = str(tmp_path / "scene.journal")
+    journal = ChunkJournal(path, {"params": {"chunk_size": 1}})
+    assert not journal.open(resume=True)
+    journal.mark_done("0,0,10,10")
+    journal.mark_done("10,0,10,10")
+    journal.close()
+    # A line cut short by a crash was never listed as done
+    with open(path, "a") as f:
+        f.write("20,0,1")
+
+    resumed = ChunkJournal(path, {"params": {"chunk_size": 1}})
+    assert resumed.open(resume=True)
+    assert resumed.done == {"0,0,10,10", "10,0,10,10"}
+    resumed.mark_done("20,0,10,10")
+    resumed.close()
+    assert ChunkJournal(path, {"params": {"chunk_size": 1}}).read() == {"0,0,10,10", "10,0,10,10", "20,0,10,10"}
+
+    # Another conversion starts over
+    other = ChunkJournal(path, {"params": {"chunk_size": 2}})
+    assert not other.open(resume=True)
+    assert other.done == set()
+    other.close()
+
+
+def test_interrupted_conversion_resumes(tmp_path, monkeypatch):
+    geotiff_path, metadata_path = write_enmap_scene(str(tmp_path), 100, 60)
+    options = {"streaming": True, "chunk_size_mb": 1}
+    convert_scene("enmap", geotiff_path, str(tmp_path / "full.hdr"), metadata_path=metadata_path, **options)
+
+    marked = []
+    mark_done = ChunkJournal.mark_done
+
+    def crash_after_two_chunks(journal, key):
+        if len(marked) == 2:
+            raise RuntimeError("killed")
+        marked.append(key)
+        mark_done(journal, key)
+
+    hdr_path = str(tmp_path / "resumed.hdr")
+    monkeypatch.setattr(ChunkJournal, "mark_done", crash_after_two_chunks)
+    with pytest.raises(RuntimeError):
+        convert_scene("enmap", geotiff_path, hdr_path, metadata_path=metadata_path, resumable=True, **options)
+    assert not os.path.exists(hdr_path)
+    assert os.path.isfile(journal_path(hdr_path))
+
+    # The rerun only writes the chunks the journal does not list
+    written = []
+    monkeypatch.setattr(ChunkJournal, "mark_done", lambda journal, key: (written.append(key), mark_done(journal, key)))
+    convert_scene("enmap", geotiff_path, hdr_path, metadata_path=metadata_path, resumable=True, **options)
+    assert written and not set(written) & set(marked)
+    assert not os.path.exists(journal_path(hdr_path))
+    assert filecmp.cmp(str(tmp_path / "full.raw"), str(tmp_path / "resumed.raw"), shallow=False)
@@ -0,0 +1,87 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+from conversion_cache import ConversionCache, source_hash
+
+
+@pytest.fixture
+def converter_class(tmp_path):
+    # A converter module of its own, so its source can be changed
+    path = tmp_path / "converter" / "convert_test_to_envi.py"
+    path.parent.mkdir()
+    path.write_text("class TestConverter:\n    pass\n")
+    spec = importlib.util.spec_from_file_location("convert_test_to_envi", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    sys.modules[spec.name] = module
+    yield module.TestConverter
+    del sys.modules[spec.name]
+    source_hash.cache_clear()
+
+
+def write(path, content: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_key_changes_with_the_converter_source(tmp_path, converter_class):
+    cache = ConversionCache(str(tmp_path / "cache"))
+    inputs = [write(tmp_path / "scene.tif", b"pixels")]
+    key = cache.key(converter_class, inputs, {})
+    assert cache.key(converter_class, inputs, {}) == key
+    assert cache.key(converter_class, inputs, {"streaming": True}) != key
+
+    (tmp_path / "converter" / "convert_test_to_envi.py").write_text("class TestConverter:\n    version = 2\n")
+    source_hash.cache_clear()
+    assert cache.key(converter_class, inputs, {}) != key
+
+
+def test_hashed_inputs_hit_at_another_path(tmp_path, converter_class):
+    cache = ConversionCache(str(tmp_path / "cache"), hash_inputs=True)
+    first = write(tmp_path / "a" / "scene.tif", b"pixels")
+    second = write(tmp_path / "b" / "scene.tif", b"pixels")
+    stat = os.stat(first)
+    os.utime(second, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert cache.key(converter_class, [first], {}) == cache.key(converter_class, [second], {})
+
+
+def test_hashed_inputs_miss_once_rewritten(tmp_path, converter_class):
+    # Same size and same sampled blocks, only the modification time tells them apart
+    cache = ConversionCache(str(tmp_path / "cache"), hash_inputs=True)
+    path = write(tmp_path / "scene.tif", b"pixels")
+    key = cache.key(converter_class, [path], {})
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert cache.key(converter_class, [path], {}) != key
+
+
+def test_store_and_fetch(tmp_path):
+    cache = ConversionCache(str(tmp_path / "cache"))
+    outputs = [write(tmp_path / "out" / "scene.hdr", b"header"), write(tmp_path / "out" / "scene.raw", b"raw")]
+    assert not cache.fetch("key", str(tmp_path / "other" / "copy.hdr"))
+    cache.store("key", outputs)
+
+    (tmp_path / "other").mkdir()
+    # A stale output is replaced, not written through to the cache
+    stale = write(tmp_path / "other" / "copy.raw", b"stale")
+    assert cache.fetch("key", str(tmp_path / "other" / "copy.hdr"))
+    assert (tmp_path / "other" / "copy.hdr").read_bytes() == b"header"
+    assert open(stale, "rb").read() == b"raw"
+    assert cache.size() == len(b"header") + len(b"raw")
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ConversionCache(str(tmp_path / "cache"))
+    for number, key in enumerate(("first", "second", "third")):
+        cache.store(key, [write(tmp_path / key / "scene.raw", bytes(100))])
+        os.utime(cache.entry_path(key), (number, number))
+    # Fetching an entry makes it the most recently used
+    assert cache.fetch("first", str(tmp_path / "out.hdr"))
+    cache.max_size = 250
+    cache.evict()
+    assert sorted(os.listdir(cache.directory)) == ["first", "third"]
+    assert cache.size() == 200
@@ -0,0 +1,43 @@
+import pytest
+import rasterio
+from spectral import envi
+
+from converters import convert_scene
+from synthetic_scenes import write_enmap_scene
+
+
+@pytest.fixture
+def enmap_scene(tmp_path):
+    geotiff_path, metadata_path = write_enmap_scene(str(tmp_path), 12, 10)
+    with rasterio.open(geotiff_path, "r+") as dst:
+        dst.nodata = -32768
+    return geotiff_path, metadata_path
+
+
+def convert(tmp_path, scene, name, **options):
+    hdr_path = str(tmp_path / f"{name}.hdr")
+    convert_scene("enmap", scene[0], hdr_path, metadata_path=scene[1], **options)
+    return envi.read_envi_header(hdr_path)
+
+
+def test_native_header_ignores_the_fill_value(tmp_path, enmap_scene):
+    header = convert(tmp_path, enmap_scene, "native", native_dtype=True)
+    assert header["data type"] == "2"
+    assert int(header["data ignore value"]) == -32768
+    # The fill value scales to the value the float32 output ignores
+    gain, offset = float(header["data gain values"][0]), float(header["data offset values"][0])
+    assert -32768 * gain + offset == pytest.approx(0, abs=1e-7)
+
+
+def test_float_header_ignores_zero(tmp_path, enmap_scene):
+    header = convert(tmp_path, enmap_scene, "float")
+    assert header["data type"] == "4"
+    assert int(header["data ignore value"]) == 0
+
+
+def test_native_header_without_nodata(tmp_path, enmap_scene):
+    # EnMap fills with -32768 even when the GeoTIFF does not declare it
+    with rasterio.open(enmap_scene[0], "r+") as dst:
+        dst.nodata = None
+    header = convert(tmp_path, enmap_scene, "native", native_dtype=True, streaming=True)
+    assert int(header["data ignore value"]) == -32768
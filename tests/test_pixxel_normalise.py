@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from spectral import envi
+
+from convert_pixxel_geotiff_to_envi import PixxelConverter
+
+
+def legacy_normalise_hsi_data(data):
+    # The in-memory normalisation the windowed one replaced
+    hsi_data = np.transpose(data, [1, 2, 0])
+    std_deviation = np.std(hsi_data)
+    mean_value = np.mean(hsi_data)
+    normalized_numbers = [(x - mean_value) / std_deviation for x in hsi_data]
+
+    min_normalized = np.min(normalized_numbers)
+    max_normalized = np.max(normalized_numbers)
+    return np.array([(x - min_normalized) / (max_normalized - min_normalized) for x in normalized_numbers])
+
+
+def normalise(geotiff_path, hdr_path, bands, native_dtype=False, chunk_size=None):
+    converter = PixxelConverter(geotiff_path, "", hdr_path, normalise=True, native_dtype=native_dtype)
+    if chunk_size:
+        converter.chunk_size = chunk_size
+    converter.parse_geotiff_header()
+    converter.wavelengths = [400.0 + 5 * b for b in range(bands)]
+    converter.fwhm = [5.0] * bands
+    converter.wavelength_units = "nm"
+    if native_dtype:
+        converter.get_normalisation_values(converter.compute_statistics())
+        converter.stream_envi_files()
+    else:
+        converter.create_normalised_envi_files()
+    return converter
+
+
+@pytest.mark.parametrize("chunk_size", [None, 4096])
+def test_matches_legacy_normalisation(tmp_path, write_geotiff, chunk_size):
+    data = np.random.default_rng(0).integers(0, 4096, size=(6, 20, 15), dtype=np.uint16)
+    hdr_path = str(tmp_path / "pixxel.hdr")
+    normalise(write_geotiff(data), hdr_path, 6, chunk_size=chunk_size)
+
+    # The new mode writes BIL, the legacy output is (line, sample, band)
+    new = np.asarray(envi.open(hdr_path).open_memmap(interleave="bip"))
+    legacy = legacy_normalise_hsi_data(data)
+    assert new.shape == legacy.shape
+    np.testing.assert_allclose(new, legacy, rtol=0, atol=1e-12)
+
+
+def test_constant_scene_maps_to_zero(tmp_path, write_geotiff):
+    data = np.full((4, 10, 8), 7, dtype=np.uint16)
+    hdr_path = str(tmp_path / "pixxel.hdr")
+    normalise(write_geotiff(data), hdr_path, 4)
+
+    new = np.asarray(envi.open(hdr_path).open_memmap(interleave="bip"))
+    assert new.shape == (10, 8, 4)
+    assert not new.any()
+
+
+def test_constant_scene_native_dtype_has_zero_gains(tmp_path, write_geotiff):
+    data = np.full((4, 10, 8), 7, dtype=np.uint16)
+    converter = normalise(write_geotiff(data), str(tmp_path / "pixxel.hdr"), 4, native_dtype=True)
+
+    assert converter.data_gain_values == [0.0] * 4
+    assert converter.data_offset_values == [0.0] * 4
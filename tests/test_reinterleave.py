@@ -0,0 +1,36 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from reinterleave import reinterleave
+
+BANDS, LINES, SAMPLES = 7, 260, 301
+# (band, line, sample) axes of the cube in the order each interleave stores them
+AXES = {"bsq": (0, 1, 2), "bil": (1, 0, 2), "bip": (1, 2, 0)}
+
+
+def write_envi(path, cube: np.ndarray, interleave: str, header_offset: int = 0):
+    with open(path + ".hdr", "w") as hdr_file:
+        hdr_file.write(f"ENVI\nsamples = {SAMPLES}\nlines = {LINES}\nbands = {BANDS}\nheader offset = {header_offset}\n"
+                       f"file type = ENVI Standard\ndata type = 12\ninterleave = {interleave}\nbyte order = 0\n"
+                       "description = {synthetic}\n")
+    with open(path + ".raw", "wb") as raw_file:
+        raw_file.write(bytes(header_offset))
+        raw_file.write(np.ascontiguousarray(np.transpose(cube, AXES[interleave])).tobytes())
+    return path + ".hdr"
+
+
+@pytest.mark.parametrize("source, target", list(itertools.permutations(AXES, 2)))
+def test_matches_transpose(tmp_path, source, target):
+    cube = np.random.default_rng(0).integers(0, 4096, (BANDS, LINES, SAMPLES), dtype=np.uint16)
+    hdr_path = write_envi(str(tmp_path / "scene"), cube, source, header_offset=128)
+    # 1 MB blocks, so the lines are moved in two blocks
+    output_path = reinterleave(hdr_path, target, block_size_mb=1)
+
+    expected = np.transpose(cube, AXES[target])
+    assert np.array_equal(np.fromfile(output_path[:-len(".hdr")] + ".raw", dtype="<u2").reshape(expected.shape),
+                          expected)
+    with open(output_path) as hdr_file:
+        text = hdr_file.read()
+    assert f"interleave = {target}" in text and "header offset = 0" in text and "{synthetic}" in text
@@ -0,0 +1,29 @@
+from spectral_metadata import PIXXEL_V2, read_spectral_metadata
+
+BAND = ('<Bands><Band_Number>{number}</Band_Number><Status>{status}</Status>'
+        '<Central_Wavelength unit="nm">{wavelength}</Central_Wavelength><Bandwidth unit="nm">9.5</Bandwidth></Bands>')
+
+
+def write_v2_metadata(tmp_path, bands, after=""):
+    # Pixxel v2 metadata with the Bands elements between other elements, as delivered
+    path = tmp_path / "metadata.xml"
+    path.write_text('<?xml version="1.0" encoding="UTF-8"?>\n<Metadata><Product>TD1</Product>' + "".join(
+        BAND.format(number=number + 1, status=status, wavelength=wavelength)
+        for number, (status, wavelength) in enumerate(bands)) + after + "</Metadata>\n")
+    return str(path)
+
+
+def test_v2_reads_the_bands_in_the_image(tmp_path):
+    path = write_v2_metadata(tmp_path, [(1, 470.0), (1, 480.5), (0, 490.0)], after="<Geolocation><Point/></Geolocation>")
+    metadata = read_spectral_metadata(path)
+    assert metadata.schema_name == PIXXEL_V2
+    assert metadata.wavelengths == [470.0, 480.5]
+    assert metadata.fwhm == [9.5, 9.5]
+    assert metadata.wavelength_units == "nm"
+    assert metadata.listed_bands == 3
+
+
+def test_v2_stops_after_the_bands(tmp_path):
+    # The rest of the file is not read, so even a broken tail does not matter
+    path = write_v2_metadata(tmp_path, [(1, 470.0), (1, 480.5)], after="<Geolocation><Point></Geolocation>")
+    assert read_spectral_metadata(path).wavelengths == [470.0, 480.5]
@@ -0,0 +1,163 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from upload import LocalUploader, PipelinedUpload, Uploader, UploadOptions, upload_state_path
+
+PART_SIZE = 1024 ** 2
+# Three full parts and a short last one
+RAW_SIZE = 3 * PART_SIZE + 12345
+
+
+class RecordingUploader(LocalUploader):
+    # Records the parts in the order they are sent
+    def __init__(self, destination):
+        super().__init__(destination)
+        self.sent = []
+
+    def upload_part(self, upload_id, part_number, data):
+        self.sent.append(part_number)
+        return super().upload_part(upload_id, part_number, data)
+
+
+class LastFirstUploader(RecordingUploader):
+    # Holds the first part back until the last one was sent
+    last_part = 4
+
+    def __init__(self, destination):
+        super().__init__(destination)
+        self.last_sent = threading.Event()
+
+    def upload_part(self, upload_id, part_number, data):
+        if part_number == 1:
+            self.last_sent.wait(timeout=5)
+        etag = super().upload_part(upload_id, part_number, data)
+        if part_number == self.last_part:
+            self.last_sent.set()
+        return etag
+
+
+class GatedUploader(LocalUploader):
+    # Sends no part until the gate is opened, as a link that is much slower than the conversion
+    def __init__(self, destination):
+        super().__init__(destination)
+        self.gate = threading.Event()
+
+    def upload_part(self, upload_id, part_number, data):
+        self.gate.wait()
+        return super().upload_part(upload_id, part_number, data)
+
+
+class FailingUploader(LocalUploader):
+    # Loses the connection at the given part
+    fail_at = 3
+
+    def upload_part(self, upload_id, part_number, data):
+        if part_number == self.fail_at:
+            raise ConnectionError("connection lost")
+        return super().upload_part(upload_id, part_number, data)
+
+
+@pytest.fixture
+def scene(tmp_path):
+    # (.hdr path, .raw path) of outputs as the writer leaves them
+    hdr_path = str(tmp_path / "out" / "scene.hdr")
+    raw_path = str(tmp_path / "out" / "scene.raw")
+    os.makedirs(os.path.dirname(hdr_path))
+    with open(hdr_path, "w") as hdr_file:
+        hdr_file.write("ENVI\n")
+    with open(raw_path, "wb") as raw_file:
+        raw_file.write(np.random.default_rng(0).integers(0, 256, RAW_SIZE, dtype=np.uint8).tobytes())
+    return hdr_path, raw_path
+
+
+def upload_options(tmp_path, **options):
+    return UploadOptions(destination=str(tmp_path / "store"), part_size_mb=PART_SIZE // 1024 ** 2, **options)
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def run_upload(hdr_path, raw_path, upload):
+    # Advances by a third of a part at a time, as the writer does block by block
+    upload.open(raw_path)
+    try:
+        for written_bytes in range(0, RAW_SIZE, PART_SIZE // 3):
+            upload.advance(written_bytes)
+        upload.finish_raw()
+        upload.put(hdr_path)
+    finally:
+        upload.close()
+
+
+def test_parts_are_assembled_in_order(tmp_path, scene):
+    hdr_path, raw_path = scene
+    options = upload_options(tmp_path, workers=2)
+    uploader = LastFirstUploader(options.destination)
+    upload = PipelinedUpload(hdr_path, raw_path, RAW_SIZE, options, uploader=uploader)
+    run_upload(hdr_path, raw_path, upload)
+
+    assert uploader.sent == [2, 3, 4, 1]
+    assert read(os.path.join(options.destination, "scene.raw")) == read(raw_path)
+    assert read(os.path.join(options.destination, "scene.hdr")) == read(hdr_path)
+    # Neither the parts nor the upload state are left once the upload is complete
+    assert os.listdir(uploader.uploads_dir) == []
+    assert not os.path.exists(upload_state_path(hdr_path))
+
+
+def test_advance_blocks_while_the_queue_is_full(tmp_path, scene):
+    hdr_path, raw_path = scene
+    options = upload_options(tmp_path, workers=1, max_queued_parts=1)
+    uploader = GatedUploader(options.destination)
+    upload = PipelinedUpload(hdr_path, raw_path, RAW_SIZE, options, uploader=uploader).open(raw_path)
+    advancing = threading.Thread(target=upload.advance, args=(RAW_SIZE,), daemon=True)
+    advancing.start()
+    try:
+        # One part is being sent and one is queued, so the third one has to wait
+        advancing.join(timeout=0.3)
+        assert advancing.is_alive()
+        assert uploader.list_parts(upload.upload_id) == {}
+    finally:
+        uploader.gate.set()
+    advancing.join(timeout=5)
+    assert not advancing.is_alive()
+    upload.finish_raw()
+    assert read(os.path.join(options.destination, "scene.raw")) == read(raw_path)
+
+
+def test_rerun_resumes_the_upload(tmp_path, scene):
+    hdr_path, raw_path = scene
+    options = upload_options(tmp_path, workers=1)
+    failed = PipelinedUpload(hdr_path, raw_path, RAW_SIZE, options, uploader=FailingUploader(options.destination))
+    with pytest.raises(RuntimeError, match="connection lost"):
+        run_upload(hdr_path, raw_path, failed)
+    assert os.path.exists(upload_state_path(hdr_path))
+
+    uploader = RecordingUploader(options.destination)
+    upload = PipelinedUpload(hdr_path, raw_path, RAW_SIZE, options, uploader=uploader)
+    run_upload(hdr_path, raw_path, upload)
+
+    # Parts 1 and 2 made it before the failure, so only 3 and 4 are sent again
+    assert upload.upload_id == failed.upload_id
+    assert sorted(upload.existing) == [1, 2]
+    assert upload.skipped == 2
+    assert sorted(uploader.sent) == [3, 4]
+    assert read(os.path.join(options.destination, "scene.raw")) == read(raw_path)
+    assert not os.path.exists(upload_state_path(hdr_path))
+
+
+def test_uploader_must_implement_every_method():
+    class PartsOnlyUploader(Uploader):
+        def create_upload(self, key):
+            return key
+
+        def upload_part(self, upload_id, part_number, data):
+            return str(part_number)
+
+    # Caught when the uploader is made, not once a scene is half uploaded
+    with pytest.raises(TypeError, match="complete_upload"):
+        PartsOnlyUploader()
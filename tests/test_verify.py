@@ -0,0 +1,63 @@
+import json
+import os
+
+import pytest
+
+from checksums import manifest_path
+from converters import convert_scene
+from synthetic_scenes import write_worldview3_scene
+from verify import find_headers, verify_envi_file
+
+
+@pytest.fixture
+def hdr_path(tmp_path):
+    geotiff_path, _ = write_worldview3_scene(str(tmp_path), 6, 5)
+    path = str(tmp_path / "out" / "scene.hdr")
+    os.makedirs(os.path.dirname(path))
+    convert_scene("worldview3", geotiff_path, path, writer_options={"checksums": True})
+    return path
+
+
+def edit_header(hdr_path, old, new):
+    with open(hdr_path) as hdr_file:
+        text = hdr_file.read()
+    assert old in text
+    with open(hdr_path, "w") as hdr_file:
+        hdr_file.write(text.replace(old, new, 1))
+
+
+def test_converted_file_is_consistent(tmp_path, hdr_path):
+    assert list(find_headers([str(tmp_path / "out")])) == [hdr_path]
+    assert verify_envi_file(hdr_path) == []
+
+
+def test_data_file_size(hdr_path):
+    raw_path = os.path.splitext(hdr_path)[0] + ".raw"
+    with open(raw_path, "r+b") as raw_file:
+        raw_file.truncate(os.path.getsize(raw_path) - 2)
+    problems = verify_envi_file(hdr_path)
+    assert any("the header describes" in problem for problem in problems)
+    assert any("listed in the manifest" in problem for problem in problems)
+
+
+def test_band_list_length(hdr_path):
+    # One band more than the lists of wavelengths and FWHM hold
+    edit_header(hdr_path, "bands = 8", "bands = 9")
+    problems = verify_envi_file(hdr_path)
+    assert "'wavelength' has 8 entries for 9 bands" in problems
+    assert "the header does not match its checksum in the manifest" in problems
+    assert any("the header describes" in problem for problem in problems)
+
+
+def test_manifest_band_checksums(hdr_path):
+    with open(manifest_path(hdr_path)) as manifest_file:
+        manifest = json.load(manifest_file)
+    manifest["bands"]["checksums"].pop()
+    with open(manifest_path(hdr_path), "w") as manifest_file:
+        json.dump(manifest, manifest_file)
+    assert verify_envi_file(hdr_path) == ["the manifest has 7 band checksums for 8 bands"]
+
+
+def test_missing_key(hdr_path):
+    edit_header(hdr_path, "data type", "data kind")
+    assert verify_envi_file(hdr_path) == ["missing 'data type'"]
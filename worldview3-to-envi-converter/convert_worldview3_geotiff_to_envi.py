@@ -3,11 +3,18 @@ DESCRIPTION: Python script that converts a WorldView-3 GeoTIFF to ENVI Standard.
 """
 import os
 import re
+import sys
 
-import numpy as np
 import rasterio
-from osgeo import gdal
-from spectral import envi
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "common"))
+from aoi import AOI, aoi_window, as_aoi, cropped_transform, full_window
+from band_selection import BandSelection, as_band_selection, source_band_count
+from envi_writer import ENVIWriter, prepare_header
+from ENVI import ENVIModel
+from source_layout import REORDER, copy_source, describe, open_source, write_path
+from stage_profiler import StageProfiler, profiled, profiled_conversion
+from writer_options import WriterOptions, as_writer_options
 
 # ------------------------------------------------------------------------------------------------------------------
 # NOTE: some of these constants (including center wavelengths) were obtained through 
@@ -16,74 +23,86 @@ from spectral import envi
 # ------------------------------------------------------------------------------------------------------------------
 WAVELENGTH_UNITS = 'nm'
 FILE_TYPE = "ENVI"
-HEADER_OFFSET = 0
-BYTE_ORDER = 0
 INTERLEAVE = "BIL"
+CHUNK_SIZE_MB = 64
 WORLDVIEW_WAVELENGTH_LIST = [649.4, 427.4, 481.9, 547.1, 604.3, 660.1, 722.7, 824.0, 913.6, 1209.1, 1571.6, 1661.1, 1729.5, 2163.7, 2202.2, 2259.3, 2329.2]
 
 class WorldView3Converter(object):
-    def __init__(self, geotiff_path: str, output_dir: str):
+    def __init__(self, geotiff_path: str, output_dir: str, interleave: str = INTERLEAVE,
+                 profiler: StageProfiler = None, band_selection: BandSelection = None,
+                 aoi: AOI = None, writer_options: WriterOptions = None):
         self.geotiff_path = geotiff_path
         self.output_dir = output_dir
+        self.profiler = profiler or StageProfiler()
+        self.band_selection = as_band_selection(band_selection)
+        self.band_indexes = None
+        self.aoi = as_aoi(aoi)
+        self.aoi_window = None
+        self.writer_options = as_writer_options(writer_options)
         self.wavelengths = []
         self.wavelength_units = WAVELENGTH_UNITS
         self.file_type = FILE_TYPE
         self.map_info = ""
-        self.header_offset = HEADER_OFFSET
         self.lines = 0
         self.samples = 0
         self.bands = 0
-        self.byte_order = BYTE_ORDER
-        self.interleave = INTERLEAVE
-        self.data_type = -1
+        self.interleave = interleave
+        self.write_path = REORDER
         self.data = []
 
+    @profiled_conversion("worldview3")
     def convert_geotiff(self):
         print("Validating input files...")
         self.validate_input_file()
         print("Starting conversion...")
-        self.get_byte_order()
-        self.parse_wavelengths()
-        self.parse_geotiff_file()
-        self.get_data_type()
-        self.validate_wavelengths()
-        print("Creating ENVI files...")
-        self.create_envi_files()
+        # The GeoTIFF is opened once for the whole conversion, as in inspect
+        with rasterio.open(self.geotiff_path) as src:
+            self.parse_wavelengths(src)
+            self.select_bands()
+            self.get_write_path(src)
+            if self.write_path != REORDER:
+                self.parse_geotiff_header(src)
+            else:
+                self.parse_geotiff_file(src)
+            self.validate_wavelengths()
+            print("Creating ENVI files...")
+            if self.write_path != REORDER:
+                self.copy_envi_files(src)
+            else:
+                self.create_envi_files()
 
+    @profiled("validate")
     def validate_input_file(self):
         if not os.path.isfile(self.geotiff_path):
             print(f"ERROR: GeoTIFF file doesn't exist - {self.geotiff_path}")
             raise FileNotFoundError(f"{self.geotiff_path} was not found or is a directory")
         print("GeoTIFF and XML Metadata files are valid")
 
-    def get_byte_order(self):                
-        with open(self.geotiff_path, 'rb') as tiff_file:
-            # Read the first 2 bytes of the file
-            header = tiff_file.read(2)
-            if header == b'II':
-                self.byte_order = 0
-            elif header == b'MM':
-                self.byte_order = 1
-            else:
-                self.byte_order = -1
-
-    def get_data_type(self):
-        with rasterio.open(self.geotiff_path) as src:
-            match src.dtypes[0]:
-                case "byte":
-                    self.data_type = 1
-                case "int16":
-                    self.data_type = 2
-                case _:
-                    self.data_type = -1
-
-    def parse_geotiff_file(self):
-        with rasterio.open(self.geotiff_path) as src:
+    @profiled("metadata")
+    def get_write_path(self, src=None):
+        with open_source(self.geotiff_path, src) as src:
+            self.locate_aoi(src)
+            self.write_path = write_path(src, self.geotiff_path, self.interleave, src.dtypes[0], self.band_indexes,
+                                         self.aoi_window)
+        print(describe(self.write_path, self.interleave))
+
+    def locate_aoi(self, src):
+        # The pixel window covering the area of interest, the whole scene without one
+        self.aoi_window = aoi_window(src, self.aoi)
+        if self.aoi is not None:
+            window = self.aoi_window
+            print(f"Area of interest covers lines {window.row_off} to {window.row_off + window.height - 1} "
+                  f"and samples {window.col_off} to {window.col_off + window.width - 1}")
+
+    def parse_geotiff_file(self, src=None):
+        with open_source(self.geotiff_path, src) as src:
             # Get the geospatial metadata (map information).
             crs = src.crs
-            transform = src.transform
+            transform = cropped_transform(src, self.aoi_window)
             self.map_info = f'{crs}, 1.000, 1.000, {transform.c}, {transform.f}, {transform.a}, {transform.e}'
-            self.data = src.read()
+            with self.profiler.stage("read") as stage:
+                self.data = src.read(self.band_indexes, window=self.aoi_window)
+                stage.add(self.data.nbytes)
             self.lines = self.data.shape[1]
             self.samples = self.data.shape[2]
             self.bands = self.data.shape[0]
@@ -91,55 +110,112 @@ class WorldView3Converter(object):
             print(f"Lines = {self.lines} | Samples = {self.samples} | Bands = {self.bands}")
         print("GeoTIFF file parsed")
 
-    def parse_wavelengths(self):
+    @profiled("metadata")
+    def parse_geotiff_header(self, src=None):
+        # Same as parse_geotiff_file but leaves the pixel data on disk for copy_envi_files
+        with open_source(self.geotiff_path, src) as src:
+            self.read_geotiff_header(src)
+        print("GeoTIFF header parsed")
+
+    def read_geotiff_header(self, src):
+        crs = src.crs
+        transform = cropped_transform(src, self.aoi_window)
+        self.map_info = f'{crs}, 1.000, 1.000, {transform.c}, {transform.f}, {transform.a}, {transform.e}'
+        window = self.aoi_window or full_window(src)
+        self.lines = window.height
+        self.samples = window.width
+        self.bands = source_band_count(src, self.band_indexes)
+        print(f"Lines = {self.lines} | Samples = {self.samples} | Bands = {self.bands}")
+
+    @profiled("metadata")
+    def parse_wavelengths(self, src=None):
         # NOTE: Getting the band information for WorldView geotiffs involves getting the band number
         # information from the geotiff metadata, then comparing the band number to the array that
-        # was populated using public documentation on WorldView-3
-        dataset = gdal.Open(self.geotiff_path)
-
-        if not dataset:
-            print("============== ERROR ================")
-            raise Exception("Unable to open GeoTIFF using GDAL")
+        # was populated using public documentation on WorldView-3. rasterio exposes the same
+        # metadata GDAL does as the tags of the dataset.
+        with open_source(self.geotiff_path, src) as src:
+            self.read_wavelengths(src.tags())
+        print("Wavelengths parsed through GeoTiff metadata")
 
-        metadata = dataset.GetMetadata()
+    def read_wavelengths(self, metadata: dict):
         band_info = metadata["TIFFTAG_IMAGEDESCRIPTION"]
         bands_array = re.findall(r'(\d*);', band_info)
         if bands_array:
             self.wavelengths = [WORLDVIEW_WAVELENGTH_LIST[int(band) - 1] for band in bands_array]
         else:
             print("ERROR: was not able to parse the GeoTIFF Metadata")
-        print("Wavelengths parsed through GeoTiff metadata")
 
 
+    def select_bands(self):
+        # The selected bands are resolved against the wavelengths of the band list, so
+        # their indexes are known before any pixel data is read
+        if self.band_selection is None:
+            return
+        selected = self.band_selection.select(self.wavelengths)
+        print(f"Selected {len(selected)} of {len(self.wavelengths)} bands")
+        self.band_indexes = [i + 1 for i in selected]
+        self.wavelengths = [self.wavelengths[i] for i in selected]
+
+    def inspect(self):
+        # Returns the header the conversion would write, reading only the GeoTIFF header
+        # (a single open, the band list comes from its tags as in parse_wavelengths) and never
+        # the pixel data
+        with rasterio.open(self.geotiff_path) as src:
+            self.read_wavelengths(src.tags())
+            self.select_bands()
+            self.locate_aoi(src)
+            self.read_geotiff_header(src)
+            dtype = src.dtypes[0]
+        self.validate_wavelengths()
+        return self.get_envi_header(dtype).dict()
+
     def validate_wavelengths(self):
         if len(self.wavelengths) != self.bands:
             print(f"ERROR: The number of wavelengths ({len(self.wavelengths)}) does not equal the number of bands ({self.bands})")
 
     def process_hsi_data(self):
         # NOTE: Should the image need any sort of pre-processing on the data, this is where it should go.
-        hsi_data = np.transpose(self.data, [1, 2, 0])
+        # The data is kept in the (band, line, sample) order rasterio reads it in.
+        hsi_data = self.data
         return hsi_data
 
-    def create_envi_files(self):
-        metadata = {
-            "wavelength": self.wavelengths,
-            "wavelength units": self.wavelength_units,
-            "map info": self.map_info,
-            "lines": self.lines,
-            "samples": self.samples,
-            "bands": self.bands,
-            "file type": self.file_type,
-            "header offset": self.header_offset,
-            "byte order": self.byte_order,
-            "interleave": self.interleave,
-            "data type": self.data_type,
-        }
+    def get_envi_header(self, dtype):
+        header = ENVIModel(
+            wavelength=self.wavelengths,
+            wavelength_units=self.wavelength_units,
+            data_ignore_value=None,
+            map_info=self.map_info,
+            lines=self.lines,
+            samples=self.samples,
+            bands=self.bands,
+            file_type=self.file_type,
+            interleave=self.interleave.lower(),
+        )
+        return prepare_header(header, dtype)
 
+    def create_envi_files(self):
         hsi_data = self.process_hsi_data()
 
-        envi.save_image(self.output_dir, hsi_data, metadata=metadata, force=True)
+        with ENVIWriter(self.output_dir, self.get_envi_header(hsi_data.dtype), hsi_data.dtype,
+                        profiler=self.profiler, options=self.writer_options) as writer:
+            writer.write(hsi_data)
 
         if os.path.isfile(self.output_dir):
             print("ENVI Files successfully created.")
         else:
-            print("ERROR: The ENVI Header File was not successfully created.")
\ No newline at end of file
+            print("ERROR: The ENVI Header File was not successfully created.")
+
+    def copy_envi_files(self, src=None):
+        # The GeoTIFF is stored in the output interleave, so it is copied into the .raw
+        # without being read into memory or reordered. This skips process_hsi_data, which
+        # leaves the data untouched.
+        with open_source(self.geotiff_path, src) as src, \
+                ENVIWriter(self.output_dir, self.get_envi_header(src.dtypes[0]), src.dtypes[0],
+                           profiler=self.profiler, options=self.writer_options) as writer:
+            self.write_path = copy_source(src, self.geotiff_path, writer, CHUNK_SIZE_MB * 1024 * 1024,
+                                          indexes=self.band_indexes, region=self.aoi_window)
+
+        if os.path.isfile(self.output_dir) and os.path.isfile(writer.raw_path):
+            print("ENVI Files successfully created.")
+        else:
+            print("ERROR: The ENVI Header File was not successfully created.")